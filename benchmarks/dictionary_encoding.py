@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字典编码表结构基准测试
+
+在临时数据库中按迁移6的表结构（作者、朝代、褒贬、分类为重复的TEXT）写入数据，
+记录文件大小和查询耗时；再执行迁移7改为查找表ID并VACUUM，记录同样的指标。
+
+用法:
+    python -m benchmarks.dictionary_encoding [--count 100000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from quotes import database
+from quotes.models import Quote
+from benchmarks.quote_memory import AUTHORS, DYNASTIES, SENTIMENTS, CATEGORIES
+
+
+# (名称, 旧表结构上的SQL, 新表结构上的SQL)，新SQL为None时与旧SQL相同。
+# 视图上的GROUP BY和筛选需要连接全部查找表，按字段统计、筛选应直接使用quote_entries的外键，
+# 标注（视图）的查询只作对照
+QUERIES = [
+    ('按分类GROUP BY（视图）', 'SELECT category, COUNT(*) FROM quotes GROUP BY category', None),
+    ('按分类外键GROUP BY', 'SELECT category, COUNT(*) FROM quotes GROUP BY category', '''
+     SELECT t.name, counts.n
+     FROM (SELECT category_id, COUNT(*) AS n FROM quote_entries GROUP BY category_id) counts
+     JOIN categories t ON t.id = counts.category_id ORDER BY t.name
+     '''),
+    ('按朝代外键GROUP BY', 'SELECT dynasty, COUNT(*) FROM quotes GROUP BY dynasty', '''
+     SELECT t.name, counts.n
+     FROM (SELECT dynasty_id, COUNT(*) AS n FROM quote_entries GROUP BY dynasty_id) counts
+     JOIN dynasties t ON t.id = counts.dynasty_id ORDER BY t.name
+     '''),
+    ('按分类筛选计数（视图）', "SELECT COUNT(*) FROM quotes WHERE category = '哲理'", None),
+    ('按分类外键筛选计数', "SELECT COUNT(*) FROM quotes WHERE category = '哲理'", '''
+     SELECT COUNT(*) FROM quote_entries
+     WHERE category_id = (SELECT id FROM categories WHERE name = '哲理')
+     '''),
+    ('按作者排序首页', 'SELECT * FROM quotes ORDER BY author, id LIMIT 20', None),
+    ('按作者排序末页', 'SELECT * FROM quotes ORDER BY author DESC, id DESC LIMIT 20', None),
+    ('按作者游标翻页', "SELECT * FROM quotes WHERE (author, id) > ('孟子', 5000) "
+                       "ORDER BY author, id LIMIT 20", None),
+    ('按内容查找', "SELECT * FROM quotes WHERE content = '名言500'", None),
+]
+
+
+def make_quotes(count):
+    """生成count条名言，作者、朝代、褒贬、分类从少量取值中随机选取
+
+    Args:
+        count: 名言数量
+
+    Yields:
+        Quote: 名言对象
+    """
+    rng = random.Random(42)
+    for i in range(count):
+        yield Quote(
+            content=f"名言{i}",
+            pinyin="xué ér shí xí zhī",
+            author=rng.choice(AUTHORS),
+            dynasty=rng.choice(DYNASTIES),
+            sentiment=rng.choice(SENTIMENTS),
+            meaning="学习并且按时温习",
+            category=rng.choice(CATEGORIES),
+        )
+
+
+def apply_migrations(conn, version):
+    """只执行到指定版本的迁移，不做init_db()中依赖最新表结构的其他初始化
+
+    Args:
+        conn: 数据库连接
+        version: 目标版本号
+    """
+    current = database.get_schema_version()
+    for number in range(current + 1, version + 1):
+        with database.transaction():
+            database.MIGRATIONS[number - 1](conn)
+            conn.execute(f'PRAGMA user_version = {number}')
+
+
+def database_size(conn):
+    """获取数据库文件大小
+
+    连接使用WAL模式，VACUUM等写入的页可能仍在-wal文件中，先写回主文件并截断WAL再统计。
+
+    Args:
+        conn: 数据库连接
+
+    Returns:
+        int: 字节数
+    """
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    size = os.path.getsize(database.DB_PATH)
+    wal_path = database.DB_PATH + '-wal'
+    if os.path.exists(wal_path):
+        size += os.path.getsize(wal_path)
+    return size
+
+
+def time_queries(conn, migrated, repeat=5):
+    """执行QUERIES中的查询，返回每个查询的最短耗时
+
+    Args:
+        conn: 数据库连接
+        migrated: 是否已迁移为字典编码的表结构
+        repeat: 每个查询执行的次数
+
+    Returns:
+        dict: 查询名称到毫秒数的映射
+    """
+    timings = {}
+    for name, before_sql, after_sql in QUERIES:
+        sql = after_sql if migrated and after_sql else before_sql
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql).fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return timings
+
+
+def main():
+    """运行基准测试并打印结果"""
+    parser = argparse.ArgumentParser(description="字典编码表结构基准测试")
+    parser.add_argument("--count", type=int, default=100000, help="写入的名言数量")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    database.DB_PATH = os.path.join(directory, 'benchmark.db')
+
+    try:
+        conn = database.get_db_connection()
+
+        # 旧表结构：只执行到迁移6，直接写入quotes表
+        apply_migrations(conn, 6)
+        with database.transaction():
+            conn.executemany('''
+            INSERT INTO quotes (content, pinyin, author, dynasty, sentiment, meaning,
+                                usage_scene, category, allusion, translation, usage_notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (quote.to_params() for quote in make_quotes(args.count)))
+        conn.execute('ANALYZE')
+        conn.execute('VACUUM')
+        before_size = database_size(conn)
+        before = time_queries(conn, migrated=False)
+
+        # 新表结构：执行迁移7
+        started = time.perf_counter()
+        apply_migrations(conn, 7)
+        migrate_seconds = time.perf_counter() - started
+        conn.execute('ANALYZE')
+        conn.execute('VACUUM')
+        after_size = database_size(conn)
+        after = time_queries(conn, migrated=True)
+    finally:
+        database.close_db_connection()
+        shutil.rmtree(directory)
+
+    print(f"名言数量: {args.count}，迁移耗时 {migrate_seconds:.2f}s")
+    print(f"数据库大小: {before_size / 1024 / 1024:.1f} MB -> {after_size / 1024 / 1024:.1f} MB"
+          f"（{(1 - after_size / before_size) * 100:.1f}%）")
+    for name, _, _ in QUERIES:
+        print(f"{name}: {before[name]:.2f} ms -> {after[name]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
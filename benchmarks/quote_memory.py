@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quote对象内存占用基准测试
+
+对比原先基于实例__dict__的名言对象与当前使用__slots__和字符串驻留的Quote，
+在大量实例（默认100万）下的单对象平均内存占用。
+
+用法:
+    python -m benchmarks.quote_memory [--count 1000000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from quotes.models import Quote
+
+
+class DictQuote:
+    """改造前的名言对象：普通类，字段保存在实例__dict__中"""
+
+    def __init__(self, content, pinyin, author="", dynasty="", sentiment="",
+                 meaning="", usage_scene="", category="", allusion="",
+                 translation="", usage_notes=""):
+        self.content = content
+        self.pinyin = pinyin
+        self.author = author
+        self.dynasty = dynasty
+        self.sentiment = sentiment
+        self.meaning = meaning
+        self.usage_scene = usage_scene
+        self.category = category
+        self.allusion = allusion
+        self.translation = translation
+        self.usage_notes = usage_notes
+
+
+AUTHORS = ["孔子", "孟子", "刘安", "罗大经", "陆游", "屈原", "李商隐", "王勃"]
+DYNASTIES = ["春秋时期", "战国时期", "西汉", "南宋", "唐代"]
+SENTIMENTS = ["褒义", "贬义", "中性"]
+CATEGORIES = ["教育", "道德", "治国", "修身", "哲理", "情感", "生活"]
+
+
+def _fresh(value):
+    """复制出一个新的字符串对象，模拟从数据库或网络读到的未共享字符串"""
+    return (value + ' ')[:-1]
+
+
+def measure(quote_class, count):
+    """创建count个对象，返回平均每个对象占用的字节数
+
+    长文本字段在两种实现之间共享，测得的差异只来自对象布局和低基数字段的驻留。
+
+    Args:
+        quote_class: 名言类
+        count: 对象数量
+
+    Returns:
+        float: 平均每个对象占用的字节数
+    """
+    gc.collect()
+    tracemalloc.start()
+
+    quotes = []
+    for i in range(count):
+        quotes.append(quote_class(
+            content="学而时习之，不亦说乎",
+            pinyin="xué ér shí xí zhī，bù yì yuè hū",
+            author=_fresh(AUTHORS[i % len(AUTHORS)]),
+            dynasty=_fresh(DYNASTIES[i % len(DYNASTIES)]),
+            sentiment=_fresh(SENTIMENTS[i % len(SENTIMENTS)]),
+            meaning="学习并且按时温习，不是很愉快吗",
+            usage_scene="鼓励学习",
+            category=_fresh(CATEGORIES[i % len(CATEGORIES)]),
+            allusion="出自《论语·学而》",
+            translation="Is it not pleasant to learn?",
+            usage_notes="用于鼓励人们坚持学习"
+        ))
+
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del quotes
+    gc.collect()
+    return size / count
+
+
+def main():
+    """运行基准测试并打印结果"""
+    parser = argparse.ArgumentParser(description="Quote对象内存占用基准测试")
+    parser.add_argument("--count", type=int, default=1000000, help="创建的对象数量")
+    args = parser.parse_args()
+
+    dict_size = measure(DictQuote, args.count)
+    slots_size = measure(Quote, args.count)
+
+    print(f"对象数量: {args.count}")
+    print(f"__dict__实现: {dict_size:.1f} 字节/对象，共 {dict_size * args.count / 1024 / 1024:.1f} MB")
+    print(f"__slots__实现: {slots_size:.1f} 字节/对象，共 {slots_size * args.count / 1024 / 1024:.1f} MB")
+    print(f"节省: {(1 - slots_size / dict_size) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库操作基准测试套件
+
+按给定规模用合成语料（quotes.corpus）建立临时数据库，测量写入、分页、按内容查找、
+清理重复和全量读取的耗时，结果保存为JSON；compare子命令对比两次结果，
+耗时增加超过阈值的项目视为性能回退，此时以非零状态码退出，便于在CI中使用。
+
+用法:
+    python -m benchmarks.suite run [--sizes 10000 100000 1000000] [--output results.json]
+                                   [--db-dir 目录] [--repeat 5] [--seed 42]
+    python -m benchmarks.suite compare baseline.json current.json [--threshold 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import count as counter
+
+from quotes import database
+from quotes.corpus import generate_corpus
+from quotes.models import Quote
+
+
+# 默认测试的数据规模
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+# 耗时增加超过该比例视为回退
+DEFAULT_THRESHOLD = 0.2
+
+# 分页测试的每页条数
+PAGE_SIZE = 20
+
+# 按内容查找的样本数
+LOOKUP_SAMPLES = 200
+
+# 单条插入测试每轮插入的条数
+SINGLE_INSERTS = 200
+
+# 批量插入测试每轮插入的条数
+BULK_ROWS = 10000
+
+# 耗时较长的全量操作最多重复的次数
+HEAVY_REPEAT = 3
+
+# 清理重复测试中每隔多少条复制一条作为重复数据
+DUPLICATE_STRIDE = 20
+
+
+def measure(function, repeat, setup=None):
+    """重复执行函数并记录耗时
+
+    Args:
+        function: 被测的无参函数
+        repeat: 重复次数
+        setup: 每次执行前调用的无参函数，不计入耗时
+
+    Returns:
+        dict: best为最短秒数，median为中位数秒数
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {'best': min(timings), 'median': statistics.median(timings)}
+
+
+def prepare_database(size, seed, work_dir, db_dir=None):
+    """准备指定规模的测试数据库
+
+    指定db_dir时生成的数据库保存在其中，之后相同规模、种子和表结构版本的测试直接复制使用；
+    测试会修改数据库，因此总是在work_dir中的副本上进行。
+
+    Args:
+        size: 名言数量
+        seed: 随机种子
+        work_dir: 临时目录
+        db_dir: 缓存生成结果的目录，为None时不缓存
+
+    Returns:
+        tuple: (测试数据库路径, 生成语料的秒数，使用缓存时为None)
+    """
+    name = f"corpus-{size}-{seed}-v{len(database.MIGRATIONS)}.db"
+    source = os.path.join(db_dir or work_dir, name)
+    build_seconds = None
+
+    if not os.path.exists(source):
+        database.DB_PATH = source
+        database.init_db()
+        started = time.perf_counter()
+        generate_corpus(seed=seed, progress=None, count=size)
+        build_seconds = time.perf_counter() - started
+        # 关闭连接时WAL写回主文件，之后可以直接复制
+        database.close_db_connection()
+
+    path = os.path.join(work_dir, f"benchmark-{size}.db")
+    if source != path:
+        shutil.copyfile(source, path)
+    return path, build_seconds
+
+
+def make_quotes(prefix, count):
+    """生成插入测试用的新名言
+
+    Args:
+        prefix: 内容前缀，保证与已有数据和其他轮次不重复
+        count: 名言数量
+
+    Returns:
+        list: Quote对象列表
+    """
+    return [Quote(content=f"{prefix}-{i}", pinyin="jī zhǔn cè shì", author="佚名",
+                  dynasty="", sentiment="中性", meaning="基准测试数据", category="生活")
+            for i in range(count)]
+
+
+def seed_duplicates(conn):
+    """每隔DUPLICATE_STRIDE条复制一条已有名言，作为待清理的重复数据
+
+    调用前需删除内容唯一索引。
+
+    Args:
+        conn: 数据库连接
+
+    Returns:
+        int: 复制的记录数量
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(quote_entries)') if row[1] != 'id']
+    column_list = ', '.join(columns)
+    with database.transaction():
+        cursor = conn.execute(f'''
+        INSERT INTO quote_entries ({column_list})
+        SELECT {column_list} FROM quote_entries WHERE id % ? = 0 ORDER BY id
+        ''', (DUPLICATE_STRIDE,))
+    database.clear_quote_cache()
+    return cursor.rowcount
+
+
+def run_size(size, seed, repeat, work_dir, db_dir=None):
+    """在一个规模上运行全部基准测试
+
+    先运行只读测试，再运行会修改数据的写入和清理测试。
+
+    Args:
+        size: 名言数量
+        seed: 随机种子
+        repeat: 每项测试的重复次数
+        work_dir: 临时目录
+        db_dir: 缓存生成结果的目录
+
+    Returns:
+        list: 测试结果，每项含size、name、ops（每轮操作次数）、best、median
+    """
+    path, build_seconds = prepare_database(size, seed, work_dir, db_dir)
+    database.DB_PATH = path
+    database.init_db()
+    conn = database.get_db_connection()
+
+    results = []
+
+    def record(name, ops, timing):
+        result = {'size': size, 'name': name, 'ops': ops, **timing}
+        results.append(result)
+        print(f"  {name:<40} {timing['best'] * 1000:>10.2f} ms  "
+              f"({timing['best'] / ops * 1e6:.1f} µs/次)")
+
+    if build_seconds is not None:
+        record('generate_corpus', size, {'best': build_seconds, 'median': build_seconds})
+
+    # 分页：每个排序字段的首页、中间页和末页
+    total_pages = (database.get_quote_count() + PAGE_SIZE - 1) // PAGE_SIZE
+    positions = {'first': 1, 'middle': max(total_pages // 2, 1), 'last': max(total_pages, 1)}
+    for order_by in database.SORT_FIELDS:
+        for position, page in positions.items():
+            timing = measure(lambda: database.get_quotes_by_page(page, PAGE_SIZE, order_by, 'asc'), repeat)
+            record(f"get_quotes_by_page/{order_by}/{position}", 1, timing)
+
+    # 按内容查找：未命中缓存和命中缓存两种情况
+    rng = random.Random(seed)
+    max_id = conn.execute('SELECT MAX(id) FROM quote_entries').fetchone()[0]
+    contents = []
+    while len(contents) < LOOKUP_SAMPLES:
+        row = database.get_quote_by_id(rng.randint(1, max_id))
+        if row is not None:
+            contents.append(row['content'])
+
+    def lookup_all():
+        for content in contents:
+            database.get_quote_by_content(content)
+
+    # 清空单行缓存，使每轮都从数据库读取
+    record('get_quote_by_content/cold', LOOKUP_SAMPLES,
+           measure(lookup_all, repeat, setup=database.clear_quote_cache))
+    lookup_all()
+    record('get_quote_by_content/cached', LOOKUP_SAMPLES, measure(lookup_all, repeat))
+
+    # 全量读取
+    heavy_repeat = min(repeat, HEAVY_REPEAT)
+    record('get_all_quotes', size, measure(database.get_all_quotes, heavy_repeat))
+    record('iter_quotes', size,
+           measure(lambda: sum(1 for _ in database.iter_quotes()), heavy_repeat))
+
+    # 写入：每轮使用新的内容
+    rounds = counter()
+
+    def insert_single():
+        for quote in make_quotes(f"基准单条{next(rounds)}", SINGLE_INSERTS):
+            database.insert_quote(quote)
+
+    def insert_batch():
+        database.insert_quotes(make_quotes(f"基准批量{next(rounds)}", BULK_ROWS))
+
+    def insert_bulk():
+        quotes = make_quotes(f"基准导入{next(rounds)}", BULK_ROWS)
+        database.bulk_insert_quotes([[quote.to_params() for quote in quotes]])
+
+    record('insert_quote', SINGLE_INSERTS, measure(insert_single, repeat))
+    record('insert_quotes', BULK_ROWS, measure(insert_batch, repeat))
+    record('bulk_insert_quotes', BULK_ROWS, measure(insert_bulk, repeat))
+
+    # 清理重复：删除内容唯一索引后复制一部分记录，放在最后，不影响其他测试
+    conn.execute('DROP INDEX idx_quote_entries_content')
+    last_id = conn.execute('SELECT MAX(id) FROM quote_entries').fetchone()[0]
+    duplicate_count = seed_duplicates(conn)
+    record('clean_duplicate_quotes/dry_run', duplicate_count,
+           measure(lambda: database.clean_duplicate_quotes(dry_run=True), heavy_repeat))
+    with database.transaction():
+        conn.execute('DELETE FROM quote_entries WHERE id > ?', (last_id,))
+    record('clean_duplicate_quotes', duplicate_count,
+           measure(database.clean_duplicate_quotes, heavy_repeat, setup=lambda: seed_duplicates(conn)))
+    conn.execute('CREATE UNIQUE INDEX idx_quote_entries_content ON quote_entries (content)')
+
+    database.close_db_connection()
+    return results
+
+
+def run(args):
+    """运行基准测试并写入JSON结果
+
+    Args:
+        args: 命令行参数
+    """
+    work_dir = tempfile.mkdtemp()
+    if args.db_dir:
+        os.makedirs(args.db_dir, exist_ok=True)
+
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"数据规模 {size}:")
+            results += run_size(size, args.seed, args.repeat, work_dir, args.db_dir)
+    finally:
+        database.close_db_connection()
+        shutil.rmtree(work_dir)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """对比两次测试结果
+
+    Args:
+        baseline: 基准结果（run写出的JSON对象）
+        current: 当前结果
+        threshold: 最短耗时增加超过该比例视为回退
+
+    Returns:
+        list: 每项为(名称, 规模, 基准秒数, 当前秒数, 变化比例, 是否回退)，只含两边都有的项目
+    """
+    before = {(item['size'], item['name']): item['best'] for item in baseline['results']}
+
+    rows = []
+    for item in current['results']:
+        key = (item['size'], item['name'])
+        if key not in before:
+            continue
+        old, new = before[key], item['best']
+        change = new / old - 1 if old > 0 else 0.0
+        rows.append((item['name'], item['size'], old, new, change, change > threshold))
+    return rows
+
+
+def compare(args):
+    """对比两个结果文件并打印，有回退时返回1
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        int: 退出状态码
+    """
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.threshold)
+    for name, size, old, new, change, regressed in rows:
+        mark = "  <- 回退" if regressed else ""
+        print(f"{size:>8} {name:<40} {old * 1000:>10.2f} ms -> {new * 1000:>10.2f} ms "
+              f"({change * 100:+.1f}%){mark}")
+
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"共 {len(regressions)} 项耗时增加超过 {args.threshold * 100:.0f}%")
+        return 1
+    print(f"未发现超过 {args.threshold * 100:.0f}% 的回退")
+    return 0
+
+
+def main():
+    """解析命令行参数并执行子命令"""
+    parser = argparse.ArgumentParser(description="数据库操作基准测试套件")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="运行基准测试")
+    run_parser.add_argument("--sizes", type=int, nargs='+', default=list(DEFAULT_SIZES),
+                            help="测试的数据规模")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="结果JSON文件")
+    run_parser.add_argument("--db-dir", help="缓存生成的测试数据库的目录，重复运行时跳过生成")
+    run_parser.add_argument("--repeat", type=int, default=5, help="每项测试的重复次数")
+    run_parser.add_argument("--seed", type=int, default=42, help="生成语料的随机种子")
+
+    compare_parser = subparsers.add_parser('compare', help="对比两次测试结果")
+    compare_parser.add_argument("baseline", help="基准结果JSON文件")
+    compare_parser.add_argument("current", help="当前结果JSON文件")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="耗时增加超过该比例视为回退，默认0.2即20%%")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
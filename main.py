@@ -4,9 +4,21 @@
 名言名句收集项目主入口文件
 """
 
+import argparse
+import re
 import sys
-from quotes.database import init_db, get_all_quotes, get_quote_by_id, clean_duplicate_quotes
+from quotes.database import (init_db, get_quotes_by_cursor, get_quote_count, get_quote_by_id,
+                             clean_duplicate_quotes, search_quotes, search_pinyin,
+                             count_quotes_by, close_db_connection, DuplicateQuotesError,
+                             enable_query_metrics, disable_query_metrics, reset_query_metrics,
+                             get_query_metrics)
+from quotes.instrumentation import format_query_metrics
+from quotes.profiling import add_arguments, configure, profile_action
 from quotes.spider import crawl_quotes, generate_mass_quotes
+from quotes.corpus import generate_corpus, rows_for_scale
+
+# 只由字母、空格和隔音符号组成的关键词同时按拼音检索
+PINYIN_QUERY = re.compile(r"[A-Za-z' ]+")
 
 
 def display_quote(quote):
@@ -31,41 +43,202 @@ def display_quote(quote):
     print("=====================================\n")
 
 
-def view_quotes():
-    """查看名言列表"""
-    quotes = get_all_quotes()
+def view_quotes(page_size=20):
+    """分页查看名言列表
+    
+    按需从数据库逐页读取，内存占用与名言总数无关。每页用游标单独查询，
+    等待输入时不保留打开的读游标，不会阻塞WAL检查点。
+    
+    Args:
+        page_size: 每页显示的数量
+    """
+    total_count = get_quote_count()
     
-    if not quotes:
+    if total_count == 0:
         print("数据库中暂无名言数据")
         return
     
-    print(f"\n数据库中共有 {len(quotes)} 条名言:\n")
+    print(f"\n数据库中共有 {total_count} 条名言:\n")
+    
+    cursor = None
+    start = 0
     
-    for i, quote in enumerate(quotes, 1):
-        print(f"{i}. [{quote['id']}] {quote['content']} - {quote['author']}")
+    while True:
+        with profile_action("list"):
+            direction = 'first' if cursor is None else 'next'
+            page, _, cursor = get_quotes_by_cursor(cursor, page_size, 'id', 'asc', direction)
+        
+        if not page:
+            print("已经是最后一页")
+            return
+        
+        for i, quote in enumerate(page, start + 1):
+            print(f"{i}. [{quote['id']}] {quote['content']} - {quote['author']}")
+        
+        has_more = start + len(page) < total_count
+        
+        # 选择查看详情或翻页
+        if has_more:
+            choice = input("\n请输入序号查看详情，直接回车查看下一页，或输入0返回主菜单: ")
+        else:
+            choice = input("\n请输入序号查看详情，或输入0返回主菜单: ")
+        
+        if choice == "0":
+            return
+        
+        if choice == "" and has_more:
+            start += len(page)
+            continue
+        
+        try:
+            index = int(choice) - start - 1
+            if 0 <= index < len(page):
+                with profile_action("detail"):
+                    quote = get_quote_by_id(page[index]['id'])
+                display_quote(quote)
+                input("按回车键返回...")
+            else:
+                print("无效序号")
+        except ValueError:
+            print("无效输入")
+        return
+
+
+def search_view():
+    """全文检索名言，关键词为拼音时先列出按拼音（全拼或首字母）匹配的名言"""
+    query = input("请输入检索关键词（多个关键词用空格分隔，也可输入拼音或拼音首字母）: ").strip()
+    if not query:
+        return
     
-    # 选择查看详情
-    choice = input("\n请输入序号查看详情，或输入0返回主菜单: ")
+    pinyin_results = []
+    if PINYIN_QUERY.fullmatch(query):
+        with profile_action("search-pinyin"):
+            pinyin_results = search_pinyin(query, limit=20)
+        if pinyin_results:
+            print("拼音匹配:")
+            for quote in pinyin_results:
+                print(f"[{quote['id']}] {quote['content']} - {quote['author']}（{quote['pinyin']}）")
+            print("全文匹配:")
     
-    if choice == "0":
+    cursor = None
+    while True:
+        with profile_action("search"):
+            results, cursor = search_quotes(query, limit=20, cursor=cursor)
+        
+        if not results:
+            print("未找到全文匹配的名言" if pinyin_results else "未找到匹配的名言")
+            return
+        
+        for quote in results:
+            print(f"[{quote['id']}] {quote['snippet']} - {quote['author']}")
+        
+        if cursor is None:
+            return
+        
+        choice = input("\n输入n查看更多结果，其他键返回: ")
+        if choice.lower() != "n":
+            return
+
+
+def clean_duplicates():
+    """清理重复数据，先统计待清理数量再确认删除"""
+    with profile_action("dedupe-scan"):
+        duplicate_count = clean_duplicate_quotes(dry_run=True)
+    
+    if duplicate_count == 0:
+        print("未发现重复数据")
+        return
+    
+    confirm = input(f"发现 {duplicate_count} 条重复数据，确认删除？(y/n): ")
+    if confirm.lower() != "y":
+        print("已取消清理")
         return
     
+    def report_progress(deleted_count, total_count):
+        print(f"已删除 {deleted_count}/{total_count} 条重复数据")
+    
+    with profile_action("dedupe"):
+        deleted_count = clean_duplicate_quotes(progress_callback=report_progress)
+    print(f"清理完成，共删除 {deleted_count} 条重复数据")
+
+
+def generate_test_corpus():
+    """按规模因子生成合成测试语料"""
     try:
-        index = int(choice) - 1
-        if 0 <= index < len(quotes):
-            display_quote(quotes[index])
-            input("按回车键返回...")
-        else:
-            print("无效序号")
+        scale = float(input("请输入规模因子（1为10万条，10为100万条，默认1）: ") or 1)
+        seed = int(input("请输入随机种子（默认42）: ") or 42)
     except ValueError:
         print("无效输入")
+        return
+    
+    if scale <= 0:
+        print("规模因子必须大于0")
+        return
+    
+    confirm = input(f"将生成 {rows_for_scale(scale)} 条名言，确认？(y/n): ")
+    if confirm.lower() != "y":
+        print("已取消生成")
+        return
+    
+    with profile_action("corpus"):
+        generate_corpus(scale, seed)
+
+
+def statistics_view():
+    """按分类和朝代统计名言数量"""
+    for field, label in (("category", "分类"), ("dynasty", "朝代")):
+        counts = count_quotes_by(field)
+        print(f"\n按{label}统计:")
+        if not counts:
+            print("暂无数据")
+        for name, quote_count in counts.items():
+            print(f"{name or '未知'}: {quote_count}")
+
+
+def query_metrics_view():
+    """查看查询统计，未开启时询问是否开启"""
+    snapshot = get_query_metrics()
+    
+    if snapshot is None:
+        confirm = input("查询统计未开启，是否开启？(y/n): ")
+        if confirm.lower() == "y":
+            enable_query_metrics()
+            print("已开启查询统计，之后的操作将被记录，慢查询会输出到标准错误")
+        return
+    
+    print()
+    print(format_query_metrics(snapshot))
+    
+    choice = input("\n输入r清空统计，输入d关闭统计，其他键返回: ")
+    if choice.lower() == "r":
+        reset_query_metrics()
+        print("已清空查询统计")
+    elif choice.lower() == "d":
+        disable_query_metrics()
+        print("已关闭查询统计")
+
+
+def initialize_database():
+    """初始化数据库，旧数据库有重复内容时确认后先清理再升级"""
+    try:
+        init_db()
+    except DuplicateQuotesError as e:
+        confirm = input(f"发现 {e.duplicate_count} 条重复数据，升级数据库前需要删除，确认删除？(y/n): ")
+        if confirm.lower() != "y":
+            print("已取消，数据库未升级，程序退出")
+            close_db_connection()
+            sys.exit(1)
+        
+        deleted_count = clean_duplicate_quotes()
+        print(f"清理完成，共删除 {deleted_count} 条重复数据")
+        init_db()
 
 
 def main():
     """主函数"""
     # 自动初始化数据库
     print("正在初始化数据库...")
-    init_db()
+    initialize_database()
     print("数据库初始化完成")
     
     print("\n名言名句收集项目")
@@ -73,23 +246,40 @@ def main():
     print("2. 查看名言列表")
     print("3. 清理重复数据")
     print("4. 批量生成名言数据")
-    print("5. 退出")
+    print("5. 检索名言")
+    print("6. 生成测试语料")
+    print("7. 查询统计")
+    print("8. 分类统计")
+    print("9. 退出")
     
     choice = input("请选择操作: ")
     
+    # 性能分析模式下每个操作单独分析，未开启时profile_action不做任何事；
+    # 需要输入的操作只分析输入之间的数据库和网络操作，不计入等待输入的时间
     if choice == "1":
-        crawl_quotes()
+        with profile_action("crawl"):
+            crawl_quotes()
         print("爬取完成")
     elif choice == "2":
         view_quotes()
     elif choice == "3":
-        deleted_count = clean_duplicate_quotes()
-        print(f"清理完成，共删除 {deleted_count} 条重复数据")
+        clean_duplicates()
     elif choice == "4":
-        generate_mass_quotes(10000)
+        with profile_action("generate"):
+            generate_mass_quotes(10000)
         print("批量生成完成")
     elif choice == "5":
+        search_view()
+    elif choice == "6":
+        generate_test_corpus()
+    elif choice == "7":
+        query_metrics_view()
+    elif choice == "8":
+        with profile_action("statistics"):
+            statistics_view()
+    elif choice == "9":
         print("退出程序")
+        close_db_connection()
         sys.exit(0)
     else:
         print("无效选择，请重新输入")
@@ -100,4 +290,7 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="名言名句收集项目")
+    add_arguments(parser)
+    configure(parser.parse_args())
     main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内缓存模块，提供带容量上限和过期时间的LRU缓存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+# 区分"未命中"和"缓存的值为None"
+_MISSING = object()
+
+
+class LRUCache:
+    """线程安全的LRU缓存
+
+    超过容量时淘汰最久未访问的条目，超过有效期的条目在访问时视为未命中并删除。
+    值可以是None（如"记录不存在"），同样会被缓存。
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        """初始化缓存
+
+        Args:
+            maxsize: 最多保留的条目数
+            ttl: 条目有效期，单位秒，为None时不过期
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize必须大于0")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """读取缓存
+
+        Args:
+            key: 键
+            default: 未命中时返回的值
+
+        Returns:
+            缓存的值，未命中或已过期时返回default
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_or_load(self, key, loader):
+        """读取缓存，未命中时调用loader加载并写入缓存
+
+        加载期间缓存被清空（数据发生了变化）时，加载到的值可能已过时，只返回不缓存。
+
+        Args:
+            key: 键
+            loader: 无参函数，返回要缓存的值
+
+        Returns:
+            缓存的值或新加载的值
+        """
+        generation = self._generation
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.put(key, value, generation)
+        return value
+
+    def put(self, key, value, generation=None):
+        """写入缓存，超过容量时淘汰最久未访问的条目
+
+        Args:
+            key: 键
+            value: 值
+            generation: 读取value之前的缓存代数，之后缓存被清空过则不写入
+        """
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存，数据变化后调用"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """获取缓存统计
+
+        Returns:
+            dict: 命中、未命中、淘汰、过期、失效次数，当前条目数和命中率
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成名言语料生成器，按规模因子生成确定性的测试数据，用于容量和性能测试
+"""
+
+import os
+import random
+from collections import deque
+from itertools import accumulate
+from multiprocessing import Pool
+
+from quotes.database import bulk_insert_quotes, refresh_statistics
+from quotes.jobs import CancelToken, ProgressTracker, print_progress
+from quotes.pinyin import normalize_pinyin, pinyin_initials
+
+
+# 规模因子为1时的名言数量：0.1为1万条，10为100万条，100为1000万条
+ROWS_PER_SCALE = 100000
+
+# 每个生成任务的条数，也是每个写入事务的条数
+CHUNK_SIZE = 10000
+
+# 常用字及其拼音，按使用频率从高到低排列，生成内容时按齐夫分布取字
+_CHARS = ("之不而人者以其天有无为心道德知行君子于大学时习亦乎地小山水月日风云花春秋年古今长远志"
+          "善恶言信义礼仁智勇思问读书见闻千万里一百家国民生死忧乐明清静朝夕去来登高望海江河林"
+          "木石金玉青白红酒歌路门身名成功多少难易新故如自得失必可所欲勿施师友和同寒暑光阴尽流归乡游")
+_PINYIN = ("zhī bù ér rén zhě yǐ qí tiān yǒu wú wéi xīn dào dé zhī xíng jūn zǐ yú dà xué shí xí yì "
+           "hū dì xiǎo shān shuǐ yuè rì fēng yún huā chūn qiū nián gǔ jīn cháng yuǎn zhì shàn è yán "
+           "xìn yì lǐ rén zhì yǒng sī wèn dú shū jiàn wén qiān wàn lǐ yī bǎi jiā guó mín shēng sǐ yōu "
+           "lè míng qīng jìng zhāo xī qù lái dēng gāo wàng hǎi jiāng hé lín mù shí jīn yù qīng bái "
+           "hóng jiǔ gē lù mén shēn míng chéng gōng duō shǎo nán yì xīn gù rú zì dé shī bì kě suǒ yù "
+           "wù shī shī yǒu hé tóng hán shǔ guāng yīn jìn liú guī xiāng yóu").split()
+
+# 作者及其朝代，按名言数量从多到少排列，作者按齐夫分布抽取，朝代随作者确定
+AUTHORS = (
+    ("孔子", "春秋时期"), ("李白", "唐代"), ("苏轼", "北宋"), ("佚名", ""), ("杜甫", "唐代"),
+    ("孟子", "战国时期"), ("老子", "春秋时期"), ("庄子", "战国时期"), ("白居易", "唐代"),
+    ("陆游", "南宋"), ("辛弃疾", "南宋"), ("王维", "唐代"), ("荀子", "战国时期"),
+    ("屈原", "战国时期"), ("韩愈", "唐代"), ("欧阳修", "北宋"), ("范仲淹", "北宋"),
+    ("王安石", "北宋"), ("李商隐", "唐代"), ("刘禹锡", "唐代"), ("司马迁", "西汉"),
+    ("诸葛亮", "三国"), ("陶渊明", "东晋"), ("朱熹", "南宋"), ("王阳明", "明代"),
+    ("文天祥", "南宋"), ("王勃", "唐代"), ("刘安", "西汉"), ("罗大经", "南宋"),
+    ("顾炎武", "清代"), ("曹雪芹", "清代"), ("林则徐", "清代"),
+)
+
+# 分类和褒贬的相对权重
+CATEGORY_WEIGHTS = (("哲理", 22), ("修身", 18), ("教育", 16), ("情感", 14), ("生活", 12),
+                    ("道德", 10), ("治国", 8))
+SENTIMENT_WEIGHTS = (("褒义", 62), ("中性", 30), ("贬义", 8))
+
+_CLAUSE_LENGTHS = ((4, 3), (5, 4), (7, 3))
+_CLAUSE_COUNTS = ((1, 1), (2, 7), (4, 2))
+_MEANING_PREFIXES = ("比喻", "形容", "指", "说明", "劝诫人们", "表达")
+_USAGE_SCENES = ("鼓励学习", "人际交往", "励志", "送别友人", "思乡怀人", "修身养性", "批评劝诫",
+                 "治国理政", "团队合作", "感悟人生")
+_BOOKS = ("论语", "孟子", "道德经", "庄子", "史记", "左传", "诗经", "楚辞", "全唐诗", "宋词",
+          "资治通鉴", "古文观止")
+_ENGLISH_WORDS = ("the", "way", "heart", "learn", "friend", "mountain", "river", "virtue", "time",
+                  "people", "wise", "long", "road", "moon", "spring", "home")
+
+
+def rows_for_scale(scale):
+    """计算规模因子对应的名言数量
+
+    Args:
+        scale: 规模因子
+
+    Returns:
+        int: 名言数量，四舍五入以免浮点误差少算一条（如0.29得到28999）
+    """
+    return round(scale * ROWS_PER_SCALE)
+
+
+def _zipf_cum_weights(count, exponent):
+    """按齐夫分布计算累计权重，排名越靠前权重越大
+
+    Args:
+        count: 取值个数
+        exponent: 分布指数，越大越集中在头部
+
+    Returns:
+        list: 累计权重，可直接传给random.choices
+    """
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+_CHAR_CUM_WEIGHTS = _zipf_cum_weights(len(_CHARS), 0.8)
+_AUTHOR_CUM_WEIGHTS = _zipf_cum_weights(len(AUTHORS), 1.1)
+
+
+def _weighted(rng, pairs, k):
+    """按权重从(取值, 权重)中抽取k个取值
+
+    Args:
+        rng: random.Random对象
+        pairs: (取值, 权重)元组
+        k: 抽取个数
+
+    Returns:
+        list: 取值列表
+    """
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights, k=k)
+
+
+def _text(rng, length):
+    """按常用字频率生成一段文字及其拼音
+
+    Args:
+        rng: random.Random对象
+        length: 字数
+
+    Returns:
+        tuple: (文字, 以空格分隔的带声调拼音)
+    """
+    indexes = rng.choices(range(len(_CHARS)), cum_weights=_CHAR_CUM_WEIGHTS, k=length)
+    return ''.join(_CHARS[i] for i in indexes), ' '.join(_PINYIN[i] for i in indexes)
+
+
+def _generate_chunk(seed, chunk_index, count):
+    """生成一个任务的名言参数，在生成进程中执行
+
+    每个任务使用由种子和任务序号确定的随机数生成器，结果与进程数和执行顺序无关。
+
+    Args:
+        seed: 随机种子
+        chunk_index: 任务序号
+        count: 名言数量
+
+    Returns:
+        list: 参数元组列表，按Quote.FIELDS顺序排列，末尾附带规范化拼音和首字母
+    """
+    rng = random.Random(f"{seed}:{chunk_index}")
+
+    authors = rng.choices(AUTHORS, cum_weights=_AUTHOR_CUM_WEIGHTS, k=count)
+    categories = _weighted(rng, CATEGORY_WEIGHTS, count)
+    sentiments = _weighted(rng, SENTIMENT_WEIGHTS, count)
+    clause_counts = _weighted(rng, _CLAUSE_COUNTS, count)
+
+    rows = []
+    for i in range(count):
+        clauses = [_text(rng, length)
+                   for length in _weighted(rng, _CLAUSE_LENGTHS, clause_counts[i])]
+        content = '，'.join(text for text, _ in clauses)
+        pinyin = '，'.join(syllables for _, syllables in clauses)
+
+        meaning = rng.choice(_MEANING_PREFIXES) + _text(rng, rng.randint(8, 24))[0]
+        usage_scene = rng.choice(_USAGE_SCENES)
+        allusion = f"出自《{rng.choice(_BOOKS)}》" if rng.random() < 0.35 else ""
+        translation = ""
+        if rng.random() < 0.2:
+            words = rng.choices(_ENGLISH_WORDS, k=rng.randint(4, 10))
+            translation = ' '.join(words).capitalize() + '.'
+        usage_notes = f"用于{usage_scene}的场合" if rng.random() < 0.5 else ""
+
+        author, dynasty = authors[i]
+        pinyin_plain = normalize_pinyin(pinyin)
+        rows.append((content, pinyin, author, dynasty, sentiments[i], meaning, usage_scene,
+                     categories[i], allusion, translation, usage_notes,
+                     pinyin_plain, pinyin_initials(pinyin_plain)))
+    return rows
+
+
+def iter_corpus(count, seed=42, processes=None, chunk_size=CHUNK_SIZE):
+    """在多个进程中并行生成语料，按任务顺序逐块返回
+
+    同时进行的任务不超过进程数的两倍，消费方（写入）慢于生成时生成进程等待，
+    内存中最多保留这些任务的结果。
+
+    Args:
+        count: 名言数量
+        seed: 随机种子，相同的种子、数量和chunk_size生成相同的语料
+        processes: 生成进程数，为None时使用CPU核数
+        chunk_size: 每个任务的条数
+
+    Yields:
+        list: 一个任务生成的参数元组列表
+    """
+    processes = processes or os.cpu_count() or 1
+    chunks = ((seed, index, min(chunk_size, count - start))
+              for index, start in enumerate(range(0, count, chunk_size)))
+
+    with Pool(processes) as pool:
+        window = processes * 2
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_generate_chunk, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def generate_corpus(scale=1.0, seed=42, processes=None, defer_fts=True, progress=print_progress,
+                    cancel_token=None, count=None):
+    """按规模因子或名言数量生成合成语料并导入数据库
+
+    多个进程并行生成，当前进程作为唯一的写入方批量导入，内容已存在的名言跳过。
+    作者按齐夫分布抽取（少数作者占多数名言），朝代随作者确定，分类、褒贬按固定权重抽取。
+
+    Args:
+        scale: 规模因子，名言数量为scale * ROWS_PER_SCALE
+        seed: 随机种子，相同的种子和规模生成相同的语料
+        processes: 生成进程数，为None时使用CPU核数
+        defer_fts: 是否在导入结束后再建立全文索引
+        progress: 进度回调，参数为quotes.jobs.Progress，默认打印到命令行
+        cancel_token: quotes.jobs.CancelToken对象，为None时不可取消
+        count: 名言数量，指定时忽略scale，相同的种子和数量生成相同的语料
+
+    Returns:
+        tuple: (插入数量, 跳过数量)
+
+    Raises:
+        JobCancelled: 通过cancel_token取消，已写入的批次保留
+    """
+    if count is None:
+        count = rows_for_scale(scale)
+    cancel_token = cancel_token or CancelToken()
+    tracker = ProgressTracker(progress, count)
+    print(f"开始生成 {count} 条合成名言（规模因子 {count / ROWS_PER_SCALE:g}，种子 {seed}）...")
+
+    def batches():
+        done = 0
+        for rows in iter_corpus(count, seed, processes):
+            # 在批次之间检查取消，已提交的批次保留
+            cancel_token.raise_if_cancelled()
+            yield rows
+            done += len(rows)
+            tracker.update(done)
+
+    try:
+        inserted_count, skipped_count = bulk_insert_quotes(batches(), defer_fts=defer_fts)
+    finally:
+        refresh_statistics()
+
+    tracker.update(inserted_count + skipped_count, force=True)
+    print(f"生成完成，共写入 {inserted_count} 条新名言，跳过 {skipped_count} 条已存在的名言")
+    return inserted_count, skipped_count
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步爬虫引擎，支持并发抓取、按主机限速和失败重试
+"""
+
+import asyncio
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import takewhile
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from quotes.http_client import get_http_client
+from quotes.profiling import bind_current
+
+
+# 默认的名言API地址
+DEFAULT_API_BASE_URL = "https://api.quotable.io/"
+
+# 需要重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """重试耗尽后仍无法获取响应"""
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    令牌以rate个/秒的速度补充，最多积累capacity个，每次请求消耗一个令牌。
+    """
+
+    def __init__(self, rate, capacity):
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量，即允许的突发请求数
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate必须大于0，capacity必须不小于1")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncCrawler:
+    """异步爬虫
+
+    用信号量限制同时进行的请求数，用每个主机一个的令牌桶限制请求速率，
+    网络错误和可重试的状态码按指数退避加随机抖动重试。
+    阻塞的HTTP请求在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, base_url=DEFAULT_API_BASE_URL, max_in_flight=8, rate=5.0, burst=5,
+                 max_retries=3, backoff=0.5, max_backoff=10.0, timeout=10, session=None):
+        """初始化爬虫
+
+        Args:
+            base_url: API根地址，测试时可指向本地模拟服务
+            max_in_flight: 同时进行的最大请求数
+            rate: 每个主机每秒允许的请求数
+            burst: 每个主机允许的突发请求数
+            max_retries: 失败后的最大重试次数
+            backoff: 首次重试前的基础等待秒数，之后每次翻倍
+            max_backoff: 单次重试等待的上限秒数
+            timeout: 单个请求的超时秒数
+            session: requests.Session或HttpClient等提供get()的对象，
+                为None时使用带连接池和磁盘缓存的共享客户端
+        """
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = session or get_http_client()
+
+        self._buckets = {}
+        self._semaphore = None
+        self._executor = None
+        self._loop = None
+        self._task = None
+
+    def _bucket_for(self, url):
+        """获取URL所属主机的令牌桶
+
+        Args:
+            url: 请求地址
+
+        Returns:
+            TokenBucket: 令牌桶
+        """
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def _retry_delay(self, attempt, response=None):
+        """计算第attempt次重试前的等待时间
+
+        优先遵循响应中的Retry-After，否则使用带全抖动的指数退避。
+
+        Args:
+            attempt: 重试次数，从1开始
+            response: 触发重试的响应，网络错误时为None
+
+        Returns:
+            float: 等待秒数
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    async def fetch(self, path, params=None, headers=None):
+        """抓取一个地址，按需限速和重试
+
+        Args:
+            path: 相对于base_url的路径
+            params: 查询参数
+            headers: 额外的请求头
+
+        Returns:
+            requests.Response: 最终响应（状态码不在重试范围内）
+
+        Raises:
+            FetchError: 重试耗尽仍失败
+        """
+        url = urljoin(self.base_url, path)
+        bucket = self._bucket_for(url)
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+
+            response = None
+            error = None
+            async with self._semaphore:
+                try:
+                    response = await loop.run_in_executor(
+                        self._executor,
+                        bind_current(lambda: self.session.get(url, params=params, headers=headers,
+                                                              timeout=self.timeout))
+                    )
+                except requests.RequestException as e:
+                    error = e
+
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                return response
+
+            if attempt == self.max_retries:
+                reason = error if error is not None else f"HTTP {response.status_code}"
+                raise FetchError(f"请求 {url} 失败: {reason}")
+
+            await asyncio.sleep(self._retry_delay(attempt + 1, response))
+
+    async def fetch_pages(self, path, pages, page_param="page", params=None, on_page=None,
+                          headers_for=None):
+        """并发抓取多个分页
+
+        max_in_flight个协程轮流从pages中取页码，一页完成后才取下一页，
+        pages可以是惰性的可迭代对象，不再产生页码（如已取消）后不会发出新请求。
+
+        Args:
+            path: 相对于base_url的路径
+            pages: 页码的可迭代对象
+            page_param: 页码参数名
+            params: 其他查询参数
+            on_page: 每页完成时调用的回调，参数为(页码, 响应或异常)
+            headers_for: 根据页码返回额外请求头（如条件请求头）的函数，返回None表示没有
+
+        Returns:
+            list: 与pages顺序一致的(页码, 响应或异常)列表
+        """
+        numbered_pages = enumerate(pages)
+        results = {}
+
+        async def fetch_pages_in_turn():
+            # 事件循环是单线程的，各协程共用同一个迭代器不会重复取页
+            for index, page in numbered_pages:
+                query = dict(params or {})
+                query[page_param] = page
+                try:
+                    headers = headers_for(page) if headers_for is not None else None
+                    result = await self.fetch(path, params=query, headers=headers)
+                except Exception as e:
+                    result = e
+                if on_page is not None:
+                    on_page(page, result)
+                results[index] = (page, result)
+
+        await asyncio.gather(*(fetch_pages_in_turn() for _ in range(self.max_in_flight)))
+        return [results[index] for index in sorted(results)]
+
+    def iter_pages(self, path, pages, page_param="page", params=None, headers_for=None):
+        """在后台线程中并发抓取多个分页，按完成顺序逐页返回
+
+        调用方提前停止迭代（关闭生成器）时不再取新的页码，并取消等待中的限速和重试，
+        已发出的请求完成后后台线程结束。
+
+        Args:
+            path: 相对于base_url的路径
+            pages: 页码的可迭代对象
+            page_param: 页码参数名
+            params: 其他查询参数
+            headers_for: 根据页码返回额外请求头的函数
+
+        Yields:
+            tuple: (页码, 响应或异常)
+        """
+        results = queue.Queue()
+        done = object()
+        stopped = threading.Event()
+        pages = takewhile(lambda _: not stopped.is_set(), pages)
+
+        def crawl():
+            try:
+                self.run(self.fetch_pages, path, pages, page_param, params,
+                         on_page=lambda page, result: results.put((page, result)),
+                         headers_for=headers_for)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                results.put(done)
+
+        thread = threading.Thread(target=bind_current(crawl), daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            stopped.set()
+            self.cancel()
+
+        thread.join()
+
+    def cancel(self):
+        """取消run()中正在执行的协程，可在其他线程调用
+
+        限速和重试的等待立即结束，线程池中已发出的请求完成后run()抛出CancelledError。
+        """
+        loop, task = self._loop, self._task
+        if task is None:
+            return
+        try:
+            loop.call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            # 事件循环已经结束
+            pass
+
+    def run(self, coroutine_function, *args, **kwargs):
+        """在新的事件循环中运行爬虫协程
+
+        Args:
+            coroutine_function: 以本爬虫方法为主体的协程函数，如self.fetch_pages
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            协程的返回值
+        """
+        async def main():
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._buckets = {}
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.current_task()
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                self._executor = executor
+                try:
+                    return await coroutine_function(*args, **kwargs)
+                finally:
+                    self._executor = None
+                    self._task = None
+
+        return asyncio.run(main())
@@ -6,29 +6,257 @@
 
 import sqlite3
 import os
+import json
+import base64
+import threading
+from contextlib import contextmanager
+from quotes import instrumentation
+from quotes.cache import LRUCache
+from quotes.instrumentation import InstrumentedConnection, instrumented
 from quotes.models import Quote
+from quotes.pinyin import PinyinIndex, normalize_pinyin, pinyin_initials
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'quotes.db')
 
+# 连接打开时执行一次的PRAGMA设置
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -64000),      # 约64MB页缓存
+    ('mmap_size', 268435456),    # 256MB内存映射
+    ('temp_store', 'MEMORY'),
+)
 
-def get_db_connection():
-    """获取数据库连接
+# quotes表的全部字段
+QUOTE_COLUMNS = [
+    'id', 'content', 'pinyin', 'author', 'dynasty', 'sentiment', 'meaning', 'usage_scene',
+    'category', 'allusion', 'translation', 'usage_notes', 'created_at',
+    'pinyin_plain', 'pinyin_initials',
+]
+
+# 字典编码的字段及其查找表：quote_entries中保存查找表的整数ID，quotes视图还原为文本
+LOOKUP_TABLES = (
+    ('author', 'authors'),
+    ('dynasty', 'dynasties'),
+    ('sentiment', 'sentiments'),
+    ('category', 'categories'),
+)
+
+# 读取语句中查找表的别名，名言表quote_entries的别名为e
+_LOOKUP_ALIASES = {'author': 'a', 'dynasty': 'd', 'sentiment': 's', 'category': 'c'}
+
+# 允许排序的字段
+SORT_FIELDS = ['id', 'content', 'author', 'dynasty', 'created_at']
+
+# 每个线程持有一个长连接
+_local = threading.local()
+
+# 短关键词索引中代替空白和标点的分隔词元。检索时关键词按单个字符拆分，
+# 多字符的分隔词元只会被同样含有标点的关键词命中，并阻止跨越空白和标点的相邻匹配
+_SHORT_TERM_BREAK = '00'
+
+# 拼音前缀索引，数据库路径 -> {'index', 'last_id', 'row_count', 'rebuilding'}；
+# 首次检索时构建，之后按新增记录增量更新，有记录被删除时在后台重新构建
+_pinyin_indexes = {}
+_pinyin_index_lock = threading.Lock()
+
+# get_quote_by_id/get_quote_by_content的单行缓存，写入或删除名言后整体失效；
+# 其他进程修改数据库时无法感知，最多在ttl秒后读到新数据
+QUOTE_CACHE_SIZE = 2048
+QUOTE_CACHE_TTL = 300.0
+_quote_cache = LRUCache(QUOTE_CACHE_SIZE, QUOTE_CACHE_TTL)
+
+
+
+class DuplicateQuotesError(Exception):
+    """数据库中有内容重复的名言，无法建立content唯一索引，需要先调用clean_duplicate_quotes()清理"""
+    
+    def __init__(self, duplicate_count):
+        """记录重复数量
+        
+        Args:
+            duplicate_count: 待清理的重复名言数量
+        """
+        super().__init__(f"数据库中有 {duplicate_count} 条重复的名言，需要先清理重复数据才能升级数据库")
+        self.duplicate_count = duplicate_count
+
+
+def _open_connection(db_path):
+    """打开新的数据库连接并应用PRAGMA设置
+    
+    连接使用InstrumentedConnection，开启查询统计后无需重新打开即可统计每条语句。
+    
+    Args:
+        db_path: 数据库文件路径
     
     Returns:
         sqlite3.Connection: 数据库连接对象
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path, timeout=30, factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row
+    # 短关键词索引的触发器调用，所有写入名言的连接都必须注册
+    conn.create_function('split_chars', 1, _split_chars, deterministic=True)
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def get_db_connection():
+    """获取当前线程的数据库连接
+    
+    同一线程内复用同一个连接，首次调用时打开并应用PRAGMA设置。
+    调用方不应关闭该连接，线程结束前调用close_db_connection()释放。
+    
+    Returns:
+        sqlite3.Connection: 数据库连接对象
+    """
+    conn = getattr(_local, 'conn', None)
+    
+    # DB_PATH被修改后（如切换数据库文件）重新打开连接
+    if conn is not None and _local.db_path != DB_PATH:
+        close_db_connection()
+        conn = None
+    
+    if conn is None:
+        conn = _open_connection(DB_PATH)
+        _local.conn = conn
+        _local.db_path = DB_PATH
+        _local.tx_depth = 0
+        _local.quotes_changed = False
+        # 查找表的ID缓存，查找表 -> {取值: ID}，随连接创建和关闭，
+        # 不会把旧数据库文件（如删除后在同一路径重建）的ID写入新文件
+        _local.lookup_ids = {}
+    
     return conn
 
 
+def close_db_connection():
+    """关闭当前线程的数据库连接"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.db_path = None
+        _local.lookup_ids = {}
+        _local.tx_depth = 0
+        _local.quotes_changed = False
+
+
+@contextmanager
+def transaction():
+    """显式事务上下文管理器
+    
+    正常退出时提交，发生异常时回滚。支持嵌套使用，
+    只有最外层事务负责提交或回滚。
+    
+    Yields:
+        sqlite3.Connection: 当前线程的数据库连接
+    """
+    conn = get_db_connection()
+    depth = _local.tx_depth
+    
+    if depth == 0:
+        conn.execute('BEGIN')
+    _local.tx_depth = depth + 1
+    
+    try:
+        yield conn
+    except BaseException:
+        _local.tx_depth = depth
+        if depth == 0:
+            conn.rollback()
+            # 事务内读到并缓存的数据可能已随回滚失效
+            _local.quotes_changed = False
+            _quote_cache.clear()
+        raise
+    
+    _local.tx_depth = depth
+    if depth == 0:
+        try:
+            conn.commit()
+        finally:
+            # 提交后其他连接才能读到新数据，此时才清空缓存，
+            # 避免提交前按旧数据重新填充的缓存条目一直保留到过期
+            if _local.quotes_changed:
+                _local.quotes_changed = False
+                _quote_cache.clear()
+
+
+@instrumented
 def init_db():
-    """初始化数据库，创建quotes表"""
+    """初始化数据库，按版本号依次执行尚未应用的迁移，并刷新查询规划器的统计信息
+    
+    Raises:
+        DuplicateQuotesError: 旧数据库中有重复内容，需确认后调用clean_duplicate_quotes()清理，
+            再重新调用init_db()；已完成的迁移保留
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
+    version = get_schema_version()
+    
+    # 迁移可能重建查找表
+    _local.lookup_ids = {}
+    
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        # 每个迁移在独立事务中执行，成功后才更新版本号
+        with transaction():
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {number}')
+    
+    _repair_deferred_fts(conn)
+    refresh_statistics()
+
+
+@instrumented
+def refresh_statistics(force=False):
+    """在数据量明显变化后重新收集查询规划器的统计信息（sqlite_stat1）
+    
+    连接查找表的查询（如检索结果和外部工具通过quotes视图的查询）没有准确的统计信息时，
+    规划器可能全表扫描后排序，选错连接顺序。
+    采样（analysis_limit）得到的行数估计不准，会选错连接顺序，因此做完整的ANALYZE，
+    只在记录数与上次统计相差一倍以上时执行。
+    
+    Args:
+        force: 为True时无论数据量是否变化都重新统计
+    
+    Returns:
+        bool: 是否执行了ANALYZE
+    """
+    conn = get_db_connection()
+    
+    if not force and _has_table(conn, 'sqlite_stat1'):
+        row = conn.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = 'quote_entries' AND idx IS NULL"
+        ).fetchone() or conn.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = 'quote_entries'"
+        ).fetchone()
+        if row is not None:
+            analyzed_count = int(row[0].split()[0])
+            current_count = get_quote_count()
+            if analyzed_count / 2 <= current_count <= analyzed_count * 2:
+                return False
+    
+    with transaction():
+        conn.execute('ANALYZE')
+    return True
+
+
+def get_schema_version():
+    """获取数据库当前的结构版本号
+    
+    Returns:
+        int: 已应用的迁移数量（PRAGMA user_version）
+    """
+    conn = get_db_connection()
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _migrate_create_quotes_table(conn):
+    """迁移1：创建quotes表
     
-    # 创建quotes表
-    cursor.execute('''
+    Args:
+        conn: 数据库连接
+    """
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS quotes (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         content TEXT NOT NULL,
@@ -45,200 +273,1792 @@ def init_db():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     ''')
-    
-    conn.commit()
-    conn.close()
 
 
-def insert_quote(quote):
-    """插入名言数据
+def _migrate_unique_content_index(conn):
+    """迁移2：创建content唯一索引
+    
+    索引已存在时直接返回。有重复内容时不自动删除用户数据，抛出DuplicateQuotesError，
+    由调用方确认后用clean_duplicate_quotes()清理（它同样适用于这一版本的quotes表）。
     
     Args:
-        quote: Quote对象
+        conn: 数据库连接
+    
+    Raises:
+        DuplicateQuotesError: 存在重复内容
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_quotes_content'"
+    )
+    if cursor.fetchone():
+        return
+    
+    duplicate_count = conn.execute(
+        'SELECT COUNT(*) FROM quotes WHERE id NOT IN (SELECT MIN(id) FROM quotes GROUP BY content)'
+    ).fetchone()[0]
+    if duplicate_count:
+        raise DuplicateQuotesError(duplicate_count)
     
-    cursor.execute('''
-    INSERT INTO quotes (content, pinyin, author, dynasty, sentiment, meaning, 
-                       usage_scene, category, allusion, translation, usage_notes)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        quote.content,
-        quote.pinyin,
-        quote.author,
-        quote.dynasty,
-        quote.sentiment,
-        quote.meaning,
-        quote.usage_scene,
-        quote.category,
-        quote.allusion,
-        quote.translation,
-        quote.usage_notes
-    ))
-    
-    conn.commit()
-    conn.close()
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_quotes_content ON quotes (content)')
 
 
-def get_quote_count():
-    """获取名言数量
-    
-    Returns:
-        int: 名言数量
-    """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _migrate_sort_and_filter_indexes(conn):
+    """迁移3：为排序字段和筛选字段建立索引
     
-    cursor.execute('SELECT COUNT(*) FROM quotes')
-    count = cursor.fetchone()[0]
+    索引隐含rowid（即id），可同时满足按(字段, id)排序和游标定位。
     
-    conn.close()
-    return count
+    Args:
+        conn: 数据库连接
+    """
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_quotes_author ON quotes (author)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_quotes_dynasty ON quotes (dynasty)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_quotes_created_at ON quotes (created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_quotes_category ON quotes (category)')
 
 
-def get_all_quotes(order_by='id', order_dir='asc'):
-    """获取所有名言
+def _migrate_full_text_search(conn):
+    """迁移4：建立全文检索表quotes_fts，并用触发器与quotes保持同步
     
-    Args:
-        order_by: 排序字段，默认为'id'
-        order_dir: 排序方向，默认为'asc'（升序），'desc'为降序
+    使用FTS5的trigram分词器，按三字滑动窗口建立索引，适用于不以空格分词的中文。
+    当前SQLite不支持FTS5或trigram（需3.34+）时跳过，search_quotes退化为LIKE查询。
     
-    Returns:
-        list: 名言列表，每个元素是sqlite3.Row对象
+    Args:
+        conn: 数据库连接
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(
+            content, meaning, translation, allusion,
+            content='quotes', content_rowid='id', tokenize='trigram'
+        )
+        ''')
+    except sqlite3.OperationalError:
+        return
     
-    # 验证排序字段
-    valid_fields = ['id', 'content', 'author', 'dynasty', 'created_at']
-    if order_by not in valid_fields:
-        order_by = 'id'
+    _create_fts_triggers(conn, 'quotes')
     
-    # 验证排序方向
-    if order_dir not in ['asc', 'desc']:
-        order_dir = 'asc'
+    # 为已有数据建立索引
+    conn.execute("INSERT INTO quotes_fts (quotes_fts) VALUES ('rebuild')")
+
+
+def _create_fts_triggers(conn, table):
+    """在名言数据表上创建与quotes_fts保持同步的触发器
     
-    cursor.execute(f'SELECT * FROM quotes ORDER BY {order_by} {order_dir}')
-    quotes = cursor.fetchall()
+    Args:
+        conn: 数据库连接
+        table: 名言数据表名
+    """
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO quotes_fts (rowid, content, meaning, translation, allusion)
+        VALUES (new.id, new.content, new.meaning, new.translation, new.allusion);
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO quotes_fts (quotes_fts, rowid, content, meaning, translation, allusion)
+        VALUES ('delete', old.id, old.content, old.meaning, old.translation, old.allusion);
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_au
+    AFTER UPDATE OF content, meaning, translation, allusion ON {table} BEGIN
+        INSERT INTO quotes_fts (quotes_fts, rowid, content, meaning, translation, allusion)
+        VALUES ('delete', old.id, old.content, old.meaning, old.translation, old.allusion);
+        INSERT INTO quotes_fts (rowid, content, meaning, translation, allusion)
+        VALUES (new.id, new.content, new.meaning, new.translation, new.allusion);
+    END
+    ''')
+
+
+def _migrate_pinyin_columns(conn):
+    """迁移5：增加规范化拼音和首字母字段，并为已有数据回填
+    
+    Args:
+        conn: 数据库连接
+    """
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(quotes)')}
+    if 'pinyin_plain' not in columns:
+        conn.execute('ALTER TABLE quotes ADD COLUMN pinyin_plain TEXT')
+    if 'pinyin_initials' not in columns:
+        conn.execute('ALTER TABLE quotes ADD COLUMN pinyin_initials TEXT')
     
-    conn.close()
-    return quotes
+    cursor = conn.execute('SELECT id, pinyin FROM quotes WHERE pinyin_plain IS NULL')
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        
+        params = []
+        for row in rows:
+            plain = normalize_pinyin(row['pinyin'])
+            params.append((plain, pinyin_initials(plain), row['id']))
+        conn.executemany(
+            'UPDATE quotes SET pinyin_plain = ?, pinyin_initials = ? WHERE id = ?', params
+        )
 
 
-def get_quotes_by_page(page=1, page_size=10, order_by='id', order_dir='asc'):
-    """分页获取名言
+def _migrate_crawl_state(conn):
+    """迁移6：创建爬取状态表，记录各数据源的断点和HTTP缓存校验信息
     
     Args:
-        page: 页码，从1开始
-        page_size: 每页数量
-        order_by: 排序字段
-        order_dir: 排序方向
+        conn: 数据库连接
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS crawl_state (
+        source TEXT PRIMARY KEY,
+        cursor TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        last_success_at TIMESTAMP
+    )
+    ''')
+
+
+def _migrate_dictionary_encoding(conn):
+    """迁移7：作者、朝代、褒贬、分类改为查找表中的整数ID
     
-    Returns:
-        tuple: (名言列表, 总页数)
+    名言数据迁入quote_entries表，四个字段改为authors、dynasties、sentiments、
+    categories查找表的ID；再建立同名的quotes视图连接查找表还原文本字段，供外部工具使用。
+    本模块的读取直接连接quote_entries和需要的查找表（见_quote_select()），
+    写入和删除直接操作quote_entries。
+    
+    查找表的name为NOT NULL UNIQUE，NULL统一存为空字符串，视图和读取时还原为NULL
+    （见_create_quotes_view()，原来的空字符串同样读作NULL）。这样按作者等字段排序时，
+    可以按name索引顺序遍历查找表，再按(外键, id)索引取名言，不需要额外排序。
+    
+    Args:
+        conn: 数据库连接
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    for field, table in LOOKUP_TABLES:
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        ''')
+        conn.execute(f'''
+        INSERT OR IGNORE INTO {table} (name)
+        SELECT DISTINCT COALESCE({field}, '') FROM quotes ORDER BY 1
+        ''')
     
-    # 验证排序字段
-    valid_fields = ['id', 'content', 'author', 'dynasty', 'created_at']
-    if order_by not in valid_fields:
-        order_by = 'id'
+    conn.execute('''
+    CREATE TABLE quote_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content TEXT NOT NULL,
+        pinyin TEXT,
+        author_id INTEGER NOT NULL REFERENCES authors (id),
+        dynasty_id INTEGER NOT NULL REFERENCES dynasties (id),
+        sentiment_id INTEGER NOT NULL REFERENCES sentiments (id),
+        meaning TEXT,
+        usage_scene TEXT,
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        allusion TEXT,
+        translation TEXT,
+        usage_notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        pinyin_plain TEXT,
+        pinyin_initials TEXT
+    )
+    ''')
+    conn.execute('''
+    INSERT INTO quote_entries (id, content, pinyin, author_id, dynasty_id, sentiment_id,
+                               meaning, usage_scene, category_id, allusion, translation,
+                               usage_notes, created_at, pinyin_plain, pinyin_initials)
+    SELECT q.id, q.content, q.pinyin, a.id, d.id, s.id, q.meaning, q.usage_scene, c.id,
+           q.allusion, q.translation, q.usage_notes, q.created_at, q.pinyin_plain,
+           q.pinyin_initials
+    FROM quotes q
+    JOIN authors a ON a.name = COALESCE(q.author, '')
+    JOIN dynasties d ON d.name = COALESCE(q.dynasty, '')
+    JOIN sentiments s ON s.name = COALESCE(q.sentiment, '')
+    JOIN categories c ON c.name = COALESCE(q.category, '')
+    ORDER BY q.id
+    ''')
     
-    # 验证排序方向
-    if order_dir not in ['asc', 'desc']:
-        order_dir = 'asc'
+    # 保留自增序列，已删除记录的ID不会被重新使用
+    conn.execute('''
+    UPDATE sqlite_sequence
+    SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'quotes'), 0))
+    WHERE name = 'quote_entries'
+    ''')
     
-    # 获取总记录数
-    cursor.execute('SELECT COUNT(*) FROM quotes')
-    total_count = cursor.fetchone()[0]
+    # 删除旧表时其索引和全文检索触发器一并删除
+    conn.execute('DROP TABLE quotes')
     
-    # 计算总页数
-    total_pages = (total_count + page_size - 1) // page_size
+    _create_quotes_view(conn)
     
-    # 计算偏移量
-    offset = (page - 1) * page_size
+    conn.execute('CREATE UNIQUE INDEX idx_quote_entries_content ON quote_entries (content)')
+    conn.execute('CREATE INDEX idx_quote_entries_author ON quote_entries (author_id)')
+    conn.execute('CREATE INDEX idx_quote_entries_dynasty ON quote_entries (dynasty_id)')
+    conn.execute('CREATE INDEX idx_quote_entries_category ON quote_entries (category_id)')
+    conn.execute('CREATE INDEX idx_quote_entries_created_at ON quote_entries (created_at)')
     
-    # 分页查询
-    cursor.execute(
-        f'SELECT * FROM quotes ORDER BY {order_by} {order_dir} LIMIT ? OFFSET ?',
-        (page_size, offset)
-    )
-    quotes = cursor.fetchall()
+    # quotes_fts以quotes视图作为外部内容表，rowid不变，索引无需重建
+    if _has_table(conn, 'quotes_fts'):
+        _create_fts_triggers(conn, 'quote_entries')
+
+
+def _migrate_short_term_index(conn):
+    """迁移9：建立短关键词索引quotes_short_fts，使1~2个字符的关键词不再全表LIKE扫描
     
-    conn.close()
-    return quotes, total_pages
+    三元组索引无法检索少于3个字符的关键词。quotes_short_fts是无内容（content=''）的
+    FTS5表，四个检索字段经split_chars()拆成以空格分隔的单个字符后用unicode61分词，
+    每个字符是一个词元，关键词作为短语（相邻的词元）检索。当前SQLite不支持FTS5时跳过。
+    
+    Args:
+        conn: 数据库连接
+    """
+    try:
+        conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS quotes_short_fts USING fts5(
+            content, meaning, translation, allusion, content='', tokenize='unicode61'
+        )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    
+    _index_quotes_after(conn, 'quotes_short_fts', 0)
 
 
-def get_quote_by_id(quote_id):
-    """根据ID获取名言
+def _split_chars(text):
+    """把文本拆成以空格分隔的单个字符，供短关键词索引使用（SQL函数split_chars）
+    
+    字母和数字各自成为一个词元，空白和标点替换为分隔词元。
     
     Args:
-        quote_id: 名言ID
+        text: 文本，可以为None
     
     Returns:
-        sqlite3.Row: 名言数据
+        str: 拆分后的文本，text为None时返回None
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if text is None:
+        return None
+    return ' '.join(char if char.isalnum() else _SHORT_TERM_BREAK for char in text)
+
+
+def _create_short_fts_triggers(conn):
+    """在quote_entries上创建与quotes_short_fts保持同步的触发器
     
-    cursor.execute('SELECT * FROM quotes WHERE id = ?', (quote_id,))
-    quote = cursor.fetchone()
+    无内容的FTS5表删除时需要提供原来写入的值，由split_chars()按旧记录重新计算。
     
-    conn.close()
-    return quote
+    Args:
+        conn: 数据库连接
+    """
+    new_values = ('new.id, split_chars(new.content), split_chars(new.meaning), '
+                  'split_chars(new.translation), split_chars(new.allusion)')
+    old_values = ('old.id, split_chars(old.content), split_chars(old.meaning), '
+                  'split_chars(old.translation), split_chars(old.allusion)')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quotes_short_fts_ai AFTER INSERT ON quote_entries BEGIN
+        INSERT INTO quotes_short_fts (rowid, content, meaning, translation, allusion)
+        VALUES ({new_values});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quotes_short_fts_ad AFTER DELETE ON quote_entries BEGIN
+        INSERT INTO quotes_short_fts (quotes_short_fts, rowid, content, meaning, translation,
+                                      allusion)
+        VALUES ('delete', {old_values});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quotes_short_fts_au
+    AFTER UPDATE OF content, meaning, translation, allusion ON quote_entries BEGIN
+        INSERT INTO quotes_short_fts (quotes_short_fts, rowid, content, meaning, translation,
+                                      allusion)
+        VALUES ('delete', {old_values});
+        INSERT INTO quotes_short_fts (rowid, content, meaning, translation, allusion)
+        VALUES ({new_values});
+    END
+    ''')
 
 
-def get_quote_by_content(content):
-    """根据内容检查名言是否已存在
+def _index_quotes_after(conn, table, last_id):
+    """为ID大于last_id的名言建立全文索引，并创建（恢复）该索引的同步触发器
     
     Args:
-        content: 名言内容
+        conn: 数据库连接
+        table: 全文检索表，quotes_fts或quotes_short_fts
+        last_id: 已建立索引的最大ID
+    """
+    if table == 'quotes_fts':
+        conn.execute('''
+        INSERT INTO quotes_fts (rowid, content, meaning, translation, allusion)
+        SELECT id, content, meaning, translation, allusion FROM quote_entries WHERE id > ?
+        ''', (last_id,))
+        _create_fts_triggers(conn, 'quote_entries')
+    else:
+        conn.execute('''
+        INSERT INTO quotes_short_fts (rowid, content, meaning, translation, allusion)
+        SELECT id, split_chars(content), split_chars(meaning), split_chars(translation),
+               split_chars(allusion)
+        FROM quote_entries WHERE id > ?
+        ''', (last_id,))
+        _create_short_fts_triggers(conn)
+
+
+def _create_quotes_view(conn):
+    """创建连接查找表还原文本字段的quotes视图
     
-    Returns:
-        sqlite3.Row: 名言数据，如果不存在返回None
+    查找表中空字符串的name代表NULL，视图还原为NULL，与字典编码前读到的值一致。
+    
+    Args:
+        conn: 数据库连接
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    conn.execute('''
+    CREATE VIEW IF NOT EXISTS quotes AS
+    SELECT e.id, e.content, e.pinyin, NULLIF(a.name, '') AS author,
+           NULLIF(d.name, '') AS dynasty, NULLIF(s.name, '') AS sentiment,
+           e.meaning, e.usage_scene, NULLIF(c.name, '') AS category,
+           e.allusion, e.translation, e.usage_notes, e.created_at,
+           e.pinyin_plain, e.pinyin_initials
+    FROM quote_entries e
+    JOIN authors a ON a.id = e.author_id
+    JOIN dynasties d ON d.id = e.dynasty_id
+    JOIN sentiments s ON s.id = e.sentiment_id
+    JOIN categories c ON c.id = e.category_id
+    ''')
+
+
+def _migrate_quote_counters(conn):
+    """迁移8：创建由触发器维护的计数表quote_counters
+    
+    scope为'total'（key为0）、'category'或'dynasty'（key为查找表ID），
+    名言的插入、删除和分类/朝代变化时由触发器增减对应计数，
+    总数和按分类、朝代的数量都只需读取一行或几行。
     
-    cursor.execute('SELECT * FROM quotes WHERE content = ?', (content,))
-    quote = cursor.fetchone()
+    Args:
+        conn: 数据库连接
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS quote_counters (
+        scope TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        quote_count INTEGER NOT NULL,
+        PRIMARY KEY (scope, key)
+    ) WITHOUT ROWID
+    ''')
+    
+    increment = '''
+        INSERT INTO quote_counters (scope, key, quote_count) VALUES ({scope}, {key}, 1)
+        ON CONFLICT (scope, key) DO UPDATE SET quote_count = quote_count + 1;
+    '''
+    decrement = '''
+        UPDATE quote_counters SET quote_count = quote_count - 1
+        WHERE scope = {scope} AND key = {key};
+    '''
+    
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quote_counters_ai AFTER INSERT ON quote_entries BEGIN
+        {increment.format(scope="'total'", key='0')}
+        {increment.format(scope="'category'", key='new.category_id')}
+        {increment.format(scope="'dynasty'", key='new.dynasty_id')}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quote_counters_ad AFTER DELETE ON quote_entries BEGIN
+        {decrement.format(scope="'total'", key='0')}
+        {decrement.format(scope="'category'", key='old.category_id')}
+        {decrement.format(scope="'dynasty'", key='old.dynasty_id')}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quote_counters_au
+    AFTER UPDATE OF category_id, dynasty_id ON quote_entries BEGIN
+        {decrement.format(scope="'category'", key='old.category_id')}
+        {increment.format(scope="'category'", key='new.category_id')}
+        {decrement.format(scope="'dynasty'", key='old.dynasty_id')}
+        {increment.format(scope="'dynasty'", key='new.dynasty_id')}
+    END
+    ''')
     
-    conn.close()
-    return quote
+    _rebuild_quote_counters(conn)
 
 
-def clean_duplicate_quotes():
-    """清理重复的名言数据
+def _migrate_lookup_nulls(conn):
+    """迁移10：重建quotes视图，把查找表中代表NULL的空字符串还原为NULL
+    
+    迁移7创建的视图直接返回查找表的name，原本为NULL的作者、朝代、褒贬、分类读出为空字符串。
+    
+    Args:
+        conn: 数据库连接
+    """
+    conn.execute('DROP VIEW IF EXISTS quotes')
+    _create_quotes_view(conn)
+
+
+# 结构迁移列表，序号即版本号，只能在末尾追加
+MIGRATIONS = [
+    _migrate_create_quotes_table,
+    _migrate_unique_content_index,
+    _migrate_sort_and_filter_indexes,
+    _migrate_full_text_search,
+    _migrate_pinyin_columns,
+    _migrate_crawl_state,
+    _migrate_dictionary_encoding,
+    _migrate_quote_counters,
+    _migrate_short_term_index,
+    _migrate_lookup_nulls,
+]
+
+# quote_counters中按字段计数的scope，与quote_entries的外键列对应
+COUNTER_SCOPES = ('category', 'dynasty')
+
+
+@instrumented
+def insert_quote(quote):
+    """插入名言数据
     
+    Args:
+        quote: Quote对象
+    """
+    _insert_batch([_quote_params(quote)])
+
+
+@instrumented
+def insert_quotes(quotes, batch_size=500):
+    """批量插入名言数据
+
+    使用executemany按批次写入，每个批次在一个事务中提交，
+    避免逐条插入时反复建立连接和提交。
+
+    Args:
+        quotes: Quote对象的可迭代对象
+        batch_size: 每个事务写入的条数
+
+    Returns:
+        int: 插入的记录数量
+    """
+    inserted_count = 0
+
+    for batch in _iter_param_batches(quotes, batch_size):
+        inserted_count += _insert_batch(batch)
+
+    return inserted_count
+
+
+@instrumented
+def insert_or_ignore_quotes(quotes, batch_size=500):
+    """批量插入名言数据，跳过内容已存在的记录
+
+    依赖content上的唯一索引（INSERT OR IGNORE），无需在写入前逐条查询是否已存在。
+
+    Args:
+        quotes: Quote对象的可迭代对象
+        batch_size: 每个事务写入的条数
+
+    Returns:
+        tuple: (插入数量, 跳过数量)
+    """
+    inserted_count = 0
+    skipped_count = 0
+
+    for batch in _iter_param_batches(quotes, batch_size):
+        inserted = _insert_batch(batch, ignore_duplicates=True)
+        inserted_count += inserted
+        skipped_count += len(batch) - inserted
+
+    return inserted_count, skipped_count
+
+
+@instrumented
+def bulk_insert_quotes(batches, defer_fts=True):
+    """大批量导入名言，跳过内容已存在的记录
+
+    每批在一个事务中写入。逐条由触发器更新全文索引是大批量导入的主要开销，
+    defer_fts为True时导入期间暂停全文索引（包括短关键词索引）的插入触发器，结束（包括中途出错或取消）后
+    用一条INSERT ... SELECT为新增记录建立索引。进程意外退出时，下次init_db()会恢复
+    触发器并重建索引。导入期间不应同时删除或修改名言。
+
+    Args:
+        batches: 参数列表的可迭代对象，每个参数元组按Quote.FIELDS顺序排列，
+            可在末尾附带规范化拼音和首字母（如已在生成进程中计算）
+        defer_fts: 是否推迟建立全文索引
+
     Returns:
-        int: 清理的重复数据数量
+        tuple: (插入数量, 跳过数量)
     """
     conn = get_db_connection()
-    cursor = conn.cursor()
+    deferred_tables = [table for table in ('quotes_fts', 'quotes_short_fts')
+                       if defer_fts and _has_table(conn, table)]
     
-    # 查找重复的名言内容
-    cursor.execute('''
-    SELECT content, MIN(id) as keep_id
-    FROM quotes
-    GROUP BY content
-    HAVING COUNT(*) > 1
-    ''')
-    duplicates = cursor.fetchall()
+    if deferred_tables:
+        # 先删除触发器再读取最大ID，之后写入的记录（包括其他连接写入的）都在该ID之后
+        with transaction():
+            for table in deferred_tables:
+                conn.execute(f'DROP TRIGGER IF EXISTS {table}_ai')
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM quote_entries').fetchone()[0]
     
-    deleted_count = 0
+    inserted_count = 0
+    skipped_count = 0
     
-    # 删除重复数据，保留最小ID的记录
-    for duplicate in duplicates:
-        content = duplicate['content']
-        keep_id = duplicate['keep_id']
-        
-        # 删除除了keep_id之外的所有相同内容的记录
-        cursor.execute('DELETE FROM quotes WHERE content = ? AND id != ?', (content, keep_id))
-        deleted_count += cursor.rowcount
+    try:
+        for batch in batches:
+            params = []
+            for row in batch:
+                if len(row) == len(Quote.FIELDS):
+                    pinyin_plain = normalize_pinyin(row[1])
+                    row = tuple(row) + (pinyin_plain, pinyin_initials(pinyin_plain))
+                params.append(row)
+            
+            inserted = _insert_batch(params, ignore_duplicates=True)
+            inserted_count += inserted
+            skipped_count += len(params) - inserted
+    finally:
+        if deferred_tables:
+            with transaction():
+                for table in deferred_tables:
+                    _index_quotes_after(conn, table, last_id)
+    
+    return inserted_count, skipped_count
+
+
+def _repair_deferred_fts(conn):
+    """bulk_insert_quotes()中途退出时全文索引的插入触发器处于暂停状态，恢复触发器并重建索引
+    
+    Args:
+        conn: 数据库连接
+    """
+    if _has_table(conn, 'quotes_fts') and not _has_trigger(conn, 'quotes_fts_ai'):
+        with transaction():
+            _create_fts_triggers(conn, 'quote_entries')
+            conn.execute("INSERT INTO quotes_fts (quotes_fts) VALUES ('rebuild')")
     
-    conn.commit()
-    conn.close()
+    # 无内容的表不支持rebuild，清空后重新写入
+    if _has_table(conn, 'quotes_short_fts') and not _has_trigger(conn, 'quotes_short_fts_ai'):
+        with transaction():
+            conn.execute("INSERT INTO quotes_short_fts (quotes_short_fts) VALUES ('delete-all')")
+            _index_quotes_after(conn, 'quotes_short_fts', 0)
+
+
+def _iter_param_batches(quotes, batch_size):
+    """将Quote对象按批次转换为插入参数
+
+    Args:
+        quotes: Quote对象的可迭代对象
+        batch_size: 每批的条数
+
+    Yields:
+        list: 参数元组列表
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size必须大于0")
+
+    batch = []
+
+    for quote in quotes:
+        batch.append(_quote_params(quote))
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _quote_params(quote):
+    """将Quote对象转换为插入参数，并计算规范化拼音字段
+    
+    Args:
+        quote: Quote对象
+    
+    Returns:
+        tuple: 与_insert_batch中列顺序一致的参数元组
+    """
+    pinyin_plain = normalize_pinyin(quote.pinyin)
+    return quote.to_params() + (pinyin_plain, pinyin_initials(pinyin_plain))
+
+
+def _insert_batch(batch, ignore_duplicates=False):
+    """在一个事务中写入一批名言参数
+
+    Args:
+        batch: 参数元组列表
+        ignore_duplicates: 是否跳过内容已存在的记录
+
+    Returns:
+        int: 实际写入的记录数量
+    """
+    verb = 'INSERT OR IGNORE' if ignore_duplicates else 'INSERT'
+
+    # 嵌套在外层事务中时，新建的查找表记录要等外层提交后才能缓存
+    outermost = getattr(_local, 'tx_depth', 0) == 0
+    new_ids = {}
+
+    with transaction() as conn:
+        cursor = conn.executemany(f'''
+        {verb} INTO quote_entries (content, pinyin, author_id, dynasty_id, sentiment_id, meaning,
+                                   usage_scene, category_id, allusion, translation, usage_notes,
+                                   pinyin_plain, pinyin_initials)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', _encode_lookup_fields(conn, batch, new_ids))
+
+    if outermost:
+        for table, ids in new_ids.items():
+            _local.lookup_ids.setdefault(table, {}).update(ids)
+
+    if cursor.rowcount:
+        _on_quotes_changed()
+
+    return cursor.rowcount
+
+
+def _encode_lookup_fields(conn, batch, new_ids):
+    """把参数中的作者、朝代、褒贬、分类替换为查找表ID，不存在的取值先写入查找表
+    
+    Args:
+        conn: 数据库连接
+        batch: 参数元组列表
+        new_ids: 收集本次新查到的ID，查找表 -> {取值: ID}，提交后再并入当前连接的缓存
+    
+    Returns:
+        list: 替换后的参数列表
+    """
+    rows = [list(params) for params in batch]
+    
+    for field, table in LOOKUP_TABLES:
+        position = Quote.FIELDS.index(field)
+        cached = _local.lookup_ids.get(table, {})
+        pending = new_ids.setdefault(table, {})
+        
+        for row in rows:
+            name = '' if row[position] is None else row[position]
+            lookup_id = cached.get(name)
+            if lookup_id is None:
+                lookup_id = pending.get(name)
+            if lookup_id is None:
+                conn.execute(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', (name,))
+                lookup_id = conn.execute(
+                    f'SELECT id FROM {table} WHERE name = ?', (name,)
+                ).fetchone()[0]
+                pending[name] = lookup_id
+            row[position] = lookup_id
+    
+    return rows
+
+
+@instrumented
+def get_quote_count():
+    """获取名言数量，读取触发器维护的计数，耗时与数据量无关
+    
+    Returns:
+        int: 名言数量
+    """
+    conn = get_db_connection()
+    row = conn.execute(
+        "SELECT quote_count FROM quote_counters WHERE scope = 'total' AND key = 0"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+@instrumented
+def count_quotes_by(field):
+    """按作者、朝代、褒贬或分类统计名言数量
+    
+    分类和朝代读取触发器维护的计数；其他字段直接在quote_entries上按整数外键分组，
+    再连接查找表取名称，不经过quotes视图。
+    
+    Args:
+        field: 'author'、'dynasty'、'sentiment'或'category'
+    
+    Returns:
+        dict: 取值到名言数量的映射，按取值排序，不含数量为0的取值，没有取值的名言计在None下
+    """
+    tables = dict(LOOKUP_TABLES)
+    if field not in tables:
+        raise ValueError(f"不支持按该字段统计: {field}")
+    
+    conn = get_db_connection()
+    if field in COUNTER_SCOPES:
+        cursor = conn.execute(f'''
+        SELECT NULLIF(t.name, ''), counts.quote_count
+        FROM quote_counters counts
+        JOIN {tables[field]} t ON t.id = counts.key
+        WHERE counts.scope = ? AND counts.quote_count > 0
+        ORDER BY t.name
+        ''', (field,))
+    else:
+        cursor = conn.execute(f'''
+        SELECT NULLIF(t.name, ''), counts.quote_count
+        FROM (SELECT {field}_id AS lookup_id, COUNT(*) AS quote_count
+              FROM quote_entries GROUP BY {field}_id) counts
+        JOIN {tables[field]} t ON t.id = counts.lookup_id
+        ORDER BY t.name
+        ''')
+    return {name: quote_count for name, quote_count in cursor}
+
+
+@instrumented
+def check_quote_counters(rebuild=True):
+    """核对计数表与实际数据是否一致，不一致时重建
+    
+    计数由触发器维护，正常情况下总是一致；绕过触发器修改数据
+    （如关闭触发器的外部工具、手工修复数据库）后可用此函数修正。
+    需要对quote_entries做全表分组统计，耗时与数据量成正比。
+    
+    Args:
+        rebuild: 发现不一致时是否重建计数表
+    
+    Returns:
+        list: 不一致的计数，元素为(scope, key, 计数表中的值, 实际值)
+    """
+    conn = get_db_connection()
+    
+    with transaction():
+        stored = {(row['scope'], row['key']): row['quote_count']
+                  for row in conn.execute('SELECT * FROM quote_counters WHERE quote_count != 0')}
+        actual = {(scope, key): quote_count
+                  for scope, key, quote_count in conn.execute(_COUNTER_QUERY)}
+        
+        mismatches = [
+            (scope, key, stored.get((scope, key), 0), actual.get((scope, key), 0))
+            for scope, key in sorted(stored.keys() | actual.keys())
+            if stored.get((scope, key), 0) != actual.get((scope, key), 0)
+        ]
+        
+        if mismatches and rebuild:
+            _rebuild_quote_counters(conn)
+    
+    return mismatches
+
+
+# 从quote_entries统计出的全部计数，列为(scope, key, quote_count)
+_COUNTER_QUERY = '''
+SELECT 'total', 0, COUNT(*) FROM quote_entries
+UNION ALL
+SELECT 'category', category_id, COUNT(*) FROM quote_entries GROUP BY category_id
+UNION ALL
+SELECT 'dynasty', dynasty_id, COUNT(*) FROM quote_entries GROUP BY dynasty_id
+'''
+
+
+def _rebuild_quote_counters(conn):
+    """按quote_entries的实际数据重新生成计数表
+    
+    Args:
+        conn: 数据库连接，调用方负责事务
+    """
+    conn.execute('DELETE FROM quote_counters')
+    conn.execute(f'INSERT INTO quote_counters (scope, key, quote_count) {_COUNTER_QUERY}')
+
+
+def _normalize_order(order_by, order_dir):
+    """校验排序字段和方向，非法值回退为默认值
+    
+    Args:
+        order_by: 排序字段
+        order_dir: 排序方向
+    
+    Returns:
+        tuple: (排序字段, 排序方向)
+    """
+    if order_by not in SORT_FIELDS:
+        order_by = 'id'
+    
+    if order_dir not in ['asc', 'desc']:
+        order_dir = 'asc'
+    
+    return order_by, order_dir
+
+
+def _column_expression(column):
+    """字段在读取语句中的表达式
+    
+    Args:
+        column: quotes的字段名
+    
+    Returns:
+        str: 字典编码的字段为查找表的name，其余为quote_entries（别名e）的列
+    """
+    if column in _LOOKUP_ALIASES:
+        return f'{_LOOKUP_ALIASES[column]}.name'
+    return f'e.{column}'
+
+
+def _quote_select_list(columns=None):
+    """生成读取名言字段的SELECT列表，结果的字段名与quotes视图相同
+    
+    Args:
+        columns: 要读取的字段列表，默认为全部字段
+    
+    Returns:
+        str: SELECT列表
+    """
+    columns = QUOTE_COLUMNS if columns is None else columns
+    # 查找表中空字符串的name代表NULL
+    return ', '.join(
+        f"NULLIF({_column_expression(column)}, '') AS {column}" if column in _LOOKUP_ALIASES
+        else f'e.{column}'
+        for column in columns
+    )
+
+
+def _lookup_joins(columns=None, exclude=None):
+    """生成连接查找表的JOIN子句，只连接读取的字段用到的查找表
+    
+    Args:
+        columns: 要读取的字段列表，默认为全部字段
+        exclude: 已在FROM中出现、不需要再连接的字段
+    
+    Returns:
+        str: JOIN子句，没有需要连接的查找表时为空字符串
+    """
+    columns = QUOTE_COLUMNS if columns is None else columns
+    return ''.join(
+        f' JOIN {table} {_LOOKUP_ALIASES[field]} ON {_LOOKUP_ALIASES[field]}.id = e.{field}_id'
+        for field, table in LOOKUP_TABLES
+        if field in columns and field != exclude
+    )
+
+
+def _quote_select(columns=None, order_by='id'):
+    """生成读取名言的SELECT ... FROM ...，代替quotes视图
+    
+    视图总是连接全部四个查找表，这里只连接读取的字段和排序字段用到的查找表。
+    按作者、朝代等字段排序时以查找表为外层循环（CROSS JOIN固定连接顺序），
+    按name索引的顺序遍历，再按(外键, id)索引取名言，不需要额外排序，也不依赖ANALYZE统计信息。
+    
+    Args:
+        columns: 要读取的字段列表，默认为全部字段
+        order_by: 排序字段
+    
+    Returns:
+        str: SQL片段，名言表的别名为e
+    """
+    tables = dict(LOOKUP_TABLES)
+    if order_by in tables:
+        alias = _LOOKUP_ALIASES[order_by]
+        from_clause = (f'{tables[order_by]} {alias} '
+                       f'CROSS JOIN quote_entries e ON e.{order_by}_id = {alias}.id')
+    else:
+        from_clause = 'quote_entries e'
+    return (f'SELECT {_quote_select_list(columns)} '
+            f'FROM {from_clause}{_lookup_joins(columns, exclude=order_by)}')
+
+
+@instrumented
+def get_all_quotes(order_by='id', order_dir='asc'):
+    """获取所有名言
+    
+    数据量大时一次性读入内存开销很高，遍历全部数据请使用iter_quotes()。
+    
+    Args:
+        order_by: 排序字段，默认为'id'
+        order_dir: 排序方向，默认为'asc'（升序），'desc'为降序
+    
+    Returns:
+        list: 名言列表，每个元素是sqlite3.Row对象
+    """
+    return list(iter_quotes(order_by, order_dir))
+
+
+@instrumented
+def iter_quotes(order_by='id', order_dir='asc', batch_size=500, columns=None):
+    """逐批读取并逐条返回名言
+    
+    底层使用fetchmany，内存中最多只保留一批记录，占用与表大小无关。
+    
+    Args:
+        order_by: 排序字段，默认为'id'
+        order_dir: 排序方向，默认为'asc'（升序），'desc'为降序
+        batch_size: 每次从数据库读取的条数
+        columns: 要读取的字段列表，默认为全部字段
+    
+    Yields:
+        sqlite3.Row: 名言数据
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size必须大于0")
+    
+    if columns is not None:
+        unknown = [column for column in columns if column not in QUOTE_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知的字段: {', '.join(unknown)}")
+    
+    # 验证排序字段和方向
+    order_by, order_dir = _normalize_order(order_by, order_dir)
+    
+    order_clause = f'{_column_expression(order_by)} {order_dir}'
+    if order_by != 'id':
+        order_clause += f', e.id {order_dir}'
+    
+    conn = get_db_connection()
+    cursor = conn.execute(f'{_quote_select(columns, order_by)} ORDER BY {order_clause}')
+    
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+@instrumented
+def get_quotes_by_page(page=1, page_size=10, order_by='id', order_dir='asc'):
+    """分页获取名言
+    
+    Args:
+        page: 页码，从1开始
+        page_size: 每页数量
+        order_by: 排序字段
+        order_dir: 排序方向
+    
+    Returns:
+        tuple: (名言列表, 总页数)
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # 验证排序字段和方向
+    order_by, order_dir = _normalize_order(order_by, order_dir)
+    
+    # 获取总记录数
+    total_count = get_quote_count()
+    
+    # 计算总页数
+    total_pages = (total_count + page_size - 1) // page_size
+    
+    # 计算偏移量
+    offset = (page - 1) * page_size
+    
+    # 分页查询
+    cursor.execute(
+        f'{_quote_select(order_by=order_by)} '
+        f'ORDER BY {_column_expression(order_by)} {order_dir} LIMIT ? OFFSET ?',
+        (page_size, offset)
+    )
+    quotes = cursor.fetchall()
+    
+    return quotes, total_pages
+
+
+@instrumented
+def get_quotes_by_cursor(cursor=None, page_size=10, order_by='id', order_dir='asc', direction='next'):
+    """基于游标（keyset）分页获取名言
+    
+    以上一页边界记录的(排序值, id)作为起点定位，不使用OFFSET，
+    翻到任意位置的代价都与页码无关。
+    
+    Args:
+        cursor: 上一次返回的游标，direction为'first'或'last'时忽略
+        page_size: 每页数量
+        order_by: 排序字段
+        order_dir: 排序方向
+        direction: 'first'首页，'next'游标之后一页，'prev'游标之前一页，'last'末页
+    
+    Returns:
+        tuple: (名言列表, 上一页游标, 下一页游标)，没有数据时游标为None
+    """
+    if direction not in ('first', 'next', 'prev', 'last'):
+        raise ValueError(f"无效的翻页方向: {direction}")
+    
+    order_by, order_dir = _normalize_order(order_by, order_dir)
+    
+    # 没有游标时从两端开始
+    if cursor is None and direction == 'next':
+        direction = 'first'
+    elif cursor is None and direction == 'prev':
+        direction = 'last'
+    
+    # 向前翻页和取末页时反向扫描，取回后再倒序
+    backward = direction in ('prev', 'last')
+    ascending = (order_dir == 'asc') != backward
+    scan_dir = 'ASC' if ascending else 'DESC'
+    
+    if order_by == 'id':
+        order_clause = f'e.id {scan_dir}'
+    else:
+        order_clause = f'{_column_expression(order_by)} {scan_dir}, e.id {scan_dir}'
+    
+    if direction in ('next', 'prev'):
+        value, quote_id = _decode_cursor(cursor, order_by, order_dir)
+        segments = _seek_segments(order_by, value, quote_id, ascending)
+    else:
+        segments = [('1', [])]
+    
+    # 依次扫描各个区间，直到取满一页
+    conn = get_db_connection()
+    select = _quote_select(order_by=order_by)
+    quotes = []
+    for condition, params in segments:
+        quotes += conn.execute(
+            f'{select} WHERE {condition} ORDER BY {order_clause} LIMIT ?',
+            (*params, page_size - len(quotes))
+        ).fetchall()
+        if len(quotes) >= page_size:
+            break
+    
+    if backward:
+        quotes.reverse()
+    
+    if not quotes:
+        return quotes, None, None
+    
+    prev_cursor = _encode_cursor(order_by, order_dir, quotes[0])
+    next_cursor = _encode_cursor(order_by, order_dir, quotes[-1])
+    return quotes, prev_cursor, next_cursor
+
+
+@instrumented
+def get_quotes_at(offset, limit=10, order_by='id', order_dir='asc'):
+    """按排序位置读取一段名言，用于跳转到任意位置（如拖动滚动条）
+    
+    先用OFFSET在覆盖索引上找到这段数据前（或后）一条记录的排序值和id，
+    再以它为游标做keyset查询。跳过的行只读索引、不连接查找表，
+    位置在后半段时从末尾反向数，最多跳过一半的记录。
+    返回的游标可以继续用get_quotes_by_cursor()读取相邻数据。
+    
+    Args:
+        offset: 第一条记录的位置，从0开始
+        limit: 最多读取的数量
+        order_by: 排序字段
+        order_dir: 排序方向
+    
+    Returns:
+        tuple: (名言列表, 上一页游标, 下一页游标)，没有数据时游标为None
+    """
+    order_by, order_dir = _normalize_order(order_by, order_dir)
+    
+    total_count = get_quote_count()
+    offset = max(offset, 0)
+    limit = min(limit, total_count - offset)
+    if limit <= 0:
+        return [], None, None
+    
+    if offset == 0:
+        return get_quotes_by_cursor(None, limit, order_by, order_dir, 'first')
+    if offset + limit >= total_count:
+        return get_quotes_by_cursor(None, limit, order_by, order_dir, 'last')
+    
+    if offset > total_count // 2:
+        # 从末尾反向数到这段数据之后的一条记录，再向前取
+        skip = total_count - offset - limit - 1
+        key = _sort_key_at(order_by, order_dir == 'desc', skip)
+        direction = 'prev'
+    else:
+        key = _sort_key_at(order_by, order_dir == 'asc', offset - 1)
+        direction = 'next'
+    
+    if key is None:
+        return [], None, None
+    
+    cursor = _encode_token([order_by, order_dir, key[0], key[1]])
+    return get_quotes_by_cursor(cursor, limit, order_by, order_dir, direction)
+
+
+def _sort_key_at(order_by, ascending, skip):
+    """在索引上定位按排序跳过skip条后的记录
+    
+    作者、朝代按查找表name索引和外键索引遍历，其他字段直接使用quote_entries上的索引，
+    都不需要回表读取整行。
+    
+    Args:
+        order_by: 排序字段
+        ascending: 是否按升序扫描
+        skip: 跳过的记录数
+    
+    Returns:
+        tuple: (排序值, id)，超出范围时返回None
+    """
+    scan_dir = 'ASC' if ascending else 'DESC'
+    tables = dict(LOOKUP_TABLES)
+    
+    if order_by == 'id':
+        sql = f'SELECT id, id FROM quote_entries ORDER BY id {scan_dir}'
+    elif order_by in tables:
+        sql = f'''
+        SELECT t.name, e.id FROM {tables[order_by]} t
+        JOIN quote_entries e ON e.{order_by}_id = t.id
+        ORDER BY t.name {scan_dir}, e.id {scan_dir}
+        '''
+    else:
+        sql = f'SELECT {order_by}, id FROM quote_entries ORDER BY {order_by} {scan_dir}, id {scan_dir}'
+    
+    conn = get_db_connection()
+    row = conn.execute(f'{sql} LIMIT 1 OFFSET ?', (skip,)).fetchone()
+    return tuple(row) if row else None
+
+
+def _encode_cursor(order_by, order_dir, quote):
+    """将边界记录编码为不透明的游标字符串
+    
+    Args:
+        order_by: 排序字段
+        order_dir: 排序方向
+        quote: 边界记录
+    
+    Returns:
+        str: 游标
+    """
+    return _encode_token([order_by, order_dir, quote[order_by], quote['id']])
+
+
+def _decode_cursor(cursor, order_by, order_dir):
+    """解析游标，并校验游标与当前排序一致
+    
+    Args:
+        cursor: 游标字符串
+        order_by: 排序字段
+        order_dir: 排序方向
+    
+    Returns:
+        tuple: (排序值, id)
+    """
+    try:
+        cursor_order_by, cursor_order_dir, value, quote_id = _decode_token(cursor)
+    except (ValueError, TypeError):
+        raise ValueError("无效的分页游标")
+    
+    if (cursor_order_by, cursor_order_dir) != (order_by, order_dir):
+        raise ValueError("分页游标与当前排序不一致")
+    
+    return value, quote_id
+
+
+def _encode_token(payload):
+    """将JSON可序列化的数据编码为URL安全的字符串
+    
+    Args:
+        payload: 待编码的数据
+    
+    Returns:
+        str: 编码后的字符串
+    """
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def _decode_token(token):
+    """解析_encode_token生成的字符串
+    
+    Args:
+        token: 编码后的字符串
+    
+    Returns:
+        解码后的数据
+    
+    Raises:
+        ValueError: 字符串无法解析
+    """
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("无效的编码字符串")
+
+
+def _seek_segments(order_by, value, quote_id, ascending):
+    """生成定位到游标之后记录的WHERE条件，字段使用_quote_select()中的表达式
+    
+    SQLite升序时NULL排在最前，降序时排在最后。为了让每个条件都能走索引范围查找，
+    NULL与非NULL拆成按扫描顺序排列的多个区间，而不是用OR合并。
+    字典编码的字段按查找表的name排序，name不为NULL，但与id不在同一个索引中，
+    拆成"name相同、id在游标之后"和"name在游标之后"两个区间。
+    
+    Args:
+        order_by: 排序字段
+        value: 游标记录的排序值
+        quote_id: 游标记录的id
+        ascending: 是否按升序扫描
+    
+    Returns:
+        list: [(条件SQL, 参数列表), ...]，按扫描顺序排列
+    """
+    if order_by == 'id':
+        return [('e.id > ?' if ascending else 'e.id < ?', [quote_id])]
+    
+    column = _column_expression(order_by)
+    after = '>' if ascending else '<'
+    if order_by in _LOOKUP_ALIASES:
+        # 读出为NULL的取值在查找表中是空字符串
+        value = '' if value is None else value
+        return [
+            (f'{column} = ? AND e.id {after} ?', [value, quote_id]),
+            (f'{column} {after} ?', [value]),
+        ]
+    
+    if ascending:
+        if value is None:
+            return [
+                (f'{column} IS NULL AND e.id > ?', [quote_id]),
+                (f'{column} IS NOT NULL', []),
+            ]
+        return [(f'({column}, e.id) > (?, ?)', [value, quote_id])]
+    
+    if value is None:
+        return [(f'{column} IS NULL AND e.id < ?', [quote_id])]
+    return [
+        (f'({column}, e.id) < (?, ?)', [value, quote_id]),
+        (f'{column} IS NULL', []),
+    ]
+
+
+@instrumented
+def get_quote_by_id(quote_id):
+    """根据ID获取名言，结果经过LRU缓存
+    
+    Args:
+        quote_id: 名言ID
+    
+    Returns:
+        sqlite3.Row: 名言数据，如果不存在返回None
+    """
+    return _quote_cache.get_or_load(
+        (DB_PATH, 'id', quote_id),
+        lambda: _fetch_one_quote(f'{_quote_select()} WHERE e.id = ?', quote_id)
+    )
+
+
+@instrumented
+def get_quote_by_content(content):
+    """根据内容检查名言是否已存在，结果经过LRU缓存（包括不存在的结果）
+    
+    Args:
+        content: 名言内容
+    
+    Returns:
+        sqlite3.Row: 名言数据，如果不存在返回None
+    """
+    return _quote_cache.get_or_load(
+        (DB_PATH, 'content', content),
+        lambda: _fetch_one_quote(f'{_quote_select()} WHERE e.content = ?', content)
+    )
+
+
+def _fetch_one_quote(sql, value):
+    """执行单行查询
+    
+    Args:
+        sql: 带一个参数的查询语句
+        value: 参数
+    
+    Returns:
+        sqlite3.Row: 名言数据，如果不存在返回None
+    """
+    conn = get_db_connection()
+    return conn.execute(sql, (value,)).fetchone()
+
+
+def get_quote_cache_stats():
+    """获取单行查询缓存的统计
+    
+    Returns:
+        dict: hits、misses、evictions、expirations、invalidations、size、maxsize、hit_rate
+    """
+    return _quote_cache.stats()
+
+
+def clear_quote_cache():
+    """清空单行查询缓存，之后的读取都从数据库读取（如测量未命中缓存时的耗时）"""
+    _quote_cache.clear()
+
+
+def enable_query_metrics(slow_query_ms=None):
+    """开启查询统计：记录每个操作和每条语句的耗时，超过阈值的语句连同查询计划写入慢查询日志
+    
+    慢查询通过logging以WARNING级别输出（logger名为quotes.instrumentation）。
+    也可以在启动前设置环境变量QUOTES_QUERY_METRICS=1和QUOTES_SLOW_QUERY_MS开启。
+    
+    Args:
+        slow_query_ms: 慢查询阈值，单位毫秒，为None时使用默认值（已开启时保持不变）
+    """
+    instrumentation.enable(slow_query_ms)
+
+
+def disable_query_metrics():
+    """关闭查询统计并丢弃已有数据"""
+    instrumentation.disable()
+
+
+def reset_query_metrics():
+    """清空已有的查询统计，保持开启状态"""
+    instrumentation.reset()
+
+
+def get_query_metrics(top=20):
+    """获取查询统计快照，可用quotes.instrumentation.format_query_metrics()格式化显示
+    
+    Args:
+        top: 返回总耗时最长的语句条数
+    
+    Returns:
+        dict: operations为各操作的耗时分布（次数、平均、p50/p95/p99、最长，单位秒），
+            statements为总耗时最长的语句，slow_queries为最近的慢查询及其查询计划；
+            未开启时返回None
+    """
+    return instrumentation.snapshot(top)
+
+
+@instrumented
+def search_pinyin(query, limit=20):
+    """按拼音检索名言
+    
+    支持无声调全拼（"xiu mu"、"xiumu"）和首字母缩写（"xmbkdy"）的前缀匹配，
+    查找在内存中的拼音索引上完成，只有命中的记录才回表读取。
+    
+    Args:
+        query: 拼音查询文本
+        limit: 最多返回的数量
+    
+    Returns:
+        list: 名言列表，每个元素是sqlite3.Row对象
+    """
+    with _pinyin_index_lock:
+        quote_ids = _current_pinyin_index().search(query, limit)
+    if not quote_ids:
+        return []
+    
+    conn = get_db_connection()
+    placeholders = ', '.join('?' * len(quote_ids))
+    rows = conn.execute(
+        f'{_quote_select()} WHERE e.id IN ({placeholders})', quote_ids
+    ).fetchall()
+    
+    # 按索引返回的顺序排列
+    rows_by_id = {row['id']: row for row in rows}
+    return [rows_by_id[quote_id] for quote_id in quote_ids if quote_id in rows_by_id]
+
+
+def get_pinyin_index():
+    """获取当前数据库的拼音前缀索引，并与数据库同步
+    
+    返回的索引会被之后的调用增量更新，在多个线程中检索应使用search_pinyin()。
+    
+    Returns:
+        PinyinIndex: 拼音索引
+    """
+    with _pinyin_index_lock:
+        return _current_pinyin_index()
+
+
+def _current_pinyin_index():
+    """获取当前数据库的拼音索引并与数据库同步，调用方需持有_pinyin_index_lock
+    
+    首次调用时从数据库构建。之后比较最大ID和记录总数：只有新增记录时读取新记录加入索引；
+    有记录被删除时在后台线程中重新构建，构建完成前继续使用旧索引，
+    已删除的记录由search_pinyin()回表时过滤。名言的拼音不会原地修改，不需要检查。
+    
+    Returns:
+        PinyinIndex: 拼音索引
+    """
+    db_path = DB_PATH
+    conn = get_db_connection()
+    state = _pinyin_indexes.get(db_path)
+    if state is None:
+        with transaction():
+            state = _pinyin_indexes[db_path] = _build_pinyin_index(conn)
+        return state['index']
+    
+    if state['rebuilding']:
+        return state['index']
+    
+    # 在同一个读事务中比较，避免其他连接在两次读取之间写入
+    with transaction():
+        last_id, row_count = _pinyin_index_version(conn)
+        if (last_id, row_count) == (state['last_id'], state['row_count']):
+            return state['index']
+        
+        new_rows = conn.execute(
+            'SELECT id, pinyin_plain, pinyin_initials FROM quote_entries WHERE id > ?',
+            (state['last_id'],)
+        ).fetchall()
+    
+    if state['row_count'] + len(new_rows) == row_count:
+        state['index'].add(new_rows)
+        state['last_id'] = last_id
+        state['row_count'] = row_count
+    else:
+        state['rebuilding'] = True
+        thread = threading.Thread(target=_rebuild_pinyin_index, args=(db_path, state), daemon=True)
+        thread.start()
+    return state['index']
+
+
+def _pinyin_index_version(conn):
+    """读取判断拼音索引是否需要更新的最大ID和记录总数
+    
+    Args:
+        conn: 数据库连接
+    
+    Returns:
+        tuple: (最大ID, 记录总数)
+    """
+    return tuple(conn.execute('''
+    SELECT (SELECT COALESCE(MAX(id), 0) FROM quote_entries),
+           COALESCE((SELECT quote_count FROM quote_counters WHERE scope = 'total' AND key = 0), 0)
+    ''').fetchone())
+
+
+def _build_pinyin_index(conn):
+    """从数据库构建拼音索引，调用方需开启事务，使记录与最大ID、总数一致
+    
+    Args:
+        conn: 数据库连接
+    
+    Returns:
+        dict: index为PinyinIndex，last_id和row_count为构建时的最大ID和记录总数
+    """
+    last_id, row_count = _pinyin_index_version(conn)
+    cursor = conn.execute('SELECT id, pinyin_plain, pinyin_initials FROM quote_entries')
+    index = PinyinIndex(cursor)
+    return {'index': index, 'last_id': last_id, 'row_count': row_count, 'rebuilding': False}
+
+
+def _rebuild_pinyin_index(db_path, state):
+    """在后台线程中重新构建拼音索引，完成后替换旧索引
+    
+    使用单独的连接，不受其他线程切换DB_PATH影响；失败时保留旧索引，下次检索时重试。
+    
+    Args:
+        db_path: 数据库文件路径
+        state: 正在使用的索引状态
+    """
+    try:
+        conn = _open_connection(db_path)
+        try:
+            conn.execute('BEGIN')
+            new_state = _build_pinyin_index(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        with _pinyin_index_lock:
+            state['rebuilding'] = False
+        return
+    
+    with _pinyin_index_lock:
+        if _pinyin_indexes.get(db_path) is state:
+            _pinyin_indexes[db_path] = new_state
+
+
+def _on_quotes_changed():
+    """名言数据变化后调用，使依赖数据的内存结构失效
+    
+    所有写入和删除名言的函数都必须在修改后调用，包括以后新增的更新、删除操作。
+    在transaction()内调用时只做标记，等最外层事务提交后再清空缓存。
+    拼音索引在检索时按最大ID和记录总数与数据库同步，不在这里丢弃。
+    """
+    if getattr(_local, 'tx_depth', 0):
+        _local.quotes_changed = True
+        return
+    _quote_cache.clear()
+
+
+@instrumented
+def search_quotes(query, limit=20, cursor=None):
+    """全文检索名言的内容、意义、翻译和典故
+    
+    按空格拆分关键词，所有关键词都需命中。长度不少于3个字符的关键词走FTS5三元组索引，
+    按BM25相关度排序并返回高亮片段；更短的关键词在短关键词索引quotes_short_fts中
+    检索候选记录，再用LIKE条件确认原样命中。只有短关键词时按ID排序。
+    相关度相同时按ID排序，游标记录上一页最后一条的(相关度, ID)，翻页时从它之后继续，
+    不受前面新增或删除记录的影响。
+    
+    Args:
+        query: 检索关键词
+        limit: 每页数量
+        cursor: 上一次返回的游标，为None时从第一条开始
+    
+    Returns:
+        tuple: (结果列表, 下一页游标)。结果为sqlite3.Row，
+            除quotes的字段外还包含snippet（高亮片段）和score（相关度，越小越相关）；
+            没有更多结果时游标为None
+    """
+    terms = query.split()
+    if not terms:
+        return [], None
+    
+    after = None
+    if cursor is not None:
+        try:
+            cursor_query, after_score, after_id = _decode_token(cursor)
+        except (ValueError, TypeError):
+            raise ValueError("无效的检索游标")
+        if cursor_query != query:
+            raise ValueError("检索游标与当前关键词不一致")
+        after = (after_score, after_id)
+    
+    conn = get_db_connection()
+    fts_terms = [term for term in terms if len(term) >= 3]
+    short_terms = [term for term in terms if len(term) < 3]
+    
+    # 短关键词：在四个检索字段中任意一个命中即可
+    like_conditions = []
+    like_params = []
+    for term in short_terms:
+        condition, params = _like_condition(term)
+        like_conditions.append(condition)
+        like_params += params
+    
+    short_match = None
+    if short_terms and _has_table(conn, 'quotes_short_fts'):
+        short_match = ' AND '.join('"' + _split_chars(term) + '"' for term in short_terms)
+    
+    if fts_terms and _has_table(conn, 'quotes_fts'):
+        match = ' AND '.join('"' + term.replace('"', '""') + '"' for term in fts_terms)
+        conditions = ['quotes_fts MATCH ?']
+        params = [match]
+        if short_match is not None:
+            conditions.append(
+                'e.id IN (SELECT rowid FROM quotes_short_fts WHERE quotes_short_fts MATCH ?)'
+            )
+            params.append(short_match)
+        where = ' AND '.join(conditions + like_conditions)
+        params += like_params
+        # 相关度是计算出的值，在外层查询中按它和ID定位上一页之后的记录
+        keyset = ''
+        if after is not None:
+            keyset = 'WHERE score > ? OR (score = ? AND id > ?)'
+            params += [after[0], after[0], after[1]]
+        sql = f'''
+        SELECT * FROM (
+            SELECT {_quote_select_list()},
+                   snippet(quotes_fts, -1, '【', '】', '…', 16) AS snippet,
+                   bm25(quotes_fts, 10.0, 2.0, 1.0, 1.0) AS score
+            FROM quotes_fts JOIN quote_entries e ON e.id = quotes_fts.rowid{_lookup_joins()}
+            WHERE {where}
+        )
+        {keyset}
+        ORDER BY score, id
+        LIMIT ?
+        '''
+    else:
+        # 只有短关键词，或没有可用的全文索引时所有关键词都按LIKE过滤，高亮第一个关键词
+        for term in fts_terms:
+            condition, params = _like_condition(term)
+            like_conditions.append(condition)
+            like_params += params
+        # 这两种情况相关度都为0，只按ID定位
+        if after is not None:
+            like_conditions.append('e.id > ?')
+            like_params.append(after[1])
+        where = ' AND '.join(like_conditions)
+        if short_match is not None:
+            sql = f'''
+            SELECT {_quote_select_list()},
+                   replace(e.content, ?, '【' || ? || '】') AS snippet,
+                   0.0 AS score
+            FROM quotes_short_fts
+            JOIN quote_entries e ON e.id = quotes_short_fts.rowid{_lookup_joins()}
+            WHERE quotes_short_fts MATCH ? AND {where}
+            ORDER BY quotes_short_fts.rowid
+            LIMIT ?
+            '''
+            params = [terms[0], terms[0], short_match] + like_params
+        else:
+            sql = f'''
+            SELECT {_quote_select_list()},
+                   replace(e.content, ?, '【' || ? || '】') AS snippet,
+                   0.0 AS score
+            FROM quote_entries e{_lookup_joins()}
+            WHERE {where}
+            ORDER BY e.id
+            LIMIT ?
+            '''
+            params = [terms[0], terms[0]] + like_params
+    
+    # 多取一条用于判断是否还有下一页
+    results = conn.execute(sql, (*params, limit + 1)).fetchall()
+    
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = _encode_token([query, last['score'], last['id']])
+    
+    return results, next_cursor
+
+
+def _like_condition(term):
+    """生成在检索字段中做子串匹配的LIKE条件
+    
+    Args:
+        term: 关键词
+    
+    Returns:
+        tuple: (条件SQL, 参数列表)
+    """
+    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    condition = (
+        "(e.content LIKE ? ESCAPE '\\' OR e.meaning LIKE ? ESCAPE '\\' "
+        "OR e.translation LIKE ? ESCAPE '\\' OR e.allusion LIKE ? ESCAPE '\\')"
+    )
+    return condition, [pattern] * 4
+
+
+def _has_table(conn, name):
+    """检查数据库中是否存在指定的表
+    
+    Args:
+        conn: 数据库连接
+        name: 表名
+    
+    Returns:
+        bool: 是否存在
+    """
+    cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _has_trigger(conn, name):
+    """检查数据库中是否存在指定的触发器
+    
+    Args:
+        conn: 数据库连接
+        name: 触发器名
+    
+    Returns:
+        bool: 是否存在
+    """
+    cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+@instrumented
+def get_crawl_state(source):
+    """获取数据源的爬取状态
+    
+    Args:
+        source: 数据源标识
+    
+    Returns:
+        sqlite3.Row: 爬取状态（source, cursor, etag, last_modified, last_success_at），不存在返回None
+    """
+    conn = get_db_connection()
+    cursor = conn.execute('SELECT * FROM crawl_state WHERE source = ?', (source,))
+    return cursor.fetchone()
+
+
+@instrumented
+def get_crawl_states(source_prefix):
+    """获取标识以指定前缀开头的所有数据源的爬取状态
+    
+    Args:
+        source_prefix: 数据源标识前缀
+    
+    Returns:
+        dict: 数据源标识到爬取状态的映射
+    """
+    conn = get_db_connection()
+    cursor = conn.execute(
+        'SELECT * FROM crawl_state WHERE substr(source, 1, ?) = ?',
+        (len(source_prefix), source_prefix)
+    )
+    return {row['source']: row for row in cursor}
+
+
+@instrumented
+def save_crawl_state(source, cursor=None, etag=None, last_modified=None):
+    """保存数据源的爬取状态，并把最近成功时间更新为当前时间
+    
+    Args:
+        source: 数据源标识
+        cursor: 断点（已完成的页码或位置）
+        etag: 响应的ETag
+        last_modified: 响应的Last-Modified
+    """
+    with transaction() as conn:
+        conn.execute('''
+        INSERT INTO crawl_state (source, cursor, etag, last_modified, last_success_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE SET
+            cursor = excluded.cursor,
+            etag = excluded.etag,
+            last_modified = excluded.last_modified,
+            last_success_at = excluded.last_success_at
+        ''', (source, cursor, etag, last_modified))
+
+
+@instrumented
+def delete_crawl_state(source_prefix):
+    """删除标识以指定前缀开头的爬取状态，下次爬取将从头开始
+    
+    Args:
+        source_prefix: 数据源标识前缀
+    
+    Returns:
+        int: 删除的状态数量
+    """
+    with transaction() as conn:
+        cursor = conn.execute(
+            'DELETE FROM crawl_state WHERE substr(source, 1, ?) = ?',
+            (len(source_prefix), source_prefix)
+        )
+    return cursor.rowcount
+
+
+@instrumented
+def clean_duplicate_quotes(chunk_size=5000, dry_run=False, progress_callback=None):
+    """清理重复的名言数据
+    
+    每组相同内容保留最小ID的记录。先一次性算出待删除的ID集合，
+    再按ID区间分块删除，每块单独提交，避免长时间占用写锁。
+    也用于升级前的旧数据库（尚未迁移为quote_entries，init_db()抛出DuplicateQuotesError时）。
+    
+    Args:
+        chunk_size: 每个事务删除的最大条数
+        dry_run: 为True时只统计待删除数量，不删除数据
+        progress_callback: 进度回调，参数为(已删除数量, 待删除总数)
+    
+    Returns:
+        int: 清理的重复数据数量（dry_run时为待清理数量）
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size必须大于0")
+    
+    conn = get_db_connection()
+    table = 'quote_entries' if _has_table(conn, 'quote_entries') else 'quotes'
+    
+    if dry_run:
+        cursor = conn.execute(f'''
+        SELECT COUNT(*) FROM {table}
+        WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY content)
+        ''')
+        return cursor.fetchone()[0]
+    
+    try:
+        # 记录待删除的ID：每组内容中除最小ID外的记录
+        with transaction():
+            conn.execute('DROP TABLE IF EXISTS temp.duplicate_quote_ids')
+            conn.execute('CREATE TEMP TABLE duplicate_quote_ids (id INTEGER PRIMARY KEY)')
+            conn.execute(f'''
+            INSERT INTO temp.duplicate_quote_ids (id)
+            SELECT id FROM {table}
+            WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY content)
+            ''')
+            total_count = conn.execute('SELECT COUNT(*) FROM temp.duplicate_quote_ids').fetchone()[0]
+        
+        deleted_count = 0
+        last_id = 0
+        
+        # 按ID区间分块删除，块与块之间提交，让读者有机会读取
+        while deleted_count < total_count:
+            with transaction():
+                upper_id = conn.execute('''
+                SELECT MAX(id) FROM (
+                    SELECT id FROM temp.duplicate_quote_ids WHERE id > ? ORDER BY id LIMIT ?
+                )
+                ''', (last_id, chunk_size)).fetchone()[0]
+                
+                if upper_id is None:
+                    break
+                
+                cursor = conn.execute(f'''
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM temp.duplicate_quote_ids WHERE id > ? AND id <= ?
+                )
+                ''', (last_id, upper_id))
+            
+            deleted_count += cursor.rowcount
+            last_id = upper_id
+            _on_quotes_changed()
+            
+            if progress_callback:
+                progress_callback(deleted_count, total_count)
+    finally:
+        with transaction():
+            conn.execute('DROP TABLE IF EXISTS temp.duplicate_quote_ids')
     
     return deleted_count
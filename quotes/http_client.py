@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP访问层：共享的连接池会话和磁盘响应缓存
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+# 默认的响应缓存目录
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'http_cache')
+
+# 默认超时（连接超时, 读取超时），单位秒
+DEFAULT_TIMEOUT = (5, 30)
+
+# 连接池中每个主机保留的最大连接数，应不小于爬虫的并发数
+POOL_MAXSIZE = 32
+
+# 条件请求头，带有这些请求头时绕过缓存
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+# 缓存超过上限后淘汰到上限的这一比例，避免之后每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def create_session(pool_maxsize=POOL_MAXSIZE):
+    """创建带连接池的requests会话
+
+    Args:
+        pool_maxsize: 每个主机保留的最大连接数
+
+    Returns:
+        requests.Session: 会话对象
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "quotes-collection/1.0"
+    return session
+
+
+class ResponseCache:
+    """磁盘响应缓存
+
+    每个请求对应一个元数据文件（以请求的哈希命名），响应体按内容哈希存放，
+    相同内容只保存一份。超过有效期的条目视为未命中；总大小超过上限时
+    按最近访问时间淘汰最旧的条目。
+
+    首次写入时扫描一次缓存目录，之后在内存中维护各条目、响应体的大小和引用数以及总大小，
+    写入不再扫描目录。其他进程同时写入同一目录时，总大小只计入本进程所见的条目。
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=3600, max_bytes=100 * 1024 * 1024):
+        """初始化缓存
+
+        Args:
+            directory: 缓存目录
+            ttl: 条目有效期，单位秒
+            max_bytes: 缓存总大小上限，单位字节
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 缓存键 -> (元数据大小, 响应体哈希)，首次写入时由_load_index()构建
+        self._entries = None
+        # 响应体哈希 -> 大小，以及被元数据引用的次数
+        self._bodies = {}
+        self._references = {}
+        self._total = 0
+        os.makedirs(os.path.join(directory, 'meta'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'body'), exist_ok=True)
+
+    @staticmethod
+    def request_key(url, params=None):
+        """计算请求的缓存键
+
+        Args:
+            url: 请求地址
+            params: 查询参数
+
+        Returns:
+            str: 缓存键
+        """
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return hashlib.sha256(f"GET {url}".encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, 'meta', f"{key}.json")
+
+    def _body_path(self, digest):
+        return os.path.join(self.directory, 'body', digest)
+
+    def get(self, key):
+        """读取未过期的缓存响应
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            requests.Response: 缓存的响应，未命中时返回None
+        """
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if time.time() - meta['stored_at'] > self.ttl:
+                return None
+            with open(self._body_path(meta['body']), 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # 更新访问时间，用于按最近访问淘汰
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+        response = requests.Response()
+        response.status_code = meta['status_code']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.url = meta['url']
+        response.encoding = meta.get('encoding')
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def put(self, key, response):
+        """写入响应，只缓存200响应
+
+        Args:
+            key: 缓存键
+            response: requests.Response对象
+        """
+        if response.status_code != 200:
+            return
+
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        meta = {
+            'url': response.url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'body': digest,
+            'stored_at': time.time(),
+        }
+
+        meta_data = json.dumps(meta).encode('utf-8')
+
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+
+            if digest not in self._bodies:
+                body_path = self._body_path(digest)
+                if not os.path.exists(body_path):
+                    self._atomic_write(body_path, body)
+                self._bodies[digest] = len(body)
+                self._total += len(body)
+            self._atomic_write(self._meta_path(key), meta_data)
+
+            # 先登记新的引用再释放旧条目，内容未变时响应体不会被误删
+            self._references[digest] = self._references.get(digest, 0) + 1
+            self._release(key)
+            self._entries[key] = (len(meta_data), digest)
+            self._total += len(meta_data)
+
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for sub in ('meta', 'body'):
+                folder = os.path.join(self.directory, sub)
+                for name in os.listdir(folder):
+                    os.remove(os.path.join(folder, name))
+            self._entries = None
+            self._bodies = {}
+            self._references = {}
+            self._total = 0
+
+    @staticmethod
+    def _atomic_write(path, data):
+        """先写临时文件再替换，避免并发读到写了一半的文件"""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _load_index(self):
+        """扫描缓存目录，建立各条目和响应体的大小索引，并删除没有被引用的响应体"""
+        meta_dir = os.path.join(self.directory, 'meta')
+        body_dir = os.path.join(self.directory, 'body')
+
+        self._entries = {}
+        self._bodies = {}
+        self._references = {}
+        self._total = 0
+
+        for name in os.listdir(meta_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(meta_dir, name)
+            try:
+                size = os.path.getsize(path)
+                with open(path, encoding='utf-8') as f:
+                    digest = json.load(f)['body']
+            except (OSError, ValueError, KeyError):
+                continue
+            self._entries[name[:-len('.json')]] = (size, digest)
+            self._references[digest] = self._references.get(digest, 0) + 1
+            self._total += size
+
+        for name in os.listdir(body_dir):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(body_dir, name)
+            try:
+                if name not in self._references:
+                    os.remove(path)
+                    continue
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            self._bodies[name] = size
+            self._total += size
+
+    def _release(self, key):
+        """从索引中移除条目（不删除元数据文件），响应体不再被引用时删除
+
+        Args:
+            key: 缓存键，不在索引中时不做任何事
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        size, digest = entry
+        self._total -= size
+        self._references[digest] -= 1
+        if self._references[digest] > 0:
+            return
+
+        del self._references[digest]
+        self._total -= self._bodies.pop(digest, 0)
+        try:
+            os.remove(self._body_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """按最近访问时间从旧到新删除条目，直到总大小降到上限的EVICT_TARGET_RATIO
+
+        只在总大小超过上限时调用：读取一次各元数据文件的修改时间（get()命中时更新）并排序，
+        删除时按索引更新总大小和响应体的引用数。
+        """
+        order = []
+        for key in self._entries:
+            try:
+                accessed_at = os.path.getmtime(self._meta_path(key))
+            except OSError:
+                accessed_at = 0
+            order.append((accessed_at, key))
+        order.sort()
+
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        for _, key in order:
+            if self._total <= target:
+                break
+            try:
+                os.remove(self._meta_path(key))
+            except OSError:
+                pass
+            self._release(key)
+
+
+class HttpClient:
+    """带连接复用、默认超时和响应缓存的HTTP客户端
+
+    get()的签名与requests.Session.get一致，可直接替代会话传给爬虫。
+    带条件请求头的请求表示调用方要向服务器确认内容是否变化，不读缓存。
+    """
+
+    def __init__(self, session=None, cache=None, timeout=DEFAULT_TIMEOUT):
+        """初始化客户端
+
+        Args:
+            session: requests.Session对象，为None时新建带连接池的会话
+            cache: ResponseCache对象，为None时不缓存
+            timeout: 默认超时
+        """
+        self.session = session or create_session()
+        self.cache = cache
+        self.timeout = timeout
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """发送GET请求，缓存命中时直接返回缓存的响应
+
+        Args:
+            url: 请求地址
+            params: 查询参数
+            headers: 额外的请求头
+            timeout: 超时，为None时使用默认超时
+
+        Returns:
+            requests.Response: 响应，来自缓存时from_cache属性为True
+        """
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.request_key(url, params)
+            conditional = headers and any(name in headers for name in CONDITIONAL_HEADERS)
+            cached = None if conditional else self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self.session.get(url, params=params, headers=headers,
+                                    timeout=timeout or self.timeout)
+        response.from_cache = False
+
+        if self.cache is not None:
+            self.cache.put(key, response)
+
+        return response
+
+    def close(self):
+        """关闭会话，释放连接池"""
+        self.session.close()
+
+
+def get_http_client():
+    """获取进程内共享的HTTP客户端（带磁盘缓存）
+
+    Returns:
+        HttpClient: 共享客户端
+    """
+    global _shared_client
+
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient(cache=ResponseCache())
+        return _shared_client
@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库查询统计模块：按操作统计耗时分布，记录每条语句的耗时，
+超过阈值的语句连同EXPLAIN QUERY PLAN写入慢查询日志
+
+默认关闭，关闭时每次执行语句只多一次函数调用。设置环境变量QUOTES_QUERY_METRICS=1
+时导入即开启，QUOTES_SLOW_QUERY_MS设置慢查询阈值（毫秒），也可以调用enable()开启。
+"""
+
+import bisect
+import functools
+import inspect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+logger = logging.getLogger(__name__)
+
+# 默认的慢查询阈值，单位毫秒
+DEFAULT_SLOW_QUERY_MS = 100.0
+
+# 耗时分布的桶上界，单位秒，最后一个桶收集更慢的记录
+HISTOGRAM_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# 最多分别统计的语句数，超出后新语句合并统计
+MAX_STATEMENTS = 1000
+
+# 保留的最近慢查询条数
+MAX_SLOW_QUERIES = 50
+
+# 可以用EXPLAIN QUERY PLAN分析的语句
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# 合并占位符列表（如IN (?, ?, ?)），避免同一语句因参数个数不同被分别统计
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+# 超出MAX_STATEMENTS后合并统计使用的语句文本
+_OTHER_STATEMENTS = '(其他语句)'
+
+# 当前线程正在执行的操作名，按嵌套顺序排列
+_local = threading.local()
+
+
+class LatencyHistogram:
+    """耗时分布，按固定的桶统计次数，并记录总耗时、最短和最长耗时"""
+
+    def __init__(self):
+        """初始化分布"""
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        """记录一次耗时
+
+        Args:
+            seconds: 耗时，单位秒
+        """
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """按桶估计分位数，返回所在桶的上界，不超过最长耗时
+
+        Args:
+            fraction: 0到1之间的比例，如0.95
+
+        Returns:
+            float: 估计的耗时，单位秒，没有记录时为None
+        """
+        if self.count == 0:
+            return None
+
+        rank = fraction * self.count
+        seen = 0
+        for bound, bucket_count in zip(HISTOGRAM_BOUNDS, self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        """获取统计数据
+
+        Returns:
+            dict: count、total、mean、min、max、p50、p95、p99（单位秒），
+                buckets为(桶上界, 次数)列表，最后一个桶的上界为None
+        """
+        bounds = list(HISTOGRAM_BOUNDS) + [None]
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': [(bound, bucket_count) for bound, bucket_count in zip(bounds, self.buckets)
+                        if bucket_count],
+        }
+
+
+class QueryMetrics:
+    """线程安全的查询统计
+
+    操作是quotes.database中的公开函数（如get_quotes_by_page），语句是实际执行的SQL，
+    每条语句归到执行它的最内层操作下。
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+        """初始化统计
+
+        Args:
+            slow_query_ms: 慢查询阈值，单位毫秒，单条语句的执行和读取结果耗时超过该值时记录
+        """
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.started_at = datetime.now()
+        self._operations = {}
+        self._statements = {}
+        self._slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+        self._lock = threading.Lock()
+
+    def record_operation(self, name, seconds):
+        """记录一次操作的耗时
+
+        Args:
+            name: 操作名
+            seconds: 耗时，单位秒
+        """
+        with self._lock:
+            histogram = self._operations.get(name)
+            if histogram is None:
+                histogram = self._operations[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def record_statement(self, operation, sql, seconds):
+        """记录一条语句的耗时
+
+        Args:
+            operation: 执行语句的操作名，不在操作中执行时为None
+            sql: 语句文本
+            seconds: 执行和读取结果的耗时，单位秒
+        """
+        key = (operation, normalize_sql(sql))
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= MAX_STATEMENTS:
+                    key = (operation, _OTHER_STATEMENTS)
+                stats = self._statements.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def record_slow_query(self, operation, sql, seconds, plan):
+        """记录一条慢查询并写入日志
+
+        Args:
+            operation: 执行语句的操作名
+            sql: 语句文本
+            seconds: 耗时，单位秒
+            plan: EXPLAIN QUERY PLAN的结果行，无法分析时为None
+        """
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'operation': operation,
+            'sql': normalize_sql(sql),
+            'seconds': seconds,
+            'plan': plan,
+        }
+        with self._lock:
+            self._slow_queries.append(entry)
+        logger.warning("%s", format_slow_query(entry))
+
+    def snapshot(self, top=20):
+        """获取当前统计数据
+
+        Args:
+            top: 返回总耗时最长的语句条数
+
+        Returns:
+            dict: started_at为开始统计的时间，slow_query_ms为慢查询阈值，
+                operations为操作名到LatencyHistogram.snapshot()的映射，
+                statements为总耗时最长的语句（operation、sql、count、total、max），
+                slow_queries为最近的慢查询（time、operation、sql、seconds、plan），从旧到新排列
+        """
+        with self._lock:
+            operations = {name: histogram.snapshot()
+                          for name, histogram in sorted(self._operations.items())}
+            statements = [
+                {'operation': operation, 'sql': sql, 'count': count, 'total': total, 'max': longest}
+                for (operation, sql), (count, total, longest) in self._statements.items()
+            ]
+            slow_queries = list(self._slow_queries)
+
+        statements.sort(key=lambda statement: statement['total'], reverse=True)
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'slow_query_ms': self.slow_query_seconds * 1000,
+            'operations': operations,
+            'statements': statements[:top],
+            'slow_queries': slow_queries,
+        }
+
+
+def _env_metrics():
+    """按环境变量创建启动时的统计对象
+
+    Returns:
+        QueryMetrics: 设置了QUOTES_QUERY_METRICS时返回统计对象，否则返回None
+    """
+    if os.environ.get('QUOTES_QUERY_METRICS', '') in ('', '0'):
+        return None
+    return QueryMetrics(float(os.environ.get('QUOTES_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)))
+
+
+# 当前的统计对象，为None时不统计
+_metrics = _env_metrics()
+
+
+def enable(slow_query_ms=None):
+    """开启统计，已开启时只修改慢查询阈值
+
+    Args:
+        slow_query_ms: 慢查询阈值，单位毫秒，为None时使用默认值或保持不变
+    """
+    global _metrics
+
+    if _metrics is None:
+        _metrics = QueryMetrics(DEFAULT_SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms)
+    elif slow_query_ms is not None:
+        _metrics.slow_query_seconds = slow_query_ms / 1000
+
+
+def disable():
+    """关闭统计并丢弃已有数据"""
+    global _metrics
+    _metrics = None
+
+
+def reset():
+    """清空已有数据，保持开启状态和慢查询阈值"""
+    global _metrics
+
+    if _metrics is not None:
+        _metrics = QueryMetrics(_metrics.slow_query_seconds * 1000)
+
+
+def snapshot(top=20):
+    """获取当前统计数据
+
+    Args:
+        top: 返回总耗时最长的语句条数
+
+    Returns:
+        dict: QueryMetrics.snapshot()的结果，未开启时返回None
+    """
+    metrics = _metrics
+    return None if metrics is None else metrics.snapshot(top)
+
+
+def current_operation():
+    """获取当前线程正在执行的最内层操作名
+
+    Returns:
+        str: 操作名，不在操作中时返回None
+    """
+    stack = getattr(_local, 'operations', None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def _operation(metrics, name):
+    """在操作期间记录操作名，结束后记录耗时
+
+    Args:
+        metrics: QueryMetrics对象
+        name: 操作名
+    """
+    stack = getattr(_local, 'operations', None)
+    if stack is None:
+        stack = _local.operations = []
+
+    stack.append(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        metrics.record_operation(name, elapsed)
+
+
+def _timed_generator(metrics, name, generator):
+    """统计生成器的耗时，只计生成器内部的时间，不含调用方处理每一项的时间
+
+    Args:
+        metrics: QueryMetrics对象
+        name: 操作名
+        generator: 被统计的生成器
+
+    Yields:
+        生成器产生的每一项
+    """
+    stack = getattr(_local, 'operations', None)
+    if stack is None:
+        stack = _local.operations = []
+
+    elapsed = 0.0
+    try:
+        while True:
+            stack.append(name)
+            started = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+                stack.pop()
+            yield item
+    finally:
+        generator.close()
+        metrics.record_operation(name, elapsed)
+
+
+def instrumented(function):
+    """装饰器：开启统计时以函数名为操作名记录每次调用的耗时
+
+    生成器函数只统计生成器内部的时间。
+
+    Args:
+        function: 被装饰的函数
+
+    Returns:
+        function: 装饰后的函数
+    """
+    name = function.__name__
+
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            metrics = _metrics
+            if metrics is None:
+                return function(*args, **kwargs)
+            return _timed_generator(metrics, name, function(*args, **kwargs))
+    else:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            metrics = _metrics
+            if metrics is None:
+                return function(*args, **kwargs)
+            with _operation(metrics, name):
+                return function(*args, **kwargs)
+
+    return wrapper
+
+
+def normalize_sql(sql):
+    """合并语句中的空白和占位符列表，作为统计的键
+
+    Args:
+        sql: 语句文本
+
+    Returns:
+        str: 规范化后的语句
+    """
+    return _PLACEHOLDER_LIST.sub('?, ...', ' '.join(sql.split()))
+
+
+def explain_query_plan(conn, sql, parameters=()):
+    """获取语句的查询计划
+
+    Args:
+        conn: 数据库连接
+        sql: 语句文本
+        parameters: 语句的参数
+
+    Returns:
+        list: 按层级缩进的查询计划文本，语句无法分析时返回None
+    """
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+
+    try:
+        # 使用未统计的游标，避免分析语句本身被统计
+        rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except sqlite3.Error:
+        return None
+
+    depths = {0: -1}
+    plan = []
+    for node_id, parent_id, _, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        plan.append('  ' * depths[node_id] + detail)
+    return plan
+
+
+def format_slow_query(entry):
+    """将慢查询格式化为文本
+
+    Args:
+        entry: QueryMetrics.snapshot()中slow_queries的元素
+
+    Returns:
+        str: 多行文本
+    """
+    text = f"慢查询 {entry['seconds'] * 1000:.1f} ms [{entry['operation'] or '-'}] {entry['sql']}"
+    for line in entry['plan'] or []:
+        text += f"\n    {line}"
+    return text
+
+
+def format_query_metrics(snapshot, top=10):
+    """将统计数据格式化为文本，用于命令行和界面显示
+
+    Args:
+        snapshot: QueryMetrics.snapshot()的结果
+        top: 最多显示的语句和慢查询条数
+
+    Returns:
+        str: 多行文本
+    """
+    def ms(seconds):
+        return '-' if seconds is None else f"{seconds * 1000:.2f}"
+
+    lines = [f"统计开始于 {snapshot['started_at']}，慢查询阈值 {snapshot['slow_query_ms']:.0f} ms", ""]
+
+    lines.append("【操作耗时】（单位ms）")
+    if not snapshot['operations']:
+        lines.append("暂无数据")
+    for name, stats in snapshot['operations'].items():
+        lines.append(f"{name}: {stats['count']} 次，平均 {ms(stats['mean'])}，p50 {ms(stats['p50'])}，"
+                     f"p95 {ms(stats['p95'])}，p99 {ms(stats['p99'])}，最长 {ms(stats['max'])}")
+
+    lines += ["", "【总耗时最长的语句】（单位ms）"]
+    if not snapshot['statements']:
+        lines.append("暂无数据")
+    for statement in snapshot['statements'][:top]:
+        lines.append(f"{ms(statement['total'])} 共 {statement['count']} 次，最长 {ms(statement['max'])} "
+                     f"[{statement['operation'] or '-'}] {statement['sql']}")
+
+    lines += ["", "【最近的慢查询】"]
+    if not snapshot['slow_queries']:
+        lines.append("暂无数据")
+    for entry in snapshot['slow_queries'][-top:]:
+        lines.append(f"{entry['time']} {format_slow_query(entry)}")
+
+    return "\n".join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """开启统计时记录每条语句耗时的游标
+
+    耗时包括执行语句和读取结果，在结果读完、游标关闭、执行下一条语句或游标被回收时记录。
+    """
+
+    _metrics = None
+
+    def execute(self, sql, parameters=()):
+        """执行语句并开始计时"""
+        self._finish()
+        if _metrics is None:
+            return super().execute(sql, parameters)
+
+        self._begin(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            # 没有结果集的语句（写入、DDL）执行完即结束
+            if self.description is None:
+                self._finish()
+
+    def executemany(self, sql, seq_of_parameters):
+        """批量执行语句，整批作为一次记录"""
+        self._finish()
+        if _metrics is None:
+            return super().executemany(sql, seq_of_parameters)
+
+        self._begin(sql, None)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+
+    def executescript(self, sql_script):
+        """执行多条语句，整个脚本作为一次记录"""
+        self._finish()
+        if _metrics is None:
+            return super().executescript(sql_script)
+
+        self._begin(sql_script, None)
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+
+    def fetchone(self):
+        """读取一行"""
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        """读取多行"""
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        """读取全部剩余行"""
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, True)
+        return rows
+
+    def __next__(self):
+        """迭代读取一行"""
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, True)
+            raise
+        self._fetched(started, False)
+        return row
+
+    def close(self):
+        """关闭游标"""
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        """游标被回收时记录尚未结束的语句，如只读取了一行的查询"""
+        self._finish()
+
+    def _begin(self, sql, parameters):
+        """开始记录一条语句
+
+        Args:
+            sql: 语句文本
+            parameters: 语句的参数，为None时慢查询不分析查询计划
+        """
+        self._metrics = _metrics
+        self._operation = current_operation()
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = 0.0
+
+    def _fetched(self, started, exhausted):
+        """累计读取结果的耗时
+
+        Args:
+            started: 开始读取的perf_counter()值
+            exhausted: 结果是否已读完
+        """
+        if self._metrics is None:
+            return
+        self._elapsed += time.perf_counter() - started
+        if exhausted:
+            self._finish()
+
+    def _finish(self):
+        """结束当前语句的记录，超过阈值时分析查询计划并写入慢查询日志"""
+        metrics = self._metrics
+        if metrics is None:
+            return
+        self._metrics = None
+
+        metrics.record_statement(self._operation, self._sql, self._elapsed)
+        if self._elapsed >= metrics.slow_query_seconds:
+            plan = None
+            if self._parameters is not None:
+                plan = explain_query_plan(self.connection, self._sql, self._parameters)
+            metrics.record_slow_query(self._operation, self._sql, self._elapsed, plan)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """开启统计时通过InstrumentedCursor执行语句的连接，未开启时与普通连接相同"""
+
+    def cursor(self, factory=None):
+        """创建游标"""
+        if factory is None:
+            factory = sqlite3.Cursor if _metrics is None else InstrumentedCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        """执行一条语句"""
+        if _metrics is None:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        """批量执行语句"""
+        if _metrics is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        """执行多条语句"""
+        if _metrics is None:
+            return super().executescript(sql_script)
+        return self.cursor().executescript(sql_script)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+长时间任务（批量生成、爬取）的进度报告和取消
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from quotes import profiling
+from quotes.database import close_db_connection
+
+
+# 任务进度：done为已完成条数，total为总条数（未知时为None），
+# rate为每秒完成条数，eta为预计剩余秒数（无法估计时为None）
+Progress = namedtuple('Progress', ['done', 'total', 'rate', 'eta'])
+
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+
+class CancelToken:
+    """取消标记，可在任意线程中调用cancel()，任务在批次之间检查"""
+
+    def __init__(self):
+        """初始化标记"""
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消任务"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        """等待一段时间，期间被取消时立即返回，可代替time.sleep()
+
+        Args:
+            timeout: 最长等待秒数
+
+        Returns:
+            bool: 是否已请求取消
+        """
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        """已请求取消时抛出JobCancelled
+
+        Raises:
+            JobCancelled: 已请求取消
+        """
+        if self.cancelled:
+            raise JobCancelled("任务已取消")
+
+
+class ProgressTracker:
+    """根据已完成条数计算速度和剩余时间，并限制回调频率"""
+
+    def __init__(self, callback, total=None, interval=0.5):
+        """初始化进度跟踪
+
+        Args:
+            callback: 进度回调，参数为Progress
+            total: 总条数，未知时为None
+            interval: 两次回调之间的最短秒数
+        """
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+        self._started = time.monotonic()
+        self._last_report = None
+
+    def update(self, done, force=False):
+        """更新已完成条数，距上次回调超过interval秒时回调
+
+        Args:
+            done: 已完成条数
+            force: 为True时忽略回调频率限制，用于报告最终进度
+        """
+        if self.callback is None:
+            return
+
+        now = time.monotonic()
+        if not force and self._last_report is not None and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+
+        elapsed = now - self._started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(self.total - done, 0) / rate
+        self.callback(Progress(done, self.total, rate, eta))
+
+
+def format_progress(progress):
+    """将进度格式化为一行文本
+
+    Args:
+        progress: Progress对象
+
+    Returns:
+        str: 进度文本
+    """
+    if progress.total:
+        text = f"已完成 {progress.done}/{progress.total} 条"
+    else:
+        text = f"已完成 {progress.done} 条"
+    text += f"，{progress.rate:.0f} 条/秒"
+    if progress.eta is not None:
+        text += f"，预计剩余 {progress.eta:.0f} 秒"
+    return text
+
+
+def print_progress(progress):
+    """命令行下的默认进度回调
+
+    Args:
+        progress: Progress对象
+    """
+    print(format_progress(progress))
+
+
+class Job:
+    """在后台线程中运行的可取消任务
+
+    任务函数需接受progress和cancel_token两个关键字参数。回调在任务线程中调用，
+    界面程序应在回调中把更新交给界面线程（如QueryWorker.post()）。
+
+    用法:
+        job = Job(generate_mass_quotes, 10000, on_progress=..., on_done=...)
+        job.start()
+        job.cancel()
+    """
+
+    def __init__(self, function, *args, on_progress=None, on_done=None, on_error=None,
+                 on_cancelled=None, action=None, **kwargs):
+        """初始化任务
+
+        Args:
+            function: 任务函数
+            *args: 位置参数
+            on_progress: 进度回调，参数为Progress
+            on_done: 完成回调，参数为任务函数的返回值
+            on_error: 失败回调，参数为异常对象
+            on_cancelled: 取消回调，无参数
+            action: 操作名，性能分析模式下任务线程（及其派生的线程）作为该操作的一次分析
+            **kwargs: 关键字参数
+        """
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.action = action
+        self.token = CancelToken()
+        self._thread = None
+
+    def start(self):
+        """在新线程中开始执行任务"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """请求取消任务，任务在当前批次完成后停止"""
+        self.token.cancel()
+
+    def is_running(self):
+        """任务是否仍在执行
+
+        Returns:
+            bool: 是否在执行
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout=None):
+        """等待任务结束
+
+        Args:
+            timeout: 最长等待秒数
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """任务线程主体"""
+        profile = profiling.start(self.action) if self.action is not None else None
+        function = self.function if profile is None else profile.wrap(self.function)
+        try:
+            result = function(*self.args, progress=self.on_progress, cancel_token=self.token,
+                              **self.kwargs)
+        except JobCancelled:
+            if self.on_cancelled is not None:
+                self.on_cancelled()
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+        else:
+            if self.on_done is not None:
+                self.on_done(result)
+        finally:
+            # 释放任务线程持有的数据库连接
+            close_db_connection()
+            if profile is not None:
+                profile.finish()
@@ -4,15 +4,42 @@
 数据模型文件
 """
 
+import sys
+
+
+def _intern(value):
+    """驻留字符串，使取值相同的字段共享同一个对象
+
+    Args:
+        value: 字段值
+
+    Returns:
+        驻留后的字符串，非字符串原样返回
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 class Quote:
-    """名言数据模型"""
-    
-    def __init__(self, content, pinyin, author="", dynasty="", sentiment="", 
-                 meaning="", usage_scene="", category="", allusion="", 
+    """名言数据模型
+
+    使用__slots__代替实例__dict__以减少每个对象的内存占用；
+    作者、朝代、褒贬、分类等取值很少的字段会被驻留，相同取值只保存一份。
+    """
+
+    # 字段顺序与数据库插入参数顺序一致
+    FIELDS = ('content', 'pinyin', 'author', 'dynasty', 'sentiment', 'meaning',
+              'usage_scene', 'category', 'allusion', 'translation', 'usage_notes')
+
+    # 取值种类很少、需要驻留的字段
+    INTERNED_FIELDS = ('author', 'dynasty', 'sentiment', 'category')
+
+    __slots__ = FIELDS
+
+    def __init__(self, content, pinyin, author="", dynasty="", sentiment="",
+                 meaning="", usage_scene="", category="", allusion="",
                  translation="", usage_notes=""):
         """初始化名言对象
-        
+
         Args:
             content: 名言内容
             pinyin: 拼音
@@ -28,12 +55,52 @@ class Quote:
         """
         self.content = content
         self.pinyin = pinyin
-        self.author = author
-        self.dynasty = dynasty
-        self.sentiment = sentiment
+        self.author = _intern(author)
+        self.dynasty = _intern(dynasty)
+        self.sentiment = _intern(sentiment)
         self.meaning = meaning
         self.usage_scene = usage_scene
-        self.category = category
+        self.category = _intern(category)
         self.allusion = allusion
         self.translation = translation
         self.usage_notes = usage_notes
+
+    @classmethod
+    def from_row(cls, row):
+        """从数据库记录或元组创建名言对象
+
+        Args:
+            row: sqlite3.Row等按字段名取值的记录，或按FIELDS顺序排列的元组/列表
+
+        Returns:
+            Quote: 名言对象
+        """
+        if isinstance(row, (tuple, list)):
+            return cls(*row[:len(cls.FIELDS)])
+        return cls(*(row[field] for field in cls.FIELDS))
+
+    @classmethod
+    def from_dict(cls, data):
+        """从字典创建名言对象，缺少的字段取默认值
+
+        Args:
+            data: 字段名到取值的字典，必须包含content
+
+        Returns:
+            Quote: 名言对象
+        """
+        return cls(data["content"], data.get("pinyin", ""),
+                   **{field: data[field] for field in cls.FIELDS[2:] if field in data})
+
+    def to_params(self):
+        """按FIELDS顺序返回字段值
+
+        Returns:
+            tuple: 字段值元组，可直接作为插入参数
+        """
+        return (self.content, self.pinyin, self.author, self.dynasty, self.sentiment,
+                self.meaning, self.usage_scene, self.category, self.allusion,
+                self.translation, self.usage_notes)
+
+    def __repr__(self):
+        return f"Quote(content={self.content!r}, author={self.author!r})"
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+拼音检索模块，提供拼音规范化和基于有序数组的前缀索引
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+_NON_LETTERS = re.compile(r'[^a-z]+')
+
+# PinyinIndex.add()逐条插入的最大记录数，更多时与已有数组合并后重新排序
+_INSORT_LIMIT = 256
+
+
+def normalize_pinyin(text):
+    """将带声调的拼音规范化为小写无声调形式
+
+    例如"xiǔ mù bù kě diāo yě"转换为"xiu mu bu ke diao ye"。
+    ü按输入法习惯转换为v，标点、数字等非字母字符视为音节分隔。
+
+    Args:
+        text: 拼音文本
+
+    Returns:
+        str: 以单个空格分隔的无声调拼音
+    """
+    if not text:
+        return ''
+
+    # 分解后ü表示为u加分音符，先转换为v，再去掉声调符号（组合附加符）
+    text = unicodedata.normalize('NFD', text.lower())
+    text = text.replace('u\u0308', 'v').replace('u:', 'v')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_LETTERS.sub(' ', text).strip()
+
+
+def pinyin_initials(plain):
+    """提取规范化拼音的音节首字母
+
+    Args:
+        plain: normalize_pinyin()的结果
+
+    Returns:
+        str: 首字母缩写，如"xmbkdy"
+    """
+    return ''.join(syllable[0] for syllable in plain.split())
+
+
+class PinyinIndex:
+    """拼音前缀索引
+
+    在内存中维护两个有序数组：去掉空格的全拼和首字母缩写，
+    查询时用二分查找定位前缀区间，耗时与数据量成对数关系。
+    新记录可以通过add()加入，删除记录需要重新构建。
+    """
+
+    def __init__(self, entries=()):
+        """构建索引
+
+        Args:
+            entries: (id, 规范化拼音, 首字母缩写)的可迭代对象
+        """
+        self._spelled_keys = []
+        self._spelled_ids = array('q')
+        self._initial_keys = []
+        self._initial_ids = array('q')
+        self.add(entries)
+
+    def __len__(self):
+        return len(self._spelled_keys)
+
+    def add(self, entries):
+        """加入新的记录
+
+        ID应大于已有记录的ID，使相同拼音的记录保持按ID排列。少量记录用二分查找逐条插入，
+        大量记录（如批量导入后）与已有数组合并后重新排序，两段有序数据的排序接近线性。
+
+        Args:
+            entries: (id, 规范化拼音, 首字母缩写)的可迭代对象
+        """
+        spelled = []
+        initials = []
+
+        for quote_id, plain, abbreviation in entries:
+            if not plain:
+                continue
+            spelled.append((plain.replace(' ', ''), quote_id))
+            initials.append((abbreviation, quote_id))
+
+        if len(spelled) <= _INSORT_LIMIT:
+            for keys, ids, new_entries in ((self._spelled_keys, self._spelled_ids, spelled),
+                                           (self._initial_keys, self._initial_ids, initials)):
+                for key, quote_id in new_entries:
+                    position = bisect_right(keys, key)
+                    keys.insert(position, key)
+                    ids.insert(position, quote_id)
+            return
+
+        spelled += zip(self._spelled_keys, self._spelled_ids)
+        initials += zip(self._initial_keys, self._initial_ids)
+        spelled.sort()
+        initials.sort()
+
+        self._spelled_keys = [key for key, _ in spelled]
+        self._spelled_ids = array('q', (quote_id for _, quote_id in spelled))
+        self._initial_keys = [key for key, _ in initials]
+        self._initial_ids = array('q', (quote_id for _, quote_id in initials))
+
+    def search(self, query, limit=20):
+        """按拼音前缀查找名言ID
+
+        同时匹配全拼前缀（声调和空格不敏感，如"xiu mu"、"xiumu"）
+        和首字母缩写前缀（如"xmbkdy"），全拼匹配排在前面。
+
+        Args:
+            query: 查询文本
+            limit: 最多返回的数量
+
+        Returns:
+            list: 名言ID列表
+        """
+        prefix = normalize_pinyin(query).replace(' ', '')
+        if not prefix:
+            return []
+
+        quote_ids = []
+        seen = set()
+
+        for keys, ids in ((self._spelled_keys, self._spelled_ids),
+                          (self._initial_keys, self._initial_ids)):
+            position = bisect_left(keys, prefix)
+            while position < len(keys) and len(quote_ids) < limit:
+                if not keys[position].startswith(prefix):
+                    break
+                quote_id = ids[position]
+                if quote_id not in seen:
+                    seen.add(quote_id)
+                    quote_ids.append(quote_id)
+                position += 1
+
+        return quote_ids
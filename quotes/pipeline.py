@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据采集流水线：抓取、转换、写入三个阶段并行执行
+"""
+
+import queue
+import threading
+import time
+
+from quotes.database import insert_or_ignore_quotes, close_db_connection
+from quotes.jobs import JobCancelled, ProgressTracker
+from quotes.profiling import bind_current
+
+
+# 队列结束标记
+_DONE = object()
+
+
+class PipelineError(Exception):
+    """流水线某个阶段执行失败"""
+
+
+class Checkpoint:
+    """检查点标记
+
+    数据源可以在原始数据之间产生检查点，写入线程会先提交它之前的所有数据，
+    再在写入线程中调用回调（如保存爬取断点），保证断点不会超前于已落库的数据。
+    只有一个转换线程时才能保证检查点与数据的先后顺序。
+    """
+
+    def __init__(self, callback):
+        """初始化检查点
+
+        Args:
+            callback: 之前的数据全部写入后调用的无参函数
+        """
+        self.callback = callback
+
+
+class StageStats:
+    """单个阶段的吞吐统计"""
+
+    def __init__(self, name):
+        """初始化统计
+
+        Args:
+            name: 阶段名称
+        """
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items, seconds):
+        """记录一次处理
+
+        Args:
+            items: 处理的条数
+            seconds: 处理耗时（不含等待队列的时间）
+        """
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def snapshot(self):
+        """获取当前统计数据
+
+        Returns:
+            dict: items为处理条数，busy_seconds为累计处理耗时，
+                items_per_second为按处理耗时计算的吞吐，越低越可能是瓶颈
+        """
+        with self._lock:
+            rate = self.items / self.busy_seconds if self.busy_seconds > 0 else 0.0
+            return {
+                'items': self.items,
+                'busy_seconds': self.busy_seconds,
+                'items_per_second': rate,
+            }
+
+
+class IngestPipeline:
+    """名言采集流水线
+
+    抓取线程把原始数据放入有界队列，转换线程将其转换为Quote对象，
+    唯一的写入线程按批次在事务中写入数据库。队列满时上游阻塞，形成背压。
+    每写入一批报告一次进度；取消标记在等待队列和批次之间检查，已提交的批次保留。
+
+    用法:
+        pipeline = IngestPipeline(Quote.from_dict)
+        pipeline.run([source1, source2])
+        inserted, skipped = pipeline.result
+    """
+
+    def __init__(self, transform, batch_size=500, queue_size=1000, transform_workers=1,
+                 flush_interval=0.5, progress=None, total=None, cancel_token=None):
+        """初始化流水线
+
+        Args:
+            transform: 将原始数据转换为Quote对象的函数，返回None表示丢弃
+            batch_size: 每个写入事务的最大条数
+            queue_size: 各阶段之间队列的容量
+            transform_workers: 转换线程数
+            flush_interval: 队列暂时没有新数据时，未满一批的数据最多等待的秒数
+            progress: 进度回调，参数为quotes.jobs.Progress，已完成条数为写入和跳过的条数之和
+            total: 预计的总条数，用于估计剩余时间，未知时为None
+            cancel_token: quotes.jobs.CancelToken对象，为None时不可取消
+        """
+        self.transform = transform
+        self.batch_size = batch_size
+        self.transform_workers = transform_workers
+        self.flush_interval = flush_interval
+        self.progress = progress
+        self.total = total
+        self.cancel_token = cancel_token
+
+        self.raw_queue = queue.Queue(maxsize=queue_size)
+        self.quote_queue = queue.Queue(maxsize=queue_size)
+
+        self.fetch_stats = StageStats('fetch')
+        self.transform_stats = StageStats('transform')
+        self.write_stats = StageStats('write')
+
+        self.inserted_count = 0
+        self.skipped_count = 0
+        self._error = None
+        self._stopped = threading.Event()
+        self._progress = None
+
+    @property
+    def result(self):
+        """写入结果
+
+        Returns:
+            tuple: (插入数量, 跳过数量)
+        """
+        return self.inserted_count, self.skipped_count
+
+    def stats(self):
+        """获取各阶段的吞吐统计和队列积压
+
+        Returns:
+            dict: 阶段名称到统计数据的映射，另含各队列当前长度
+        """
+        return {
+            'fetch': self.fetch_stats.snapshot(),
+            'transform': self.transform_stats.snapshot(),
+            'write': self.write_stats.snapshot(),
+            'raw_queue': self.raw_queue.qsize(),
+            'quote_queue': self.quote_queue.qsize(),
+        }
+
+    def run(self, sources):
+        """运行流水线直到所有数据源耗尽并写入完成
+
+        Args:
+            sources: 数据源列表，每个数据源是产生原始数据的可迭代对象，各自在一个抓取线程中遍历
+
+        Returns:
+            tuple: (插入数量, 跳过数量)
+
+        Raises:
+            PipelineError: 任一阶段失败
+            JobCancelled: 通过cancel_token取消
+        """
+        self._progress = ProgressTracker(self.progress, self.total)
+
+        # 性能分析模式下各阶段线程计入当前操作的分析
+        fetchers = [threading.Thread(target=bind_current(self._fetch), args=(source,), daemon=True)
+                    for source in sources]
+        transformers = [threading.Thread(target=bind_current(self._transform), daemon=True)
+                        for _ in range(self.transform_workers)]
+        writer = threading.Thread(target=bind_current(self._write), daemon=True)
+
+        for thread in fetchers + transformers + [writer]:
+            thread.start()
+
+        for thread in fetchers:
+            thread.join()
+        for _ in transformers:
+            self._put(self.raw_queue, _DONE)
+
+        for thread in transformers:
+            thread.join()
+        self._put(self.quote_queue, _DONE)
+
+        writer.join()
+
+        # 取消后各阶段提前退出引起的错误不再报告
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise JobCancelled(f"任务已取消，已写入 {self.inserted_count} 条")
+        if self._error is not None:
+            raise PipelineError(f"流水线执行失败: {self._error}") from self._error
+
+        return self.result
+
+    def _fail(self, error):
+        """记录第一个错误并通知所有阶段停止
+
+        Args:
+            error: 异常对象
+        """
+        if self._error is None:
+            self._error = error
+        self._stopped.set()
+
+    def _should_stop(self):
+        """流水线是否应停止，已请求取消时通知所有阶段停止
+
+        Returns:
+            bool: 是否应停止
+        """
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            self._stopped.set()
+        return self._stopped.is_set()
+
+    def _put(self, target_queue, item):
+        """向队列放入数据，队列满时阻塞，流水线停止后放弃
+
+        Args:
+            target_queue: 目标队列
+            item: 数据
+
+        Returns:
+            bool: 是否成功放入
+        """
+        while not self._should_stop():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue, timeout=None):
+        """从队列取出数据，流水线停止后返回结束标记
+
+        Args:
+            source_queue: 来源队列
+            timeout: 最长等待秒数，为None时一直等待
+
+        Returns:
+            数据、结束标记，超时时返回None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._should_stop():
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                return source_queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fetch(self, source):
+        """抓取阶段：遍历数据源，把原始数据放入队列
+
+        Args:
+            source: 原始数据的可迭代对象
+        """
+        iterator = None
+        try:
+            iterator = iter(source)
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                if not isinstance(item, Checkpoint):
+                    self.fetch_stats.record(1, time.perf_counter() - started)
+
+                if not self._put(self.raw_queue, item):
+                    return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            # 提前停止（取消或出错）时关闭生成器，让数据源（如爬虫的后台线程）及时结束
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    self._fail(e)
+
+    def _transform(self):
+        """转换阶段：把原始数据转换为Quote对象"""
+        try:
+            while True:
+                item = self._get(self.raw_queue)
+                if item is _DONE:
+                    return
+
+                if isinstance(item, Checkpoint):
+                    if not self._put(self.quote_queue, item):
+                        return
+                    continue
+
+                started = time.perf_counter()
+                quote = self.transform(item)
+                self.transform_stats.record(1, time.perf_counter() - started)
+
+                if quote is not None and not self._put(self.quote_queue, quote):
+                    return
+        except Exception as e:
+            self._fail(e)
+
+    def _write(self):
+        """写入阶段：攒够一批或队列暂时为空时在一个事务中写入"""
+        try:
+            done = False
+            while not done:
+                batch = []
+                checkpoint = None
+                while len(batch) < self.batch_size:
+                    # 已有数据时最多再等待flush_interval秒，避免少量数据迟迟不落库
+                    quote = self._get(self.quote_queue, self.flush_interval if batch else None)
+                    if quote is None:
+                        break
+                    if quote is _DONE:
+                        done = True
+                        break
+                    if isinstance(quote, Checkpoint):
+                        checkpoint = quote
+                        break
+                    batch.append(quote)
+
+                # 取消或失败时丢弃尚未提交的数据
+                if self._should_stop():
+                    break
+
+                if batch:
+                    started = time.perf_counter()
+                    inserted, skipped = insert_or_ignore_quotes(batch, batch_size=len(batch))
+                    self.write_stats.record(len(batch), time.perf_counter() - started)
+                    self.inserted_count += inserted
+                    self.skipped_count += skipped
+                    self._progress.update(self.inserted_count + self.skipped_count)
+
+                if checkpoint is not None:
+                    checkpoint.callback()
+            self._progress.update(self.inserted_count + self.skipped_count, force=True)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            close_db_connection()
+
+
+def format_stats(stats):
+    """将流水线统计格式化为一行文本
+
+    Args:
+        stats: IngestPipeline.stats()的结果
+
+    Returns:
+        str: 统计文本
+    """
+    names = {'fetch': '抓取', 'transform': '转换', 'write': '写入'}
+    parts = []
+    for stage, name in names.items():
+        stage_stats = stats[stage]
+        parts.append(f"{name} {stage_stats['items']} 条/{stage_stats['busy_seconds']:.2f}s"
+                     f"（{stage_stats['items_per_second']:.0f} 条/秒）")
+    return "，".join(parts)
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能分析模式：用cProfile和tracemalloc分析命令行菜单和界面按钮的每次操作
+
+开启后每次操作写出一个.prof文件（可用pstats或snakeviz查看），并打印自身耗时最多的函数、
+内存峰值，以及各线程耗时在数据库、网络、界面和等待之间的分布。
+设置环境变量QUOTES_PROFILE=1或使用--profile参数开启，QUOTES_PROFILE_DIR/--profile-dir
+指定输出目录，QUOTES_PROFILE_TOP/--profile-top指定打印的函数数。
+开启后程序明显变慢（tracemalloc记录每次内存分配），只用于排查问题。
+
+cProfile只分析调用它的线程：操作在其他线程中执行的部分需要通过ActionProfile.call()
+或bind_current()执行才会被计入。
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# 默认的分析文件目录
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'profiles')
+
+# 默认打印的函数数
+DEFAULT_TOP = 20
+
+# 耗时分类及显示名称，按显示顺序排列
+CATEGORIES = (('db', '数据库'), ('network', '网络'), ('ui', '界面'), ('wait', '等待'),
+              ('other', '其他'))
+
+# 按文件路径归类的Python函数，路径使用/分隔
+_PATH_CATEGORIES = (
+    ('db', ('/quotes/database.py', '/quotes/instrumentation.py', '/sqlite3/')),
+    ('network', ('/quotes/http_client.py', '/requests/', '/urllib3/', '/http/client.py',
+                 '/socket.py', '/ssl.py')),
+    ('ui', ('/tkinter/', '/ui.py')),
+)
+
+# 按名称归类的内置函数（cProfile中文件名为'~'），InstrumentedConnection/InstrumentedCursor
+# 通过super()调用的sqlite3方法也记在这里
+_BUILTIN_CATEGORIES = (
+    ('db', ('sqlite3.', 'InstrumentedConnection.', 'InstrumentedCursor.')),
+    ('wait', ("of '_thread.", 'time.sleep', "'control' of 'select.epoll'")),
+    ('network', ('_socket.', '_ssl.', 'select.')),
+    ('ui', ('_tkinter.', 'builtins.print')),
+)
+
+# 不能出现在文件名中的字符
+_UNSAFE_NAME = re.compile(r'[^\w.-]+')
+
+# 当前线程正在执行的分析
+_local = threading.local()
+
+# 正在进行的分析数，全部结束后停止tracemalloc
+_active_count = 0
+_started_tracemalloc = False
+_active_lock = threading.Lock()
+
+
+def _env_settings():
+    """读取环境变量中的设置
+
+    Returns:
+        tuple: (是否开启, 输出目录, 打印的函数数)
+    """
+    enabled = os.environ.get('QUOTES_PROFILE', '') not in ('', '0')
+    output_dir = os.environ.get('QUOTES_PROFILE_DIR') or PROFILE_DIR
+    top = int(os.environ.get('QUOTES_PROFILE_TOP', DEFAULT_TOP))
+    return enabled, output_dir, top
+
+
+_enabled, _output_dir, _top = _env_settings()
+
+
+def enable(output_dir=None, top=None):
+    """开启性能分析模式
+
+    Args:
+        output_dir: 分析文件目录，为None时保持不变
+        top: 打印的函数数，为None时保持不变
+    """
+    global _enabled, _output_dir, _top
+
+    _enabled = True
+    if output_dir is not None:
+        _output_dir = output_dir
+    if top is not None:
+        _top = top
+
+
+def disable():
+    """关闭性能分析模式，已开始的分析仍会完成"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """是否开启了性能分析模式
+
+    Returns:
+        bool: 是否开启
+    """
+    return _enabled
+
+
+def add_arguments(parser):
+    """为命令行解析器添加性能分析参数
+
+    Args:
+        parser: argparse.ArgumentParser对象
+    """
+    parser.add_argument("--profile", action="store_true",
+                        help="性能分析模式：用cProfile和tracemalloc分析每次操作")
+    parser.add_argument("--profile-dir", help=f"分析文件目录，默认为{PROFILE_DIR}")
+    parser.add_argument("--profile-top", type=int, help=f"打印的函数数，默认为{DEFAULT_TOP}")
+
+
+def configure(args):
+    """按add_arguments()添加的命令行参数开启性能分析模式
+
+    Args:
+        args: 解析后的命令行参数
+    """
+    if args.profile:
+        enable(args.profile_dir, args.profile_top)
+
+
+def start(name):
+    """开始分析一次操作
+
+    Args:
+        name: 操作名，用于分析文件名和报告
+
+    Returns:
+        ActionProfile: 分析对象，未开启性能分析模式时返回None
+    """
+    if not _enabled:
+        return None
+    return ActionProfile(name, _output_dir, _top)
+
+
+@contextmanager
+def profile_action(name):
+    """在当前线程中分析一段代码，结束后写出分析文件并打印报告；未开启时不做任何事
+
+    用法:
+        with profile_action('crawl'):
+            crawl_quotes()
+
+    Args:
+        name: 操作名
+    """
+    profile = start(name)
+    if profile is None:
+        yield
+        return
+
+    try:
+        with profile.running():
+            yield
+    finally:
+        profile.finish()
+
+
+def bind_current(function):
+    """让函数在当前线程所属的分析中执行，用于把操作派生的线程计入分析
+
+    用法:
+        threading.Thread(target=bind_current(worker))
+
+    Args:
+        function: 在其他线程中执行的函数
+
+    Returns:
+        function: 当前线程不在分析中时原样返回
+    """
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return profile.call(function, *args, **kwargs)
+
+    return wrapper
+
+
+def _tracemalloc_acquire():
+    """开始一次分析时调用，必要时启动tracemalloc"""
+    global _active_count, _started_tracemalloc
+
+    with _active_lock:
+        _active_count += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+
+
+def _tracemalloc_release():
+    """结束一次分析时调用，全部分析结束后停止自己启动的tracemalloc"""
+    global _active_count, _started_tracemalloc
+
+    with _active_lock:
+        _active_count -= 1
+        if _active_count == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+class _CollectedStats:
+    """已收集的cProfile统计，供pstats.Stats合并（pstats会调用create_stats()）"""
+
+    def __init__(self, stats):
+        """保存统计
+
+        Args:
+            stats: cProfile.Profile.stats
+        """
+        self.stats = stats
+
+    def create_stats(self):
+        """统计已在收集时生成"""
+
+
+class ActionProfile:
+    """一次操作的性能分析
+
+    操作可以分多次、在多个线程中执行（如后台查询和界面回调），每次通过call()执行，
+    各线程的cProfile结果在finish()时合并。内存峰值是开始分析以来整个进程的峰值，
+    同时进行多个分析时会相互影响。
+    """
+
+    def __init__(self, name, output_dir, top):
+        """开始分析
+
+        Args:
+            name: 操作名
+            output_dir: 分析文件目录
+            top: 打印的函数数
+        """
+        self.name = name
+        self.output_dir = output_dir
+        self.top = top
+        self._stats = []
+        self._lock = threading.Lock()
+        self._finished = False
+
+        _tracemalloc_acquire()
+        tracemalloc.reset_peak()
+        self._memory_start = tracemalloc.get_traced_memory()[0]
+        self._started_at = datetime.now()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def running(self):
+        """在当前线程中开启cProfile，with语句中执行的代码计入本次分析
+
+        当前线程已在分析中（嵌套调用）时不重复开启，耗时计入外层分析。
+        """
+        if self._finished or getattr(_local, 'profile', None) is not None:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        _local.profile = self
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _local.profile = None
+            # 在执行的线程中生成统计，合并时不再操作profiler
+            profiler.create_stats()
+            with self._lock:
+                self._stats.append(profiler.stats)
+
+    def call(self, function, *args, **kwargs):
+        """在cProfile下执行函数，计入本次分析
+
+        Args:
+            function: 函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数的返回值
+        """
+        with self.running():
+            return function(*args, **kwargs)
+
+    def wrap(self, function):
+        """包装函数，使其每次调用都通过call()执行
+
+        Args:
+            function: 函数，为None时返回None
+
+        Returns:
+            function: 包装后的函数
+        """
+        if function is None:
+            return None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return self.call(function, *args, **kwargs)
+
+        return wrapper
+
+    def discard(self):
+        """放弃本次分析（如操作被新的请求取代），不写文件也不打印"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        _tracemalloc_release()
+
+    def finish(self):
+        """结束分析，写出分析文件并打印报告
+
+        Returns:
+            str: 报告文本，已结束或没有执行过call()时返回None
+        """
+        wall_seconds = time.perf_counter() - self._started
+        with self._lock:
+            if self._finished:
+                return None
+            self._finished = True
+            collected = list(self._stats)
+        memory_current, memory_peak = tracemalloc.get_traced_memory()
+        _tracemalloc_release()
+
+        if not collected:
+            return None
+
+        stats = pstats.Stats()
+        stats.add(*(_CollectedStats(item) for item in collected))
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = self._profile_path()
+        stats.dump_stats(path)
+
+        lines = [
+            f"【性能分析】{self.name} 耗时 {wall_seconds:.3f} s，分析文件 {path}",
+            f"内存峰值 {memory_peak / 1048576:.1f} MB（开始时 {self._memory_start / 1048576:.1f} MB，"
+            f"结束时 {memory_current / 1048576:.1f} MB）",
+            "各线程耗时分布: " + "，".join(f"{label} {seconds:.3f} s"
+                                          for label, seconds in category_times(stats)),
+            f"自身耗时最多的 {self.top} 个函数:",
+        ]
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.strip_dirs().sort_stats('tottime').print_stats(self.top)
+        lines.append(stream.getvalue().strip('\n'))
+
+        report = "\n".join(lines)
+        print(report)
+        return report
+
+    def _profile_path(self):
+        """生成不与已有文件重名的分析文件路径
+
+        Returns:
+            str: 文件路径
+        """
+        base = f"{_UNSAFE_NAME.sub('_', self.name)}-{self._started_at:%Y%m%d-%H%M%S}"
+        path = os.path.join(self.output_dir, f"{base}.prof")
+        number = 1
+        while os.path.exists(path):
+            number += 1
+            path = os.path.join(self.output_dir, f"{base}-{number}.prof")
+        return path
+
+
+def categorize(filename, function_name):
+    """判断函数的耗时属于哪一类
+
+    Args:
+        filename: cProfile记录的文件名，内置函数为'~'
+        function_name: 函数名，内置函数为形如"<method 'execute' of 'sqlite3.Cursor' objects>"的描述
+
+    Returns:
+        str: 'db'、'network'、'ui'、'wait'或'other'
+    """
+    if filename == '~':
+        for category, patterns in _BUILTIN_CATEGORIES:
+            if any(pattern in function_name for pattern in patterns):
+                return category
+        return 'other'
+
+    path = filename.replace('\\', '/')
+    for category, patterns in _PATH_CATEGORIES:
+        if any(pattern in path for pattern in patterns):
+            return category
+    return 'other'
+
+
+def category_times(stats):
+    """按自身耗时（tottime）统计各类耗时，多个线程的耗时相加
+
+    Args:
+        stats: pstats.Stats对象，需在strip_dirs()之前调用
+
+    Returns:
+        list: (分类显示名称, 秒数)列表，按CATEGORIES的顺序排列
+    """
+    totals = {category: 0.0 for category, _ in CATEGORIES}
+    for (filename, _, function_name), (_, _, tottime, _, _) in stats.stats.items():
+        totals[categorize(filename, function_name)] += tottime
+    return [(label, totals[category]) for category, label in CATEGORIES]
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台查询线程，供界面在主线程之外访问数据库
+"""
+
+import queue
+import sqlite3
+import threading
+
+from quotes import profiling
+from quotes.database import get_db_connection, close_db_connection
+
+
+# 请求队列的结束标记
+_STOP = object()
+
+
+class QueryWorker:
+    """后台查询线程
+
+    界面线程用submit()提交查询，查询在唯一的后台线程中依次执行，结果放入结果队列；
+    界面线程定时调用poll()，在自己的线程中执行回调，回调里可以安全地操作界面。
+
+    每个请求属于一个通道，同一通道的新请求会取代旧请求：排队中的旧请求直接跳过，
+    正在执行的旧查询被中断，已完成的旧结果被丢弃。其他线程（如爬取线程）
+    需要更新界面时，用post()把回调交给界面线程执行。
+    """
+
+    def __init__(self):
+        """初始化并启动后台线程"""
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._generations = {}
+        self._running = None
+        self._connection = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, channel, function, *args, callback=None, error_callback=None, action=None,
+               **kwargs):
+        """提交查询，取代同一通道中尚未完成的请求
+
+        Args:
+            channel: 通道名称
+            function: 在后台线程中执行的函数
+            *args: 位置参数
+            callback: 成功后在界面线程中调用，参数为函数的返回值
+            error_callback: 失败后在界面线程中调用，参数为异常对象
+            action: 操作名，性能分析模式下后台函数和回调作为该操作的一次分析，被取代时放弃
+            **kwargs: 关键字参数
+
+        Returns:
+            int: 请求的代数
+        """
+        with self._lock:
+            generation = self._generations.get(channel, 0) + 1
+            self._generations[channel] = generation
+            self._interrupt_running(channel)
+
+        profile = profiling.start(action) if action is not None else None
+        self._requests.put((channel, generation, function, args, kwargs, callback, error_callback,
+                            profile))
+        return generation
+
+    def cancel(self, channel):
+        """取消通道中尚未完成的请求
+
+        Args:
+            channel: 通道名称
+        """
+        with self._lock:
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+            self._interrupt_running(channel)
+
+    def post(self, callback, *args):
+        """让界面线程执行回调，可在任意线程调用
+
+        Args:
+            callback: 回调函数
+            *args: 参数
+        """
+        self._results.put((None, None, callback, args, None))
+
+    def poll(self, limit=100):
+        """在界面线程中执行已完成请求的回调
+
+        Args:
+            limit: 本次最多处理的结果数，避免长时间占用界面线程
+
+        Returns:
+            int: 执行的回调数
+        """
+        handled = 0
+        while handled < limit:
+            try:
+                channel, generation, callback, args, profile = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            if channel is not None and not self._is_current(channel, generation):
+                if profile is not None:
+                    profile.discard()
+                continue
+            try:
+                if callback is not None:
+                    if profile is None:
+                        callback(*args)
+                    else:
+                        profile.call(callback, *args)
+                    handled += 1
+            finally:
+                # 回调执行完即操作结束
+                if profile is not None:
+                    profile.finish()
+
+        return handled
+
+    def stop(self):
+        """停止后台线程，未执行的请求被丢弃"""
+        with self._lock:
+            for channel in list(self._generations):
+                self._generations[channel] += 1
+                self._interrupt_running(channel)
+        self._requests.put(_STOP)
+        self._thread.join()
+
+    def _is_current(self, channel, generation):
+        """请求是否仍是通道中最新的请求
+
+        Args:
+            channel: 通道名称
+            generation: 请求的代数
+
+        Returns:
+            bool: 是否最新
+        """
+        with self._lock:
+            return self._generations.get(channel) == generation
+
+    def _interrupt_running(self, channel):
+        """中断该通道正在执行的查询，调用方需持有锁
+
+        Args:
+            channel: 通道名称
+        """
+        if self._running == channel and self._connection is not None:
+            self._connection.interrupt()
+
+    def _run(self):
+        """后台线程主循环"""
+        try:
+            while True:
+                request = self._requests.get()
+                if request is _STOP:
+                    break
+
+                (channel, generation, function, args, kwargs, callback, error_callback,
+                 profile) = request
+
+                with self._lock:
+                    if self._generations.get(channel) != generation:
+                        if profile is not None:
+                            profile.discard()
+                        continue
+                    self._connection = get_db_connection()
+                    self._running = channel
+
+                if profile is not None:
+                    function = profile.wrap(function)
+
+                try:
+                    result = function(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    # 被新请求中断的查询不需要报告
+                    if self._is_current(channel, generation):
+                        self._results.put((channel, generation, error_callback, (e,), profile))
+                    elif profile is not None:
+                        profile.discard()
+                except Exception as e:
+                    self._results.put((channel, generation, error_callback, (e,), profile))
+                else:
+                    self._results.put((channel, generation, callback, (result,), profile))
+                finally:
+                    with self._lock:
+                        self._running = None
+        finally:
+            with self._lock:
+                self._connection = None
+            close_db_connection()
@@ -4,15 +4,35 @@
 AI爬虫模块，用于爬取名言数据
 """
 
-import requests
-import time
 import random
+from itertools import takewhile
 from quotes.models import Quote
-from quotes.database import insert_quote, get_quote_count, get_quote_by_content
+from quotes.database import (get_quote_count, get_crawl_state, get_crawl_states, save_crawl_state,
+                             delete_crawl_state, refresh_statistics)
+from quotes.crawler import AsyncCrawler, DEFAULT_API_BASE_URL
+from quotes.http_client import HttpClient, get_http_client
+from quotes.jobs import CancelToken, JobCancelled, print_progress
+from quotes.pipeline import IngestPipeline, Checkpoint, format_stats
 
 
-def crawl_quotes():
-    """爬取名言数据并写入数据库"""
+# 示例数据的爬取状态标识
+SAMPLE_SOURCE = "sample"
+
+
+def crawl_quotes(restart=False, progress=None, cancel_token=None):
+    """爬取名言数据并写入数据库
+    
+    每条数据落库后记录断点，中断或取消后再次运行会从断点继续。
+    
+    Args:
+        restart: 为True时忽略已有断点，从头开始爬取
+        progress: 进度回调，参数为quotes.jobs.Progress
+        cancel_token: quotes.jobs.CancelToken对象，为None时不可取消
+    
+    Raises:
+        JobCancelled: 通过cancel_token取消
+    """
+    cancel_token = cancel_token or CancelToken()
     print("开始爬取名言数据...")
     
     # 示例名言数据，实际项目中可以从API或网页爬取
@@ -84,103 +104,216 @@ def crawl_quotes():
         }
     ]
     
-    # 爬取并写入数据
-    new_count = 0
+    # 读取断点，跳过已完成的部分
+    if restart:
+        delete_crawl_state(SAMPLE_SOURCE)
+    state = get_crawl_state(SAMPLE_SOURCE)
+    start = int(state['cursor']) + 1 if state and state['cursor'] else 0
     
-    for quote_data in sample_quotes:
-        # 检查是否已存在相同内容的名言
-        existing_quote = get_quote_by_content(quote_data["content"])
-        
-        if existing_quote:
-            print(f"名言已存在，跳过: {quote_data['content']}")
-            continue
-        
-        # 创建Quote对象
-        quote = Quote(
-            content=quote_data["content"],
-            pinyin=quote_data["pinyin"],
-            author=quote_data["author"],
-            dynasty=quote_data["dynasty"],
-            sentiment=quote_data["sentiment"],
-            meaning=quote_data["meaning"],
-            usage_scene=quote_data["usage_scene"],
-            category=quote_data["category"],
-            allusion=quote_data["allusion"],
-            translation=quote_data["translation"],
-            usage_notes=quote_data["usage_notes"]
-        )
-        
-        # 写入数据库
-        insert_quote(quote)
-        print(f"已写入名言: {quote.content}")
-        new_count += 1
-        
-        # 模拟爬取延迟
-        time.sleep(random.uniform(0.5, 1.5))
+    if start >= len(sample_quotes):
+        print("示例数据已全部爬取，无需重复爬取")
+        return
+    if start > 0:
+        print(f"从断点继续，跳过前 {start} 条已爬取的名言")
+    
+    def fetch_quotes():
+        """抓取阶段：逐条获取名言数据"""
+        for index in range(start, len(sample_quotes)):
+            quote_data = sample_quotes[index]
+            print(f"已获取名言: {quote_data['content']}")
+            yield quote_data
+            # 该条写入后保存断点
+            yield Checkpoint(lambda index=index: save_crawl_state(SAMPLE_SOURCE, cursor=str(index)))
+            
+            # 模拟爬取延迟，取消时立即停止
+            if cancel_token.wait(random.uniform(0.5, 1.5)):
+                return
+    
+    # 抓取、转换和写入并行执行，内容已存在的名言由数据库跳过
+    pipeline = IngestPipeline(Quote.from_dict, progress=progress, total=len(sample_quotes) - start,
+                              cancel_token=cancel_token)
+    new_count, skipped_count = pipeline.run([fetch_quotes()])
     
     # 打印爬取结果
     total_count = get_quote_count()
-    print(f"爬取完成，共写入 {new_count} 条新名言，数据库中共有 {total_count} 条名言")
+    print(f"爬取完成，共写入 {new_count} 条新名言，跳过 {skipped_count} 条已存在的名言，"
+          f"数据库中共有 {total_count} 条名言")
+    print(f"各阶段统计: {format_stats(pipeline.stats())}")
 
 
-def crawl_from_api():
+def crawl_from_api(base_url=DEFAULT_API_BASE_URL, pages=5, page_size=20, max_in_flight=8, rate=5.0,
+                   refresh=False, restart=False, use_cache=True, progress=None, cancel_token=None):
     """从API爬取名言数据（示例）
     
     实际项目中可以使用公开的名言API，如：
     - https://api.quotable.io/quotes
     - https://zenquotes.io/api/quotes
+    
+    多个分页并发抓取，按主机限速，失败的请求自动重试。每页数据落库后记录断点和
+    ETag/Last-Modified，再次运行时只抓取断点之后的新页；重新请求已抓取过的页时
+    发送条件请求，未变化的页（304）直接跳过。请求复用共享的连接池，成功的响应
+    缓存在磁盘上，有效期内重复抓取（如restart后重新解析）直接使用缓存。
+    
+    Args:
+        base_url: API根地址，测试时可指向本地模拟服务
+        pages: 抓取的页数
+        page_size: 每页的名言数量
+        max_in_flight: 同时进行的最大请求数
+        rate: 每秒允许的请求数
+        refresh: 为True时用条件请求重新检查断点之前的页
+        restart: 为True时清除断点和校验信息，从头开始爬取
+        use_cache: 为False时不读写磁盘缓存，始终请求网络
+        progress: 进度回调，参数为quotes.jobs.Progress
+        cancel_token: quotes.jobs.CancelToken对象，为None时不可取消
+    
+    Raises:
+        JobCancelled: 通过cancel_token取消
     """
     print("从API爬取名言数据...")
+    cancel_token = cancel_token or CancelToken()
+    
+    # 断点记录在"page=*"上，各页的校验信息记录在对应页码上
+    source_prefix = f"api:{base_url}quotes?limit={page_size}&"
+    list_source = f"{source_prefix}page=*"
+    
+    def page_source(page):
+        return f"{source_prefix}page={page}"
+    
+    if restart:
+        delete_crawl_state(source_prefix)
+    states = get_crawl_states(source_prefix)
+    
+    summary = states.get(list_source)
+    done_page = int(summary['cursor']) if summary and summary['cursor'] else 0
+    first_page = 1 if refresh else done_page + 1
+    
+    if first_page > pages:
+        print(f"前 {pages} 页已全部爬取，无需重复爬取")
+        return
+    if first_page > 1:
+        print(f"从断点继续，从第 {first_page} 页开始爬取")
+    
+    def conditional_headers(page):
+        """为抓取过的页生成条件请求头"""
+        state = states.get(page_source(page))
+        if state is None:
+            return None
+        headers = {}
+        if state['etag']:
+            headers["If-None-Match"] = state['etag']
+        if state['last_modified']:
+            headers["If-Modified-Since"] = state['last_modified']
+        return headers or None
+    
+    completed_pages = set(range(1, done_page + 1))
+    not_modified_pages = []
+    
+    def make_checkpoint(page, response):
+        """生成该页落库后保存断点的检查点"""
+        completed_pages.add(page)
+        
+        # 断点为从第1页起连续完成的最后一页，失败的页下次会重新抓取
+        cursor = done_page
+        while cursor + 1 in completed_pages:
+            cursor += 1
+        
+        # 304响应可能不带校验信息，此时保留之前保存的，避免下次变成无条件请求
+        state = states.get(page_source(page))
+        etag = response.headers.get("ETag") or (state['etag'] if state else None)
+        last_modified = (response.headers.get("Last-Modified")
+                         or (state['last_modified'] if state else None))
+        
+        def save():
+            save_crawl_state(page_source(page), etag=etag, last_modified=last_modified)
+            save_crawl_state(list_source, cursor=str(cursor))
+        
+        return Checkpoint(save)
     
     # 示例：使用quotable.io API获取英文名言
-    try:
-        response = requests.get("https://api.quotable.io/quotes?limit=5")
-        if response.status_code == 200:
-            quotes_data = response.json()
-            new_count = 0
-            
-            for quote_data in quotes_data:
-                # 检查是否已存在相同内容的名言
-                existing_quote = get_quote_by_content(quote_data["content"])
-                
-                if existing_quote:
-                    print(f"名言已存在，跳过: {quote_data['content']}")
-                    continue
-                
-                # 简化处理，只提取部分字段
-                quote = Quote(
-                    content=quote_data["content"],
-                    pinyin="",  # 英文名言无拼音
-                    author=quote_data["author"],
-                    dynasty="",
-                    sentiment="褒义",
-                    meaning="",
-                    usage_scene="",
-                    category="",
-                    allusion="",
-                    translation="",
-                    usage_notes=""
-                )
-                
-                insert_quote(quote)
-                print(f"已写入名言: {quote.content}")
-                new_count += 1
-                time.sleep(random.uniform(0.5, 1.5))
+    def fetch_quotes():
+        """抓取阶段：并发抓取分页，按完成顺序逐条返回名言数据"""
+        session = get_http_client() if use_cache else HttpClient(get_http_client().session)
+        crawler = AsyncCrawler(base_url=base_url, max_in_flight=max_in_flight, rate=rate,
+                               session=session)
+        
+        # 取消后不再发出新的请求
+        page_numbers = takewhile(lambda _: not cancel_token.cancelled, range(first_page, pages + 1))
+        for page, response in crawler.iter_pages("quotes", page_numbers,
+                                                 params={"limit": page_size},
+                                                 headers_for=conditional_headers):
+            if isinstance(response, Exception):
+                print(f"第 {page} 页爬取失败: {response}")
+                continue
+            if response.status_code == 304:
+                not_modified_pages.append(page)
+                yield make_checkpoint(page, response)
+                continue
+            if response.status_code != 200:
+                print(f"第 {page} 页爬取失败: HTTP {response.status_code}")
+                continue
             
-            if new_count > 0:
-                total_count = get_quote_count()
-                print(f"API爬取完成，共写入 {new_count} 条新名言，数据库中共有 {total_count} 条名言")
-            else:
-                print("API爬取完成，未发现新名言")
+            yield from _extract_api_results(response.json())
+            yield make_checkpoint(page, response)
+    
+    def to_quote(quote_data):
+        """转换阶段：简化处理，只提取部分字段"""
+        return Quote(
+            content=quote_data["content"],
+            pinyin="",  # 英文名言无拼音
+            author=quote_data["author"],
+            sentiment="褒义"
+        )
+    
+    try:
+        # 抓取、转换和写入并行执行，内容已存在的名言由数据库跳过
+        pipeline = IngestPipeline(to_quote, progress=progress,
+                                  total=(pages - first_page + 1) * page_size, cancel_token=cancel_token)
+        new_count, skipped_count = pipeline.run([fetch_quotes()])
+        if not_modified_pages:
+            print(f"{len(not_modified_pages)} 页内容未变化，已跳过")
+        if skipped_count:
+            print(f"跳过 {skipped_count} 条已存在的名言")
+        
+        if new_count > 0:
+            total_count = get_quote_count()
+            print(f"API爬取完成，共写入 {new_count} 条新名言，数据库中共有 {total_count} 条名言")
+        else:
+            print("API爬取完成，未发现新名言")
+        print(f"各阶段统计: {format_stats(pipeline.stats())}")
+    except JobCancelled:
+        raise
     except Exception as e:
         print(f"API爬取失败: {e}")
 
 
-def generate_mass_quotes(count=10000):
+def _extract_api_results(data):
+    """从API响应中取出名言列表
+    
+    quotable.io的分页接口返回{"results": [...]}，部分接口直接返回列表。
+    
+    Args:
+        data: 解析后的JSON数据
+    
+    Returns:
+        list: 名言字典列表
+    """
+    if isinstance(data, dict):
+        return data.get("results", [])
+    return data
+
+
+def generate_mass_quotes(count=10000, progress=print_progress, cancel_token=None):
     """批量获取真实名言数据
     
+    生成速度由写入速度决定：流水线队列满时生成阶段阻塞，不会在内存中积压。
+    
     Args:
         count: 要获取的名言数量
+        progress: 进度回调，参数为quotes.jobs.Progress，默认打印到命令行
+        cancel_token: quotes.jobs.CancelToken对象，为None时不可取消
+    
+    Raises:
+        JobCancelled: 通过cancel_token取消，已写入的批次保留
     """
     print(f"开始批量获取 {count} 条真实名言数据...")
     
@@ -324,55 +457,33 @@ def generate_mass_quotes(count=10000):
     # 分类
     categories = ["教育", "道德", "治国", "修身", "哲理", "情感", "生活"]
     
-    new_count = 0
+    def fetch_quotes():
+        """抓取阶段：逐条生成名言数据"""
+        for i in range(1, count + 1):
+            # 循环使用真实名言数据
+            quote_data = real_quotes[(i - 1) % len(real_quotes)].copy()
+            
+            # 为了增加多样性，对部分字段进行微调
+            if i > len(real_quotes):
+                # 对内容进行微小修改，确保唯一性
+                quote_data["content"] = f"{quote_data['content']}（变体{i}）"
+                quote_data["pinyin"] = f"{quote_data['pinyin']}（biàn tǐ {i}）"
+                quote_data["translation"] = f"{quote_data['translation']} (variant {i})"
+            
+            yield quote_data
     
-    for i in range(1, count + 1):
-        # 循环使用真实名言数据
-        quote_data = real_quotes[(i - 1) % len(real_quotes)].copy()
-        
-        # 为了增加多样性，对部分字段进行微调
-        if i > len(real_quotes):
-            # 对内容进行微小修改，确保唯一性
-            quote_data["content"] = f"{quote_data['content']}（变体{i}）"
-            quote_data["pinyin"] = f"{quote_data['pinyin']}（biàn tǐ {i}）"
-            quote_data["translation"] = f"{quote_data['translation']} (variant {i})"
-        
-        # 检查是否已存在相同内容的名言
-        existing_quote = get_quote_by_content(quote_data["content"])
-        
-        if existing_quote:
-            print(f"名言已存在，跳过: {quote_data['content']}")
-            continue
-        
-        # 创建Quote对象
-        quote = Quote(
-            content=quote_data["content"],
-            pinyin=quote_data["pinyin"],
-            author=quote_data["author"],
-            dynasty=quote_data["dynasty"],
-            sentiment=quote_data["sentiment"],
-            meaning=quote_data["meaning"],
-            usage_scene=quote_data["usage_scene"],
-            category=quote_data["category"],
-            allusion=quote_data["allusion"],
-            translation=quote_data["translation"],
-            usage_notes=quote_data["usage_notes"]
-        )
-        
-        # 写入数据库
-        insert_quote(quote)
-        
-        # 每100条打印一次进度
-        if i % 100 == 0:
-            print(f"已获取 {i} 条名言")
-        
-        new_count += 1
-        
-        # 每1000条休息一下，避免数据库压力过大
-        if i % 1000 == 0:
-            print("休息2秒，避免数据库压力过大...")
-            time.sleep(2)
+    # 抓取、转换和写入并行执行，每个批次一次提交，内容已存在的名言由数据库跳过。
+    # 队列最多容纳两批，生成阶段领先写入不超过两批，由此形成背压
+    pipeline = IngestPipeline(Quote.from_dict, batch_size=1000, queue_size=2000,
+                              progress=progress, total=count, cancel_token=cancel_token)
+    try:
+        new_count, skipped_count = pipeline.run([fetch_quotes()])
+    finally:
+        # 数据量变化较大时更新统计信息，使排序分页继续走索引（取消时已写入的部分同样计入）
+        refresh_statistics()
     
     # 打印获取结果
     total_count = get_quote_count()
-    print(f"批量获取完成，共写入 {new_count} 条新名言，数据库中共有 {total_count} 条名言")
+    print(f"批量获取完成，共写入 {new_count} 条新名言，跳过 {skipped_count} 条已存在的名言，"
+          f"数据库中共有 {total_count} 条名言")
+    print(f"各阶段统计: {format_stats(pipeline.stats())}")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+名言表格的数据模型，与界面库无关，供UI按需读取数据
+"""
+
+from quotes.cache import LRUCache
+from quotes.database import get_quote_count, get_quotes_at, get_quotes_by_cursor
+
+
+class PagedTableModel:
+    """分页模式的数据模型
+
+    缓存最近读取的若干页，与已缓存页相邻的页用其边界游标做keyset查询，
+    其他页按位置读取。总数在建立模型时读取，数据变化或排序改变后需要新建模型
+    或调用invalidate()。
+    """
+
+    def __init__(self, order_by='id', order_dir='asc', page_size=10, max_pages=16):
+        """初始化模型
+
+        Args:
+            order_by: 排序字段
+            order_dir: 排序方向
+            page_size: 每页数量
+            max_pages: 最多缓存的页数
+        """
+        self.order_by = order_by
+        self.order_dir = order_dir
+        self.page_size = page_size
+        self._pages = LRUCache(max_pages, ttl=None)
+        self.total_count = get_quote_count()
+
+    @property
+    def total_pages(self):
+        """总页数"""
+        return (self.total_count + self.page_size - 1) // self.page_size
+
+    def invalidate(self):
+        """丢弃缓存的页并重新读取总数"""
+        self._pages.clear()
+        self.total_count = get_quote_count()
+
+    def clamp(self, page):
+        """页码超出范围时回到首页
+
+        Args:
+            page: 页码
+
+        Returns:
+            int: 有效的页码
+        """
+        return page if 1 <= page <= max(self.total_pages, 1) else 1
+
+    def cached_page(self, page):
+        """只从缓存读取一页，不访问数据库，可在界面线程中调用
+
+        Args:
+            page: 页码
+
+        Returns:
+            tuple: (名言列表, 上一页游标, 下一页游标)，未缓存时返回None
+        """
+        return self._pages.get(self.clamp(page))
+
+    def page(self, page):
+        """读取一页，优先使用缓存
+
+        Args:
+            page: 页码，超出范围时读取首页
+
+        Returns:
+            tuple: (名言列表, 上一页游标, 下一页游标)
+        """
+        page = self.clamp(page)
+        result = self._pages.get(page)
+        if result is not None:
+            return result
+
+        previous = self._pages.get(page - 1)
+        following = self._pages.get(page + 1)
+        if page == 1:
+            result = get_quotes_by_cursor(None, self.page_size, self.order_by, self.order_dir, 'first')
+        elif page == self.total_pages:
+            # 末页只取最后不足一页的部分，使页边界与其他页对齐
+            limit = self.total_count - (self.total_pages - 1) * self.page_size
+            result = get_quotes_by_cursor(None, limit, self.order_by, self.order_dir, 'last')
+        elif previous is not None and previous[2] is not None:
+            result = get_quotes_by_cursor(previous[2], self.page_size, self.order_by, self.order_dir, 'next')
+        elif following is not None and following[1] is not None:
+            result = get_quotes_by_cursor(following[1], self.page_size, self.order_by, self.order_dir, 'prev')
+        else:
+            result = get_quotes_at((page - 1) * self.page_size, self.page_size, self.order_by, self.order_dir)
+
+        self._pages.put(page, result)
+        return result
+
+    def prefetch(self, page):
+        """预先读取前后各一页，翻到相邻页时无需等待
+
+        Args:
+            page: 当前页码
+        """
+        for neighbour in (page + 1, page - 1):
+            if 1 <= neighbour <= self.total_pages:
+                self.page(neighbour)
+
+
+class VirtualTableModel:
+    """虚拟滚动的数据模型
+
+    把排序后的全部名言按block_size分块，只读取视口附近的块，最近用过的块缓存在内存中。
+    相邻的块已缓存时用其边界游标做keyset查询；否则（如拖动滚动条跳转）按位置读取。
+    数据变化或排序改变后需要新建模型或调用invalidate()。
+    """
+
+    def __init__(self, order_by='id', order_dir='asc', block_size=200, max_blocks=64):
+        """初始化模型
+
+        Args:
+            order_by: 排序字段
+            order_dir: 排序方向
+            block_size: 每块的记录数
+            max_blocks: 最多缓存的块数
+        """
+        self.order_by = order_by
+        self.order_dir = order_dir
+        self.block_size = block_size
+        self._blocks = LRUCache(max_blocks, ttl=None)
+        self.total_count = get_quote_count()
+
+    def invalidate(self):
+        """丢弃缓存的块并重新读取总数"""
+        self._blocks.clear()
+        self.total_count = get_quote_count()
+
+    def rows(self, start, count):
+        """读取从start开始的count条记录
+
+        Args:
+            start: 第一条记录的位置，从0开始
+            count: 记录数量
+
+        Returns:
+            list: 名言列表，每个元素是sqlite3.Row对象，超出末尾的部分不返回
+        """
+        start = max(0, min(start, self.total_count))
+        end = min(start + count, self.total_count)
+        if start >= end:
+            return []
+
+        rows = []
+        first_block = start // self.block_size
+        last_block = (end - 1) // self.block_size
+        for index in range(first_block, last_block + 1):
+            block_rows = self._block(index)[0]
+            block_start = index * self.block_size
+            rows += block_rows[max(start - block_start, 0):end - block_start]
+        return rows
+
+    def cached_rows(self, start, count):
+        """只从缓存读取记录，不访问数据库，可在界面线程中调用
+
+        Args:
+            start: 第一条记录的位置，从0开始
+            count: 记录数量
+
+        Returns:
+            list: 名言列表；有块尚未缓存时返回None
+        """
+        start = max(0, min(start, self.total_count))
+        end = min(start + count, self.total_count)
+
+        rows = []
+        for index in range(start // self.block_size, (end - 1) // self.block_size + 1):
+            block = self._blocks.get(index)
+            if block is None:
+                return None
+            block_start = index * self.block_size
+            rows += block[0][max(start - block_start, 0):end - block_start]
+        return rows
+
+    def prefetch(self, start, count):
+        """预先读取视口前后各一块，滚动到相邻位置时无需等待
+
+        Args:
+            start: 视口第一条记录的位置
+            count: 视口的记录数量
+        """
+        first_block = start // self.block_size - 1
+        last_block = (start + count) // self.block_size + 1
+        for index in (first_block, last_block):
+            if 0 <= index * self.block_size < self.total_count:
+                self._block(index)
+
+    def _block(self, index):
+        """读取一块数据，优先使用缓存
+
+        Args:
+            index: 块序号
+
+        Returns:
+            tuple: (名言列表, 上一页游标, 下一页游标)
+        """
+        block = self._blocks.get(index)
+        if block is not None:
+            return block
+
+        block_start = index * self.block_size
+        limit = min(self.block_size, self.total_count - block_start)
+
+        previous = self._blocks.get(index - 1)
+        following = self._blocks.get(index + 1)
+        if previous is not None and previous[2] is not None:
+            block = get_quotes_by_cursor(previous[2], limit, self.order_by, self.order_dir, 'next')
+        elif following is not None and following[1] is not None:
+            block = get_quotes_by_cursor(following[1], limit, self.order_by, self.order_dir, 'prev')
+        else:
+            block = get_quotes_at(block_start, limit, self.order_by, self.order_dir)
+
+        self._blocks.put(index, block)
+        return block
@@ -4,11 +4,28 @@
 名言名句收集项目UI界面
 """
 
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
-from quotes.database import init_db, get_all_quotes, clean_duplicate_quotes, get_quotes_by_page
+from quotes import profiling
+from quotes.database import (init_db, get_all_quotes, clean_duplicate_quotes, close_db_connection,
+                             enable_query_metrics, disable_query_metrics, reset_query_metrics,
+                             get_query_metrics, DuplicateQuotesError)
+from quotes.instrumentation import format_query_metrics
+from quotes.jobs import Job, format_progress
 from quotes.spider import crawl_quotes, generate_mass_quotes
+from quotes.query_worker import QueryWorker
+from quotes.table_model import PagedTableModel, VirtualTableModel
+
+
+# 检查后台查询结果的间隔，单位毫秒
+WORKER_POLL_MS = 30
+
+# 连续翻页、切换排序时，停止操作这么久之后才发起查询，单位毫秒
+PAGE_DEBOUNCE_MS = 100
+
+# 虚拟滚动时需要读取数据库的滚动，停止这么久之后才发起查询，单位毫秒
+SCROLL_DEBOUNCE_MS = 50
 
 
 class QuotesApp:
@@ -54,6 +71,15 @@ class QuotesApp:
         self.btn_refresh = ttk.Button(self.button_frame, text="刷新列表", command=self.refresh_quote_list)
         self.btn_refresh.pack(side=tk.LEFT, padx=5)
         
+        self.btn_metrics = ttk.Button(self.button_frame, text="查询统计", command=self.show_query_metrics)
+        self.btn_metrics.pack(side=tk.LEFT, padx=5)
+        
+        # 虚拟滚动模式：不分页，滚动时只读取视口附近的数据
+        self.virtual_var = tk.BooleanVar(value=False)
+        self.chk_virtual = ttk.Checkbutton(self.button_frame, text="虚拟滚动", variable=self.virtual_var,
+                                           command=self.toggle_virtual_mode)
+        self.chk_virtual.pack(side=tk.LEFT, padx=5)
+        
         # 创建排序选项
         self.sort_frame = ttk.Frame(self.button_frame)
         self.sort_frame.pack(side=tk.RIGHT, padx=5)
@@ -64,11 +90,13 @@ class QuotesApp:
         self.sort_combo = ttk.Combobox(self.sort_frame, textvariable=self.sort_var, width=10)
         self.sort_combo['values'] = ['id', 'author', 'created_at']
         self.sort_combo.pack(side=tk.LEFT, padx=5)
+        self.sort_combo.bind('<<ComboboxSelected>>', self.on_sort_selected)
         
         self.order_var = tk.StringVar(value="desc")
         self.order_combo = ttk.Combobox(self.sort_frame, textvariable=self.order_var, width=8)
         self.order_combo['values'] = ['asc', 'desc']
         self.order_combo.pack(side=tk.LEFT, padx=5)
+        self.order_combo.bind('<<ComboboxSelected>>', self.on_sort_selected)
         
         self.btn_sort = ttk.Button(self.sort_frame, text="应用排序", command=self.refresh_quote_list)
         self.btn_sort.pack(side=tk.LEFT, padx=5)
@@ -124,28 +152,18 @@ class QuotesApp:
         # 绑定双击事件，用于查看详情
         self.tree.bind('<Double-1>', self.on_tree_double_click)
         
+        # 虚拟滚动模式下由程序处理滚轮和窗口大小变化
+        self.tree.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.tree.bind('<Button-4>', self.on_mouse_wheel)
+        self.tree.bind('<Button-5>', self.on_mouse_wheel)
+        self.tree.bind('<Configure>', self.on_tree_configure)
+        
         # 配置滚动条
         self.table_scroll_y.config(command=self.tree.yview)
         self.table_scroll_x.config(command=self.tree.xview)
         
         # 设置列宽和标题
-        self.tree.heading('id', text='ID')
-        self.tree.column('id', width=50, anchor=tk.CENTER)
-        
-        self.tree.heading('content', text='名言内容')
-        self.tree.column('content', width=300, anchor=tk.W)
-        
-        self.tree.heading('author', text='作者')
-        self.tree.column('author', width=100, anchor=tk.CENTER)
-        
-        self.tree.heading('dynasty', text='朝代')
-        self.tree.column('dynasty', width=100, anchor=tk.CENTER)
-        
-        self.tree.heading('meaning', text='意义')
-        self.tree.column('meaning', width=200, anchor=tk.W)
-        
-        self.tree.heading('created_at', text='添加时间')
-        self.tree.column('created_at', width=150, anchor=tk.CENTER)
+        self.configure_columns()
         
         # 布局
         self.table_scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
@@ -158,14 +176,38 @@ class QuotesApp:
         self.status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
+        # 后台任务（爬取、批量生成）的进度条和取消按钮
+        self.job = None
+        self.job_message = ""
+        self.job_frame = ttk.Frame(self.root, padding=(10, 0))
+        self.job_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.btn_cancel = ttk.Button(self.job_frame, text="取消任务", command=self.cancel_job, state=tk.DISABLED)
+        self.btn_cancel.pack(side=tk.RIGHT, padx=5)
+        
+        self.progress_bar = ttk.Progressbar(self.job_frame, mode='determinate', maximum=100)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
         # 分页相关变量
         self.current_page = 1
         self.page_size = 10
         self.total_pages = 1
         
+        # 分页模式的数据模型（缓存当前页和相邻页）及其对应的排序
+        self.page_model = None
+        self.page_sort = None
+        
         # 初始化数据
         self.quotes_data = []
         
+        # 虚拟滚动状态：数据模型和视口第一行的位置
+        self.virtual_model = None
+        self.virtual_top = 0
+        
+        # 数据库查询在后台线程中执行，结果由界面线程定时取回
+        self.worker = QueryWorker()
+        self.debounce_jobs = {}
+        
         # 创建分页控件
         self.pagination_frame = ttk.Frame(self.main_frame)
         self.pagination_frame.pack(fill=tk.X, pady=5)
@@ -191,118 +233,295 @@ class QuotesApp:
         self.btn_last.pack(side=tk.LEFT, padx=5)
         
         # 初始化数据
+        self.poll_worker()
+        self.refresh_quote_list()
+    
+    def poll_worker(self):
+        """取回后台查询的结果并在界面线程中执行回调，之后定时再次检查"""
+        self.worker.poll()
+        self.root.after(WORKER_POLL_MS, self.poll_worker)
+    
+    def debounce(self, key, delay_ms, callback):
+        """延迟执行回调，delay_ms内再次以同一key调用时重新计时，只执行最后一次
+        
+        Args:
+            key: 区分不同操作的键
+            delay_ms: 延迟，单位毫秒
+            callback: 无参回调
+        """
+        self.cancel_debounce(key)
+        
+        def run():
+            self.debounce_jobs.pop(key, None)
+            callback()
+        
+        self.debounce_jobs[key] = self.root.after(delay_ms, run)
+    
+    def cancel_debounce(self, key):
+        """取消尚未执行的延迟回调
+        
+        Args:
+            key: 区分不同操作的键
+        """
+        job = self.debounce_jobs.pop(key, None)
+        if job is not None:
+            self.root.after_cancel(job)
+    
+    def show_error(self, message, error):
+        """显示后台操作的错误
+        
+        Args:
+            message: 错误说明
+            error: 异常对象
+        """
+        messagebox.showerror("错误", f"{message}: {str(error)}")
+        self.status_var.set("就绪")
+    
+    def finish_task(self, message):
+        """后台任务完成后提示并刷新列表
+        
+        Args:
+            message: 完成提示
+        """
+        messagebox.showinfo("成功", message)
+        self.status_var.set(message)
         self.refresh_quote_list()
     
     def init_database(self):
         """初始化数据库"""
-        try:
-            self.status_var.set("正在初始化数据库...")
-            self.root.update()
-            
+        self.status_var.set("正在初始化数据库...")
+        self.btn_init_db.config(state=tk.DISABLED)
+        
+        def on_done(result):
+            self.btn_init_db.config(state=tk.NORMAL)
+            self.finish_task("数据库初始化完成")
+        
+        def on_error(error):
+            if isinstance(error, DuplicateQuotesError) and messagebox.askyesno(
+                    "确认", f"发现 {error.duplicate_count} 条重复数据，升级数据库前需要删除，确认删除？"):
+                self.worker.submit('init-db', clean_and_init, callback=on_done, error_callback=on_error,
+                                   action='init_database')
+                return
+            self.btn_init_db.config(state=tk.NORMAL)
+            self.show_error("初始化数据库失败", error)
+        
+        def clean_and_init():
+            clean_duplicate_quotes()
             init_db()
-            
-            messagebox.showinfo("成功", "数据库初始化完成")
-            self.status_var.set("数据库初始化完成")
-            self.refresh_quote_list()
-        except Exception as e:
-            messagebox.showerror("错误", f"初始化数据库失败: {str(e)}")
-            self.status_var.set("就绪")
+        
+        self.worker.submit('init-db', init_db, callback=on_done, error_callback=on_error,
+                           action='init_database')
     
     def crawl_data(self):
         """爬取名言数据"""
-        def crawl_thread():
-            try:
-                self.status_var.set("正在爬取名言数据...")
-                self.root.update()
-                
-                crawl_quotes()
-                
-                self.root.after(0, lambda: messagebox.showinfo("成功", "爬取数据完成"))
-                self.root.after(0, lambda: self.status_var.set("爬取数据完成"))
-                self.root.after(0, self.refresh_quote_list)
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("错误", f"爬取数据失败: {str(e)}"))
-                self.root.after(0, lambda: self.status_var.set("就绪"))
-        
-        # 在新线程中执行爬取操作，避免阻塞UI
-        thread = threading.Thread(target=crawl_thread)
-        thread.daemon = True
-        thread.start()
+        self.start_job(crawl_quotes, message="正在爬取名言数据", done_message="爬取数据完成",
+                       error_message="爬取数据失败", action='crawl_data')
     
     def mass_generate_data(self):
         """批量生成名言数据"""
-        def generate_thread():
-            try:
-                self.status_var.set("正在批量生成名言数据...")
-                self.root.update()
-                
-                # 生成10000条数据
-                generate_mass_quotes(10000)
-                
-                self.root.after(0, lambda: messagebox.showinfo("成功", "批量生成数据完成"))
-                self.root.after(0, lambda: self.status_var.set("批量生成数据完成"))
-                self.root.after(0, self.refresh_quote_list)
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("错误", f"批量生成数据失败: {str(e)}"))
-                self.root.after(0, lambda: self.status_var.set("就绪"))
-        
-        # 在新线程中执行批量生成操作，避免阻塞UI
-        thread = threading.Thread(target=generate_thread)
-        thread.daemon = True
-        thread.start()
+        # 生成10000条数据
+        self.start_job(generate_mass_quotes, 10000, message="正在批量生成名言数据",
+                       done_message="批量生成数据完成", error_message="批量生成数据失败",
+                       action='mass_generate_data')
+    
+    def start_job(self, function, *args, message, done_message, error_message, action=None):
+        """在后台线程中运行可取消的任务，显示进度
+        
+        任务线程不直接操作界面，进度和结果通过worker.post()交给界面线程。
+        
+        Args:
+            function: 任务函数，需接受progress和cancel_token关键字参数
+            *args: 任务函数的位置参数
+            message: 任务进行中的提示
+            done_message: 完成提示
+            error_message: 失败提示
+            action: 性能分析模式下的操作名
+        """
+        if self.job is not None and self.job.is_running():
+            messagebox.showwarning("提示", "已有任务正在运行")
+            return
+        
+        post = self.worker.post
+        self.job = Job(function, *args,
+                       on_progress=lambda progress: post(self.show_job_progress, progress),
+                       on_done=lambda result: post(self.finish_job, done_message),
+                       on_error=lambda error: post(self.fail_job, error_message, error),
+                       on_cancelled=lambda: post(self.finish_job, "任务已取消"),
+                       action=action)
+        
+        self.job_message = message
+        self.status_var.set(f"{message}...")
+        self.progress_bar['value'] = 0
+        self.btn_cancel.config(state=tk.NORMAL)
+        self.btn_crawl.config(state=tk.DISABLED)
+        self.btn_mass_generate.config(state=tk.DISABLED)
+        
+        self.job.start()
+    
+    def show_job_progress(self, progress):
+        """显示任务进度
+        
+        Args:
+            progress: quotes.jobs.Progress对象
+        """
+        if progress.total:
+            self.progress_bar['value'] = min(progress.done / progress.total * 100, 100)
+        self.status_var.set(f"{self.job_message} - {format_progress(progress)}")
+    
+    def cancel_job(self):
+        """取消正在运行的任务，当前批次写入后停止"""
+        if self.job is not None:
+            self.job.cancel()
+            self.btn_cancel.config(state=tk.DISABLED)
+            self.status_var.set(f"{self.job_message} - 正在取消...")
+    
+    def end_job(self):
+        """任务结束后恢复按钮和进度条"""
+        self.btn_cancel.config(state=tk.DISABLED)
+        self.btn_crawl.config(state=tk.NORMAL)
+        self.btn_mass_generate.config(state=tk.NORMAL)
+        self.progress_bar['value'] = 0
+    
+    def finish_job(self, message):
+        """任务完成或取消后提示并刷新列表
+        
+        Args:
+            message: 提示
+        """
+        self.end_job()
+        self.finish_task(message)
+    
+    def fail_job(self, message, error):
+        """任务失败后提示
+        
+        Args:
+            message: 错误说明
+            error: 异常对象
+        """
+        self.end_job()
+        self.show_error(message, error)
     
     def clean_duplicates(self):
         """清理重复数据"""
-        try:
-            self.status_var.set("正在清理重复数据...")
-            self.root.update()
-            
-            deleted_count = clean_duplicate_quotes()
-            
+        self.status_var.set("正在清理重复数据...")
+        self.btn_clean.config(state=tk.DISABLED)
+        
+        def on_done(deleted_count):
+            self.btn_clean.config(state=tk.NORMAL)
             messagebox.showinfo("成功", f"清理完成，共删除 {deleted_count} 条重复数据")
             self.status_var.set(f"清理完成，删除 {deleted_count} 条重复数据")
             self.refresh_quote_list()
-        except Exception as e:
-            messagebox.showerror("错误", f"清理重复数据失败: {str(e)}")
-            self.status_var.set("就绪")
+        
+        def on_error(error):
+            self.btn_clean.config(state=tk.NORMAL)
+            self.show_error("清理重复数据失败", error)
+        
+        self.worker.submit('clean', clean_duplicate_quotes, callback=on_done, error_callback=on_error,
+                           action='clean_duplicates')
     
     def refresh_quote_list(self):
-        """刷新名言列表"""
-        try:
-            self.status_var.set("正在刷新名言列表...")
-            self.root.update()
-            
-            # 重新构建表格
-            self.rebuild_tree()
-            
-            self.status_var.set(f"就绪 - 共 {len(self.tree.get_children())} 条名言")
-        except Exception as e:
-            messagebox.showerror("错误", f"刷新列表失败: {str(e)}")
-            self.status_var.set("就绪")
+        """刷新名言列表，查询在后台线程中执行"""
+        self.status_var.set("正在刷新名言列表...")
+        order_by = self.sort_var.get()
+        order_dir = self.order_var.get()
+        
+        if self.virtual_var.get():
+            # 数据或排序可能已变化，重新建立数据模型
+            self.worker.cancel('virtual-rows')
+            self.worker.cancel('virtual-prefetch')
+            self.worker.submit('virtual-model', VirtualTableModel, order_by, order_dir,
+                               callback=self.show_virtual_model,
+                               error_callback=lambda e: self.show_error("刷新列表失败", e),
+                               action='refresh_quote_list')
+            return
+        
+        # 排序变化时回到首页
+        if self.page_sort != (order_by, order_dir):
+            self.page_sort = (order_by, order_dir)
+            self.current_page = 1
+        
+        # 数据可能已变化，重新建立数据模型并读取当前页
+        page = self.current_page
+        page_size = self.page_size
+        
+        def load():
+            model = PagedTableModel(order_by, order_dir, page_size)
+            page_number = model.clamp(page)
+            return model, page_number, model.page(page_number)
+        
+        def on_loaded(loaded):
+            self.page_model, page_number, result = loaded
+            self.show_page(page_number, result)
+        
+        self.worker.cancel('page-prefetch')
+        self.worker.submit('page', load, callback=on_loaded,
+                           error_callback=lambda e: self.show_error("刷新列表失败", e),
+                           action='refresh_quote_list')
+    
+    def on_sort_selected(self, event):
+        """选择排序字段或方向后自动刷新，连续切换时只查询一次
+        
+        Args:
+            event: 事件对象
+        """
+        self.debounce('sort', PAGE_DEBOUNCE_MS, self.refresh_quote_list)
+    
+    def request_page(self, page):
+        """切换到指定页
+        
+        已缓存的页（通常是预读的相邻页）立即显示；否则连续点击时只查询最后一次的目标页。
+        
+        Args:
+            page: 页码
+        """
+        self.current_page = page
+        self.update_page_controls()
+        # 之前提交的翻页结果已经过时
+        self.worker.cancel('page')
+        self.cancel_debounce('page')
+        
+        result = self.page_model.cached_page(page) if self.page_model else None
+        if result is not None:
+            self.show_page(page, result)
+        else:
+            self.debounce('page', PAGE_DEBOUNCE_MS, self.load_current_page)
+    
+    def load_current_page(self):
+        """在后台读取current_page"""
+        model = self.page_model
+        if model is None:
+            self.refresh_quote_list()
+            return
+        
+        page = model.clamp(self.current_page)
+        
+        def on_loaded(result):
+            if model is self.page_model:
+                self.show_page(page, result)
+        
+        self.worker.submit('page', model.page, page, callback=on_loaded,
+                           error_callback=lambda e: self.show_error("刷新列表失败", e),
+                           action='load_current_page')
     
     def go_to_first_page(self):
         """前往首页"""
         if self.current_page != 1:
-            self.current_page = 1
-            self.refresh_quote_list()
+            self.request_page(1)
     
     def go_to_prev_page(self):
         """前往上一页"""
         if self.current_page > 1:
-            self.current_page -= 1
-            self.refresh_quote_list()
+            self.request_page(self.current_page - 1)
     
     def go_to_next_page(self):
         """前往下一页"""
         if self.current_page < self.total_pages:
-            self.current_page += 1
-            self.refresh_quote_list()
+            self.request_page(self.current_page + 1)
     
     def go_to_last_page(self):
         """前往末页"""
         if self.current_page != self.total_pages:
-            self.current_page = self.total_pages
-            self.refresh_quote_list()
+            self.request_page(self.total_pages)
     
     def on_tree_double_click(self, event):
         """双击表格行查看详情
@@ -315,8 +534,9 @@ class QuotesApp:
         # 获取行数据
         values = self.tree.item(item, 'values')
         
-        # 获取可见列
-        visible_columns = self.tree['columns']
+        # 行中保存了全部列的值，只显示可见列
+        columns = self.tree['columns']
+        visible_columns = self.visible_columns()
         
         # 构建详情信息
         detail_window = tk.Toplevel(self.root)
@@ -333,8 +553,8 @@ class QuotesApp:
         
         # 显示详情
         detail_text.insert(tk.END, "【名言详情】\n\n")
-        for i, col in enumerate(visible_columns):
-            if i < len(values):
+        for i, col in enumerate(columns):
+            if col in visible_columns and i < len(values):
                 # 获取列显示名称
                 column_names = {
                     'id': 'ID',
@@ -351,38 +571,254 @@ class QuotesApp:
         close_btn = ttk.Button(detail_window, text="关闭", command=detail_window.destroy)
         close_btn.pack(pady=10)
     
+    def show_query_metrics(self):
+        """打开查询统计窗口，显示各操作的耗时分布、总耗时最长的语句和最近的慢查询"""
+        metrics_window = tk.Toplevel(self.root)
+        metrics_window.title("查询统计")
+        metrics_window.geometry("900x500")
+        
+        metrics_text = tk.Text(metrics_window, wrap=tk.WORD, padx=10, pady=10)
+        metrics_text.pack(fill=tk.BOTH, expand=True)
+        
+        button_frame = ttk.Frame(metrics_window)
+        button_frame.pack(pady=10)
+        toggle_var = tk.StringVar()
+        
+        def render():
+            # 快照只复制内存中的统计数据，直接在界面线程中读取
+            snapshot = get_query_metrics()
+            metrics_text.config(state=tk.NORMAL)
+            metrics_text.delete('1.0', tk.END)
+            if snapshot is None:
+                metrics_text.insert(tk.END, "查询统计未开启，开启后的数据库操作将被记录")
+                toggle_var.set("开启统计")
+            else:
+                metrics_text.insert(tk.END, format_query_metrics(snapshot))
+                toggle_var.set("关闭统计")
+            metrics_text.config(state=tk.DISABLED)
+        
+        def toggle():
+            if get_query_metrics() is None:
+                enable_query_metrics()
+            else:
+                disable_query_metrics()
+            render()
+        
+        def reset():
+            reset_query_metrics()
+            render()
+        
+        ttk.Button(button_frame, textvariable=toggle_var, command=toggle).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="刷新", command=render).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="清空", command=reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="关闭", command=metrics_window.destroy).pack(side=tk.LEFT, padx=5)
+        
+        render()
+    
     def toggle_column(self, column):
         """切换列的显示/隐藏状态
         
         Args:
             column: 列名
         """
-        # 重新构建表格
-        self.rebuild_tree()
+        # 行中已有全部列的值，只需改变显示的列，不重新查询
+        self.tree['displaycolumns'] = self.visible_columns()
     
-    def rebuild_tree(self):
-        """根据列显示状态重新构建表格"""
-        # 保存当前选择
-        current_selection = self.tree.selection()
+    def toggle_virtual_mode(self):
+        """在分页模式和虚拟滚动模式之间切换"""
+        if self.virtual_var.get():
+            self.worker.cancel('page')
+            # 滚动条不再跟随表格内容，而是表示视口在全部数据中的位置
+            self.pagination_frame.pack_forget()
+            self.tree.config(yscrollcommand='')
+            self.table_scroll_y.config(command=self.on_virtual_scroll)
+        else:
+            for channel in ('virtual-model', 'virtual-rows', 'virtual-prefetch'):
+                self.worker.cancel(channel)
+            self.virtual_model = None
+            self.table_scroll_y.config(command=self.tree.yview)
+            self.tree.config(yscrollcommand=self.table_scroll_y.set)
+            self.pagination_frame.pack(fill=tk.X, pady=5)
         
-        # 获取当前排序
-        order_by = self.sort_var.get()
-        order_dir = self.order_var.get()
+        self.refresh_quote_list()
+    
+    def visible_row_count(self):
+        """计算表格可见区域能显示的行数
         
-        # 清空表格
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        Returns:
+            int: 行数，至少为1
+        """
+        row_height = ttk.Style().lookup('Treeview', 'rowheight')
+        row_height = int(row_height) if row_height else 20
+        # 减去表头占用的一行
+        return max(1, self.tree.winfo_height() // row_height - 1)
+    
+    def on_virtual_scroll(self, *args):
+        """处理滚动条拖动和点击
         
-        # 移除所有列
-        for col in self.tree['columns']:
-            self.tree.heading(col, text='')
+        Args:
+            *args: ('moveto', 比例)或('scroll', 数量, 'units'/'pages')
+        """
+        if self.virtual_model is None:
+            return
+        
+        visible = self.visible_row_count()
+        if args[0] == 'moveto':
+            top = int(float(args[1]) * self.virtual_model.total_count)
+        else:
+            step = int(args[1]) * (visible if args[2] == 'pages' else 1)
+            top = self.virtual_top + step
+        
+        self.scroll_virtual_to(top)
+    
+    def on_mouse_wheel(self, event):
+        """虚拟滚动模式下用滚轮按行滚动
+        
+        Args:
+            event: 事件对象
+        """
+        if self.virtual_model is None:
+            return None
+        
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            step = -3
+        else:
+            step = 3
+        self.scroll_virtual_to(self.virtual_top + step)
+        return "break"
+    
+    def on_tree_configure(self, event):
+        """表格大小变化后按新的可见行数重新显示
         
-        # 确定要显示的列
-        visible_columns = [col for col, var in self.column_vars.items() if var.get()]
+        Args:
+            event: 事件对象
+        """
+        if self.virtual_model is not None:
+            self.render_virtual_rows()
+    
+    def scroll_virtual_to(self, top):
+        """把视口滚动到指定位置
         
-        # 重新配置列
-        self.tree['columns'] = visible_columns
+        Args:
+            top: 视口第一行的位置
+        """
+        max_top = max(self.virtual_model.total_count - self.visible_row_count(), 0)
+        top = max(0, min(top, max_top))
+        if top != self.virtual_top:
+            self.virtual_top = top
+            self.render_virtual_rows()
+    
+    def show_virtual_model(self, model):
+        """后台建立的数据模型就绪后显示第一屏
         
+        Args:
+            model: VirtualTableModel对象
+        """
+        if not self.virtual_var.get():
+            return
+        
+        self.virtual_model = model
+        self.virtual_top = 0
+        self.render_virtual_rows()
+    
+    def render_virtual_rows(self):
+        """显示视口内的数据
+        
+        视口内的块都已缓存时直接显示；否则滚动条先移动到新位置，
+        停止滚动后在后台读取，读取完成时视口仍在该位置才显示。
+        """
+        if self.virtual_model is None:
+            return
+        
+        visible = self.visible_row_count()
+        quotes = self.virtual_model.cached_rows(self.virtual_top, visible)
+        if quotes is not None:
+            self.fill_virtual_rows(quotes)
+            return
+        
+        self.set_virtual_scrollbar(visible)
+        self.status_var.set(f"正在读取第 {self.virtual_top + 1} 条附近的名言...")
+        self.debounce('virtual-rows', SCROLL_DEBOUNCE_MS, self.load_virtual_rows)
+    
+    def load_virtual_rows(self):
+        """在后台读取视口内的数据"""
+        model = self.virtual_model
+        if model is None:
+            return
+        
+        top = self.virtual_top
+        
+        def on_loaded(quotes):
+            if model is self.virtual_model and top == self.virtual_top:
+                self.fill_virtual_rows(quotes)
+        
+        self.worker.submit('virtual-rows', model.rows, top, self.visible_row_count(),
+                           callback=on_loaded,
+                           error_callback=lambda e: self.show_error("读取名言失败", e),
+                           action='load_virtual_rows')
+    
+    def set_virtual_scrollbar(self, count):
+        """让滚动条表示视口在全部数据中的位置
+        
+        Args:
+            count: 视口显示的记录数
+        """
+        total_count = self.virtual_model.total_count
+        if total_count:
+            self.table_scroll_y.set(self.virtual_top / total_count,
+                                    min(self.virtual_top + count, total_count) / total_count)
+        else:
+            self.table_scroll_y.set(0, 1)
+    
+    def fill_virtual_rows(self, quotes):
+        """把视口内的数据填入表格
+        
+        表格中只保留与可见行数相同的行，滚动时复用这些行，只修改行中的值。
+        
+        Args:
+            quotes: 视口内的名言列表
+        """
+        columns = self.tree['columns']
+        
+        # 行对象被复用后代表不同的名言，清除原有选择
+        self.tree.selection_remove(self.tree.selection())
+        
+        items = self.tree.get_children()
+        for index, quote in enumerate(quotes):
+            values = self.format_values(quote, columns)
+            if index < len(items):
+                self.tree.item(items[index], values=values)
+            else:
+                self.tree.insert('', tk.END, values=values)
+        if len(items) > len(quotes):
+            self.tree.delete(*items[len(quotes):])
+        
+        self.set_virtual_scrollbar(len(quotes))
+        
+        total_count = self.virtual_model.total_count
+        if quotes:
+            self.status_var.set(f"就绪 - 第 {self.virtual_top + 1}-{self.virtual_top + len(quotes)} 条，"
+                                f"共 {total_count} 条名言")
+        else:
+            self.status_var.set("就绪 - 共 0 条名言")
+        
+        # 在后台预读视口前后的数据，继续滚动时无需等待
+        self.worker.submit('virtual-prefetch', self.virtual_model.prefetch,
+                           self.virtual_top, self.visible_row_count())
+    
+    def visible_columns(self):
+        """获取勾选显示的列
+        
+        Returns:
+            list: 可见列
+        """
+        return [col for col, var in self.column_vars.items() if var.get()]
+    
+    def configure_columns(self):
+        """配置全部列的标题和宽度，并按列显示状态设置显示的列
+        
+        表格始终包含全部列，隐藏列只是不显示，切换时不需要重新插入数据。
+        """
         # 设置列标题和宽度
         column_config = {
             'id': {'text': 'ID', 'minwidth': 50, 'width': 50, 'anchor': tk.CENTER, 'stretch': False},
@@ -393,7 +829,7 @@ class QuotesApp:
             'created_at': {'text': '添加时间', 'minwidth': 150, 'width': 180, 'anchor': tk.CENTER, 'stretch': False}
         }
         
-        for col in visible_columns:
+        for col in self.tree['columns']:
             if col in column_config:
                 config = column_config[col]
                 self.tree.heading(col, text=config['text'])
@@ -403,61 +839,88 @@ class QuotesApp:
                                 anchor=config['anchor'],
                                 stretch=config['stretch'])
         
-        # 调整行高以支持换行
-        # Treeview控件不支持wrap选项，移除这个配置
+        self.tree['displaycolumns'] = self.visible_columns()
+    
+    def format_values(self, quote, columns):
+        """生成一行要显示的值，长文本截断
         
-        # 重新加载数据
-        quotes, self.total_pages = get_quotes_by_page(
-            page=self.current_page,
-            page_size=self.page_size,
-            order_by=order_by,
-            order_dir=order_dir
-        )
+        Args:
+            quote: 名言数据
+            columns: 列名列表
         
-        # 更新分页信息
+        Returns:
+            list: 各列的显示值
+        """
+        values = []
+        for col in columns:
+            # 确保文本不会过长
+            value = quote[col]
+            if isinstance(value, str):
+                # 根据列类型设置不同的截取长度
+                max_lengths = {
+                    'content': 150,
+                    'meaning': 120,
+                    'author': 20,
+                    'dynasty': 20
+                }
+                max_len = max_lengths.get(col, 50)
+                if len(value) > max_len:
+                    # 对于长文本，截取并添加省略号
+                    value = value[:max_len-3] + '...'
+            values.append(value)
+        return values
+    
+    def update_page_controls(self):
+        """根据当前页更新分页信息和按钮状态"""
         self.page_info_var.set(f"第 {self.current_page} 页，共 {self.total_pages} 页")
-        
-        # 插入数据
-        for quote in quotes:
-            # 只插入可见列的数据
-            values = []
-            for col in visible_columns:
-                # 确保文本不会过长
-                value = quote[col]
-                if isinstance(value, str):
-                    # 根据列类型设置不同的截取长度
-                    max_lengths = {
-                        'content': 150,
-                        'meaning': 120,
-                        'author': 20,
-                        'dynasty': 20
-                    }
-                    max_len = max_lengths.get(col, 50)
-                    if len(value) > max_len:
-                        # 对于长文本，截取并添加省略号
-                        value = value[:max_len-3] + '...'
-                values.append(value)
-            # 插入数据
-            self.tree.insert('', tk.END, values=values)
-        
-        # 禁用/启用分页按钮
         self.btn_first.config(state=tk.DISABLED if self.current_page == 1 else tk.NORMAL)
         self.btn_prev.config(state=tk.DISABLED if self.current_page == 1 else tk.NORMAL)
-        self.btn_next.config(state=tk.DISABLED if self.current_page == self.total_pages else tk.NORMAL)
-        self.btn_last.config(state=tk.DISABLED if self.current_page == self.total_pages else tk.NORMAL)
+        self.btn_next.config(state=tk.DISABLED if self.current_page >= self.total_pages else tk.NORMAL)
+        self.btn_last.config(state=tk.DISABLED if self.current_page >= self.total_pages else tk.NORMAL)
+    
+    def show_page(self, page, result):
+        """显示一页，并在后台预读相邻页
         
-        # 刷新表格布局
-        self.tree.update_idletasks()
-        self.table_frame.update_idletasks()
+        Args:
+            page: 页码
+            result: PagedTableModel.page()的返回值
+        """
+        if self.virtual_var.get():
+            return
+        
+        self.current_page = page
+        self.total_pages = self.page_model.total_pages
+        self.quotes_data = result[0]
+        
+        # 清空表格
+        self.tree.delete(*self.tree.get_children())
+        
+        # 插入全部列的数据，显示哪些列由displaycolumns决定
+        columns = self.tree['columns']
+        for quote in self.quotes_data:
+            self.tree.insert('', tk.END, values=self.format_values(quote, columns))
+        
+        self.update_page_controls()
+        self.status_var.set(f"就绪 - 共 {len(self.quotes_data)} 条名言")
+        
+        self.worker.submit('page-prefetch', self.page_model.prefetch, page)
     
 
-
-
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="名言名句收集项目UI界面")
+    profiling.add_arguments(parser)
+    profiling.configure(parser.parse_args())
+    
     root = tk.Tk()
     app = QuotesApp(root)
     root.mainloop()
+    if app.job is not None:
+        # 等待正在运行的任务提交当前批次
+        app.job.cancel()
+        app.job.join(10)
+    app.worker.stop()
+    close_db_connection()
 
 
 if __name__ == "__main__":